@@ -0,0 +1,298 @@
+import atexit
+import base64
+import hashlib
+import json
+import logging
+import os
+import select
+import subprocess
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+ERROR_PREFIX = "__MICPIPE_APPLESCRIPT_ERROR__:"
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), "Library", "Caches", "MicPipe", "applescript")
+
+
+def script_key(script):
+    """Content hash that identifies a compiled script template."""
+    return hashlib.sha256(script.encode("utf-8")).hexdigest()[:20]
+
+
+def _argv(args):
+    return [str(a) for a in args]
+
+
+# JXA program run by the persistent worker. Each stdin line is
+# "<key>\t<base64 source or empty>\t<base64 JSON argv>". A template is
+# compiled once per key and kept in memory; later requests only send the key
+# and the arguments, which reach the script's "on run argv" handler. The
+# base64-encoded text result is written back as one line, strictly in order.
+_WORKER_JS = r'''
+ObjC.import('Foundation');
+
+var compiled = {};
+
+function decode(b64) {
+    var data = $.NSData.alloc.initWithBase64EncodedStringOptions($(b64), 0);
+    return $.NSString.alloc.initWithDataEncoding(data, $.NSUTF8StringEncoding);
+}
+
+function encode(text) {
+    return $(text).dataUsingEncoding($.NSUTF8StringEncoding).base64EncodedStringWithOptions(0).js;
+}
+
+function failure(err) {
+    var info = ObjC.deepUnwrap(err[0]) || {};
+    return '__MICPIPE_APPLESCRIPT_ERROR__:' + (info.NSAppleScriptErrorNumber || 0) +
+           ':' + (info.NSAppleScriptErrorMessage || '');
+}
+
+function execute(key, source, args) {
+    var err = Ref();
+    var script = compiled[key];
+    if (!script) {
+        if (!source) return '__MICPIPE_APPLESCRIPT_ERROR__:-2:UNKNOWN_SCRIPT';
+        script = $.NSAppleScript.alloc.initWithSource(source);
+        if (!script.compileAndReturnError(err)) return failure(err);
+        compiled[key] = script;
+    }
+    // Invoke the "on run argv" handler: an open-application event whose
+    // direct parameter is the argument list.
+    var argv = $.NSAppleEventDescriptor.listDescriptor;
+    for (var i = 0; i < args.length; i++) {
+        argv.insertDescriptorAtIndex($.NSAppleEventDescriptor.descriptorWithString($(args[i])), i + 1);
+    }
+    var event = $.NSAppleEventDescriptor.appleEventWithEventClassEventIDTargetDescriptorReturnIDTransactionID(
+        0x61657674, 0x6f617070, $.NSAppleEventDescriptor.nullDescriptor, -1, 0);  // 'aevt', 'oapp'
+    event.setParamDescriptorForKeyword(argv, 0x2d2d2d2d);  // keyDirectObject '----'
+    var desc = script.executeAppleEventError(event, err);
+    if (!desc || desc.isNil()) return failure(err);
+    var text = desc.stringValue;
+    return (text && !text.isNil()) ? text.js : '';
+}
+
+var input = $.NSFileHandle.fileHandleWithStandardInput;
+var output = $.NSFileHandle.fileHandleWithStandardOutput;
+var pending = '';
+while (true) {
+    var chunk = input.availableData;
+    if (chunk.length === 0) break;
+    pending += $.NSString.alloc.initWithDataEncoding(chunk, $.NSUTF8StringEncoding).js;
+    var idx;
+    while ((idx = pending.indexOf('\n')) >= 0) {
+        var line = pending.slice(0, idx);
+        pending = pending.slice(idx + 1);
+        if (!line) continue;
+        var fields = line.split('\t');
+        var result;
+        try {
+            result = execute(fields[0], fields[1] ? decode(fields[1]).js : '', JSON.parse(decode(fields[2]).js));
+        } catch (e) {
+            result = '__MICPIPE_APPLESCRIPT_ERROR__:-1:' + e;
+        }
+        output.writeData($(encode(result) + '\n').dataUsingEncoding($.NSUTF8StringEncoding));
+    }
+}
+'''
+
+
+class AppleScriptTransport:
+    """Executes AppleScript source and returns its text result.
+
+    ``script`` is a constant template with an ``on run argv`` handler and
+    ``args`` are its arguments (passed as strings), so the same source can be
+    compiled once and reused. ``name`` identifies the calling operation (e.g.
+    ``"is_window_alive"`` or ``"execute_js:is_page_ready"``); fakes dispatch
+    on the name and arguments instead of parsing AppleScript.
+    """
+
+    name = "base"
+
+    def run(self, script, name=None, args=()):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class OneShotOsascriptTransport(AppleScriptTransport):
+    """Spawn a fresh ``osascript`` process for every call.
+
+    Templates are compiled once with ``osacompile`` into ``cache_dir`` (file
+    name = content hash), so each call only loads the compiled script.
+    """
+
+    name = "oneshot"
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._compiled = {}  # key -> path of the .scpt file, or None if compiling failed
+        self._lock = threading.Lock()
+
+    def _compiled_path(self, script):
+        key = script_key(script)
+        with self._lock:
+            if key in self._compiled:
+                return self._compiled[key]
+            path = os.path.join(self.cache_dir, f"{key}.scpt")
+            if not os.path.exists(path):
+                try:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    tmp_path = f"{path}.{os.getpid()}.tmp"
+                    result = subprocess.run(
+                        ["osacompile", "-o", tmp_path, "-e", script],
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.PIPE,
+                        text=True,
+                    )
+                    if result.returncode != 0:
+                        raise OSError(result.stderr.strip())
+                    os.replace(tmp_path, path)
+                except OSError as e:
+                    logger.debug(f"osacompile failed ({e}); running source directly")
+                    path = None
+            self._compiled[key] = path
+            return path
+
+    def run(self, script, name=None, args=()):
+        path = self._compiled_path(script)
+        command = ["osascript", path] if path else ["osascript", "-e", script]
+        process = subprocess.Popen(
+            command + _argv(args),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        out, _err = process.communicate()
+        return (out or "").strip()
+
+
+class PersistentOsascriptTransport(AppleScriptTransport):
+    """Run scripts through one long-lived ``osascript`` worker.
+
+    The worker is started lazily and answers requests over a pipe in order,
+    so process startup and AppleScript runtime initialization are paid once
+    per session. Each template's source is sent and compiled only on its
+    first use; later calls send just its key and arguments. If the worker
+    cannot be started (or keeps dying) calls fall back to
+    ``OneShotOsascriptTransport``.
+    """
+
+    name = "persistent"
+    MAX_START_FAILURES = 3
+
+    def __init__(self, timeout=30.0, fallback=None):
+        self.timeout = timeout
+        self.fallback = fallback or OneShotOsascriptTransport()
+        self._proc = None
+        self._buffer = b""
+        self._lock = threading.Lock()
+        self._start_failures = 0
+        self._compiled_keys = set()
+
+    def _start(self):
+        try:
+            self._proc = subprocess.Popen(
+                ["osascript", "-l", "JavaScript", "-e", _WORKER_JS],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                bufsize=0,
+            )
+        except OSError as e:
+            self._proc = None
+            self._start_failures += 1
+            logger.warning(f"Failed to start osascript worker: {e}")
+            return False
+        self._buffer = b""
+        self._compiled_keys = set()
+        logger.debug(f"Started osascript worker (pid={self._proc.pid})")
+        return True
+
+    def _stop(self):
+        proc = self._proc
+        self._proc = None
+        self._buffer = b""
+        if proc is None:
+            return
+        try:
+            proc.kill()
+            proc.wait(timeout=1.0)
+        except Exception:
+            pass
+
+    def _read_line(self, deadline):
+        fd = self._proc.stdout.fileno()
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                return None
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                return None
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return line
+
+    def run(self, script, name=None, args=()):
+        with self._lock:
+            if self._proc is None or self._proc.poll() is not None:
+                self._stop()
+                if self._start_failures >= self.MAX_START_FAILURES or not self._start():
+                    return self.fallback.run(script, name, args)
+
+            key = script_key(script)
+            source = b"" if key in self._compiled_keys else base64.b64encode(script.encode("utf-8"))
+            request = b"\t".join((
+                key.encode("ascii"),
+                source,
+                base64.b64encode(json.dumps(_argv(args)).encode("utf-8")),
+            )) + b"\n"
+            try:
+                self._proc.stdin.write(request)
+            except (BrokenPipeError, OSError) as e:
+                # The worker died before accepting the script, so it is safe
+                # to run it once through the one-shot path instead.
+                logger.debug(f"osascript worker unavailable ({e}); using one-shot fallback")
+                self._stop()
+                self._start_failures += 1
+                return self.fallback.run(script, name, args)
+
+            line = self._read_line(time.monotonic() + self.timeout)
+            if line is None:
+                # The script may have partially run; do not replay it.
+                logger.warning(f"osascript worker did not answer {name or 'script'}; restarting it")
+                self._stop()
+                return f"{ERROR_PREFIX}-1712:osascript worker timed out or exited"
+
+            self._start_failures = 0
+            try:
+                out = base64.b64decode(line).decode("utf-8").strip()
+            except Exception as e:
+                return f"{ERROR_PREFIX}-1:undecodable worker reply: {e}"
+            if not out.startswith(ERROR_PREFIX):
+                # Compile failures come back as errors; resend the source next time.
+                self._compiled_keys.add(key)
+            return out
+
+    def close(self):
+        with self._lock:
+            self._stop()
+
+
+def create_transport(kind=None):
+    """Create a transport from ``kind`` or ``MICPIPE_APPLESCRIPT_TRANSPORT`` (persistent|oneshot)."""
+    kind = (kind or os.environ.get("MICPIPE_APPLESCRIPT_TRANSPORT") or "persistent").lower()
+    if kind == "oneshot":
+        return OneShotOsascriptTransport()
+    if kind != "persistent":
+        logger.warning(f"Unknown AppleScript transport '{kind}', using persistent")
+    transport = PersistentOsascriptTransport()
+    atexit.register(transport.close)
+    return transport
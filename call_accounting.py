@@ -0,0 +1,197 @@
+"""Accounting of Chrome round-trips per user action.
+
+Every AppleScript run and CDP evaluation is recorded as a ChromeCall: the
+operation that issued it (e.g. ``execute_js:start_dictation``), how many
+bytes of script and arguments went out, how long it took to compile and
+execute, and how many bytes came back. Calls are attributed to the
+UserAction current in the calling context (a dictation, an AI Pipe run, a
+voice start, ...), which follows flows across ``await``, nested flow
+submissions and the Chrome worker thread. A finished action logs its table
+at debug level.
+
+``call_budget`` / ``assert_call_budget`` turn a round-trip count into a hard
+limit, so a change that adds a hidden probe fails loudly.
+"""
+import collections
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_current_action = contextvars.ContextVar("micpipe_action", default=None)
+
+
+class CallBudgetExceeded(AssertionError):
+    """A user action made more Chrome round-trips than its budget allows."""
+
+
+class ChromeCall:
+    __slots__ = ("method", "backend", "sent", "seconds", "received")
+
+    def __init__(self, method, backend, sent, seconds, received):
+        self.method = method
+        self.backend = backend
+        self.sent = sent
+        self.seconds = seconds
+        self.received = received
+
+
+class UserAction:
+    """The Chrome calls made on behalf of one user action.
+
+    ``with action:`` makes it the current action for the code inside (and
+    everything it awaits or submits); the same action can be entered by
+    several flows, e.g. the start and the stop of one dictation. With
+    ``keep`` only the last ``keep`` calls are kept.
+    """
+
+    def __init__(self, name, ledger=None, keep=None):
+        self.name = name
+        self.ledger = ledger
+        self.calls = collections.deque(maxlen=keep) if keep else []
+        self.started = time.monotonic()
+        self.finished = None
+        self._outer = []
+
+    def __enter__(self):
+        self._outer.append(_current_action.get())
+        _current_action.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        # Each flow has its own context, so restoring by value is safe even
+        # when flows enter and leave the same action out of order.
+        _current_action.set(self._outer.pop() if self._outer else None)
+        return False
+
+    @property
+    def count(self):
+        return len(self.calls)
+
+    def count_of(self, method):
+        return sum(1 for call in self.calls if call.method == method)
+
+    def finish(self):
+        """Close the action and log its table; later calls are still counted."""
+        if self.finished is not None:
+            return
+        self.finished = time.monotonic()
+        if self.ledger is not None:
+            self.ledger._finished(self)
+
+    def by_method(self):
+        """``{method: [calls, sent, seconds, received]}`` in first-call order."""
+        rows = {}
+        for call in list(self.calls):
+            row = rows.setdefault(call.method, [0, 0, 0.0, 0])
+            row[0] += 1
+            row[1] += call.sent
+            row[2] += call.seconds
+            row[3] += call.received
+        return rows
+
+    def format_table(self):
+        calls = list(self.calls)
+        rows = self.by_method()
+        width = max([24] + [len(method) for method in rows])
+        lines = [
+            f"{self.name}: {len(calls)} Chrome call(s), "
+            f"{_size(sum(c.sent for c in calls))} sent, "
+            f"{sum(c.seconds for c in calls) * 1000:.0f}ms, "
+            f"{_size(sum(c.received for c in calls))} received",
+            f"  {'method':<{width}} {'calls':>5} {'sent':>8} {'time':>8} {'recv':>8}",
+        ]
+        for method, (count, sent, seconds, received) in rows.items():
+            lines.append(
+                f"  {method:<{width}} {count:>5} {_size(sent):>8} {seconds * 1000:>6.0f}ms {_size(received):>8}"
+            )
+        return "\n".join(lines)
+
+
+def _size(n):
+    return f"{n / 1024:.1f}KB" if n >= 1024 else f"{n}B"
+
+
+class CallLedger:
+    """Collects calls into UserActions and keeps the last ``keep`` finished ones.
+
+    Calls made outside any action (startup checks, idle checks, menu
+    clicks) go to ``unattributed``, which keeps the last 1000.
+    """
+
+    def __init__(self, keep=100):
+        self.history = collections.deque(maxlen=keep)
+        self.unattributed = UserAction("unattributed", keep=1000)
+        self._lock = threading.Lock()
+
+    def begin(self, name):
+        """A new UserAction; enter it (``with``) around the code that acts for it."""
+        return UserAction(name, self)
+
+    def record(self, method, backend, sent, seconds, received):
+        action = _current_action.get() or self.unattributed
+        action.calls.append(ChromeCall(method, backend, sent, seconds, received))
+
+    def _finished(self, action):
+        with self._lock:
+            self.history.append(action)
+        if action.calls:
+            logger.debug(f"[calls] {action.format_table()}")
+
+    def actions(self, name=None):
+        with self._lock:
+            return [a for a in self.history if name is None or a.name == name]
+
+
+ledger = CallLedger()
+
+
+def set_ledger(new_ledger):
+    """Install a ledger (e.g. a fresh one for a benchmark) and return the previous one."""
+    global ledger
+    previous = ledger
+    ledger = new_ledger
+    return previous
+
+
+def current_action():
+    return _current_action.get()
+
+
+def record(method, backend, sent, seconds, received):
+    """Record one round-trip in the current ledger."""
+    ledger.record(method, backend, sent, seconds, received)
+
+
+def assert_call_budget(action, max_calls, per_method=None):
+    """Raise CallBudgetExceeded if ``action`` made more than ``max_calls`` calls.
+
+    ``per_method`` optionally caps single methods, e.g.
+    ``{"execute_js:is_page_ready": 1}``.
+    """
+    problems = []
+    if action.count > max_calls:
+        problems.append(f"{action.count} calls > budget of {max_calls}")
+    for method, limit in (per_method or {}).items():
+        count = action.count_of(method)
+        if count > limit:
+            problems.append(f"{method}: {count} calls > budget of {limit}")
+    if problems:
+        raise CallBudgetExceeded(f"{action.name}: " + "; ".join(problems) + "\n" + action.format_table())
+
+
+@contextlib.contextmanager
+def call_budget(max_calls, name="budget", per_method=None):
+    """Run the block as one UserAction and assert its round-trip budget on exit.
+
+    with call_budget(3, "start"):
+        controller.start_dictation(preferred_location=location)
+    """
+    action = ledger.begin(name)
+    with action:
+        yield action
+    action.finish()
+    assert_call_budget(action, max_calls, per_method)
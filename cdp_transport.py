@@ -0,0 +1,279 @@
+import base64
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+logger = logging.getLogger(__name__)
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class CDPError(Exception):
+    """Raised when the DevTools endpoint cannot be reached or a call fails."""
+
+
+def _mask(data: bytes, key: bytes) -> bytes:
+    if not data:
+        return data
+    n = len(data)
+    repeated = (key * (n // 4 + 1))[:n]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(repeated, "big")).to_bytes(n, "big")
+
+
+class _WebSocket:
+    """Minimal RFC 6455 client: text frames out, text/ping/close frames in."""
+
+    def __init__(self, url, timeout):
+        parsed = urllib.parse.urlsplit(url)
+        host = parsed.hostname or "127.0.0.1"
+        port = parsed.port or 80
+        path = (parsed.path or "/") + (f"?{parsed.query}" if parsed.query else "")
+        try:
+            self.sock = socket.create_connection((host, port), timeout=timeout)
+        except OSError as e:
+            raise CDPError(f"connect failed: {e}") from e
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._buffer = b""
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        request = (
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {host}:{port}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n"
+        )
+        try:
+            self.sock.sendall(request.encode("ascii"))
+            header = self._read_until(b"\r\n\r\n").decode("latin-1")
+        except (OSError, CDPError) as e:
+            # CDPError: the peer closed the connection during the handshake.
+            self.close()
+            raise CDPError(f"handshake failed: {e}") from e
+        lines = header.split("\r\n")
+        if " 101 " not in lines[0] + " ":
+            self.close()
+            raise CDPError(f"handshake rejected: {lines[0]}")
+        expected = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode("ascii")).digest()).decode("ascii")
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if headers.get("sec-websocket-accept") != expected:
+            self.close()
+            raise CDPError("handshake rejected: bad Sec-WebSocket-Accept")
+
+    def _read_until(self, marker):
+        while marker not in self._buffer:
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise CDPError("connection closed")
+            self._buffer += chunk
+        head, self._buffer = self._buffer.split(marker, 1)
+        return head
+
+    def _read_exact(self, n):
+        while len(self._buffer) < n:
+            chunk = self.sock.recv(max(65536, n - len(self._buffer)))
+            if not chunk:
+                raise CDPError("connection closed")
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:n], self._buffer[n:]
+        return data
+
+    def _send_frame(self, opcode, payload):
+        header = bytearray([0x80 | opcode])
+        n = len(payload)
+        if n < 126:
+            header.append(0x80 | n)
+        elif n < (1 << 16):
+            header.append(0x80 | 126)
+            header += n.to_bytes(2, "big")
+        else:
+            header.append(0x80 | 127)
+            header += n.to_bytes(8, "big")
+        key = os.urandom(4)
+        self.sock.sendall(bytes(header) + key + _mask(payload, key))
+
+    def send_text(self, text):
+        self._send_frame(0x1, text.encode("utf-8"))
+
+    def recv_text(self):
+        parts = []
+        while True:
+            b0, b1 = self._read_exact(2)
+            fin = b0 & 0x80
+            opcode = b0 & 0x0F
+            length = b1 & 0x7F
+            if length == 126:
+                length = int.from_bytes(self._read_exact(2), "big")
+            elif length == 127:
+                length = int.from_bytes(self._read_exact(8), "big")
+            key = self._read_exact(4) if b1 & 0x80 else None
+            payload = self._read_exact(length)
+            if key:
+                payload = _mask(payload, key)
+            if opcode == 0x8:
+                raise CDPError("connection closed by peer")
+            if opcode == 0x9:
+                self._send_frame(0xA, payload)
+                continue
+            if opcode == 0xA:
+                continue
+            parts.append(payload)
+            if fin:
+                return b"".join(parts).decode("utf-8")
+
+    def settimeout(self, timeout):
+        self.sock.settimeout(timeout)
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class CDPSession:
+    """One DevTools WebSocket connection to a page target."""
+
+    def __init__(self, ws_url, timeout=5.0):
+        self.timeout = timeout
+        self._ws = _WebSocket(ws_url, timeout)
+        self._next_id = 0
+        self.closed = False
+
+    def call(self, method, params=None, timeout=None):
+        if self.closed:
+            raise CDPError("session closed")
+        self._next_id += 1
+        msg_id = self._next_id
+        deadline = time.monotonic() + (timeout or self.timeout)
+        try:
+            self._ws.send_text(json.dumps({"id": msg_id, "method": method, "params": params or {}}))
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CDPError(f"{method} timed out")
+                self._ws.settimeout(remaining)
+                msg = json.loads(self._ws.recv_text())
+                if msg.get("id") != msg_id:
+                    continue  # Events and stale replies.
+                if "error" in msg:
+                    raise CDPError(f"{method} failed: {msg['error'].get('message', msg['error'])}")
+                return msg.get("result", {})
+        except (OSError, ValueError) as e:
+            self.close()
+            raise CDPError(f"{method} failed: {e}") from e
+        except CDPError:
+            self.close()
+            raise
+
+    def evaluate(self, expression, timeout=None):
+        """Evaluate ``expression`` in the page and return its JSON value."""
+        result = self.call(
+            "Runtime.evaluate",
+            {
+                "expression": expression,
+                "returnByValue": True,
+                "awaitPromise": True,
+                "userGesture": True,
+            },
+            timeout=timeout,
+        )
+        if "exceptionDetails" in result:
+            # Mirror AppleScript's "execute javascript", which yields missing value.
+            details = result["exceptionDetails"]
+            text = (details.get("exception") or {}).get("description") or details.get("text", "")
+            logger.debug(f"CDP page exception: {text}")
+            return None
+        return (result.get("result") or {}).get("value")
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._ws.close()
+
+
+class CDPTransport:
+    """Keep one DevTools WebSocket open to the dedicated tab and evaluate JS over it.
+
+    Requires Chrome to run with ``--remote-debugging-port``. Targets are
+    discovered through ``/json/list``; ``attach`` pins the session to one tab.
+    """
+
+    name = "cdp"
+
+    def __init__(self, port, host="127.0.0.1", timeout=5.0):
+        self.host = host
+        self.port = int(port)
+        self.timeout = timeout
+        self.target_id = None
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def attached(self):
+        return self._session is not None and not self._session.closed
+
+    def list_targets(self):
+        url = f"http://{self.host}:{self.port}/json/list"
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as resp:
+                targets = json.loads(resp.read().decode("utf-8"))
+        except (OSError, ValueError) as e:
+            raise CDPError(f"target list unavailable: {e}") from e
+        return [t for t in targets if t.get("type") == "page" and t.get("webSocketDebuggerUrl")]
+
+    def find_targets(self, url_pattern, title_pattern):
+        return [
+            t for t in self.list_targets()
+            if url_pattern in t.get("url", "") or title_pattern in t.get("title", "")
+        ]
+
+    def probe(self, target, expression):
+        """Evaluate ``expression`` on ``target`` through a short-lived session."""
+        session = CDPSession(target["webSocketDebuggerUrl"], self.timeout)
+        try:
+            return session.evaluate(expression)
+        finally:
+            session.close()
+
+    def attach(self, target):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = CDPSession(target["webSocketDebuggerUrl"], self.timeout)
+            self.target_id = target.get("id")
+            logger.debug(f"CDP attached to target {self.target_id} ({target.get('url', '')})")
+
+    def evaluate(self, expression, timeout=None):
+        with self._lock:
+            if not self.attached:
+                raise CDPError("not attached")
+            return self._session.evaluate(expression, timeout=timeout)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+            self.target_id = None
+
+
+def create_cdp_transport():
+    """Return a CDPTransport when ``MICPIPE_CDP_PORT`` is set, else None."""
+    port = os.environ.get("MICPIPE_CDP_PORT", "").strip()
+    if not port:
+        return None
+    try:
+        return CDPTransport(int(port), host=os.environ.get("MICPIPE_CDP_HOST", "127.0.0.1"))
+    except ValueError:
+        logger.warning(f"Ignoring invalid MICPIPE_CDP_PORT={port!r}")
+        return None
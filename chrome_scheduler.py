@@ -0,0 +1,180 @@
+import concurrent.futures
+import contextvars
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Command priorities; lower runs first.
+FOREGROUND = 0  # User-facing actions: start/stop/cancel dictation, voice, paste reads.
+BACKGROUND = 1  # Probes nobody is waiting on right now: idle checks, readiness polls.
+
+
+class ChromeDeadlineExceeded(TimeoutError):
+    """A Chrome command could not start before its deadline and was dropped."""
+
+
+class ChromeCommand:
+    """One queued call; ``future`` receives its result.
+
+    It runs in a copy of the submitter's context, so context variables such
+    as the current user action (see call_accounting) reach the worker.
+    """
+
+    def __init__(self, fn, args, kwargs, priority, deadline, key):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.deadline = deadline
+        self.key = key
+        self.future = concurrent.futures.Future()
+        self.waiters = 1
+        self.started = False
+        self.dropped = False
+        self.queued_at = time.monotonic()
+        self.context = contextvars.copy_context()
+
+    @property
+    def name(self):
+        return getattr(self.fn, "__name__", repr(self.fn))
+
+
+class ChromeScheduler:
+    """Run Chrome calls one at a time on a worker thread, most urgent first.
+
+    Commands run in (priority, submission) order, so a FOREGROUND click
+    overtakes any BACKGROUND probes still queued. A command submitted with a
+    ``key`` joins an identical queued or running command instead of issuing a
+    second round-trip (single-flight). A command that cannot start before its
+    ``deadline`` (a ``time.monotonic()`` value) fails with
+    ChromeDeadlineExceeded; one that has started always runs to completion.
+    """
+
+    SLOW_QUEUE_SECONDS = 0.2
+
+    def __init__(self, name="micpipe-chrome"):
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._by_key = {}
+        self._closed = False
+        self._thread = threading.Thread(target=self._work, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, args=(), kwargs=None, priority=FOREGROUND, deadline=None, key=None):
+        """Queue ``fn(*args, **kwargs)`` and return its ChromeCommand."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Chrome scheduler is shut down")
+            cmd = self._by_key.get(key) if key is not None else None
+            if cmd is not None:
+                cmd.waiters += 1
+                if not cmd.started:
+                    # The joined command is as urgent as its most urgent caller.
+                    if cmd.deadline is not None:
+                        cmd.deadline = None if deadline is None else max(cmd.deadline, deadline)
+                    if priority < cmd.priority:
+                        cmd.priority = priority
+                        heapq.heappush(self._queue, (priority, next(self._seq), cmd))
+                        self._cond.notify()
+                logger.debug(f"[chrome] {cmd.name} joined an identical call in flight")
+                return cmd
+            cmd = ChromeCommand(fn, args, kwargs or {}, priority, deadline, key)
+            if key is not None:
+                self._by_key[key] = cmd
+            heapq.heappush(self._queue, (priority, next(self._seq), cmd))
+            self._cond.notify()
+            return cmd
+
+    def release(self, cmd):
+        """Drop one waiter; a command nobody waits for any more is not started."""
+        with self._cond:
+            cmd.waiters -= 1
+            if cmd.waiters > 0 or cmd.started or cmd.dropped:
+                return
+            cmd.dropped = True
+            self._forget(cmd)
+        cmd.future.cancel()
+
+    def call(self, fn, *args, priority=FOREGROUND, deadline=None, **kwargs):
+        """Blocking helper for code outside the event loop."""
+        return self.submit(fn, args, kwargs, priority, deadline).future.result()
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _forget(self, cmd):
+        if cmd.key is not None and self._by_key.get(cmd.key) is cmd:
+            del self._by_key[cmd.key]
+
+    def _next(self):
+        with self._cond:
+            while True:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return None
+                _, _, cmd = heapq.heappop(self._queue)
+                if cmd.started or cmd.dropped:
+                    continue  # Stale entry of a re-prioritised or abandoned command.
+                if cmd.deadline is not None and time.monotonic() > cmd.deadline:
+                    cmd.dropped = True
+                    self._forget(cmd)
+                    cmd.future.set_exception(
+                        ChromeDeadlineExceeded(f"{cmd.name} missed its deadline")
+                    )
+                    continue
+                cmd.started = True
+                return cmd
+
+    def _work(self):
+        while True:
+            cmd = self._next()
+            if cmd is None:
+                return
+            waited = time.monotonic() - cmd.queued_at
+            if waited > self.SLOW_QUEUE_SECONDS:
+                logger.debug(f"[chrome] {cmd.name} waited {waited:.2f}s in the queue")
+            try:
+                result = cmd.context.run(cmd.fn, *cmd.args, **cmd.kwargs)
+            except BaseException as e:
+                with self._cond:
+                    self._forget(cmd)
+                cmd.future.set_exception(e)
+            else:
+                with self._cond:
+                    self._forget(cmd)
+                cmd.future.set_result(result)
+
+
+class InlineChromeScheduler:
+    """Drop-in ChromeScheduler that runs each command at once on the calling thread.
+
+    Meant for the simulator: with nothing running concurrently, a run is
+    deterministic. Priorities, deadlines and single-flight keys are accepted
+    and ignored.
+    """
+
+    def submit(self, fn, args=(), kwargs=None, priority=FOREGROUND, deadline=None, key=None):
+        cmd = ChromeCommand(fn, args, kwargs or {}, priority, deadline, key)
+        cmd.started = True
+        try:
+            cmd.future.set_result(fn(*args, **(kwargs or {})))
+        except BaseException as e:
+            cmd.future.set_exception(e)
+        return cmd
+
+    def release(self, cmd):
+        pass
+
+    def call(self, fn, *args, priority=FOREGROUND, deadline=None, **kwargs):
+        return self.submit(fn, args, kwargs, priority, deadline).future.result()
+
+    def shutdown(self):
+        pass
@@ -1,69 +1,153 @@
-import subprocess
-import base64
+import threading
 import os
 import logging
+import time
 import json
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import call_accounting
+from applescript_transport import ERROR_PREFIX, create_transport
+from cdp_transport import CDPError
+from page_agent import PageAgent, PageResult, is_agent_missing
 
 logger = logging.getLogger(__name__)
 
-def run_applescript(script):
-    """Run AppleScript and return the result"""
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """Return the AppleScript transport, creating the default one on first use."""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = create_transport()
+        return _transport
+
+
+def set_transport(transport):
+    """Install a transport (e.g. a fake Chrome) and return the previous one."""
+    global _transport
+    with _transport_lock:
+        previous = _transport
+        _transport = transport
+        return previous
+
+
+def _js_value_text(value):
+    """Render a JS value the way AppleScript's "execute javascript" returns it."""
+    if value is None:
+        return "missing value"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+def run_applescript(script, name=None, args=()):
+    """Run an AppleScript template and return the result.
+
+    ``script`` must be constant text that reads its inputs from ``argv``;
+    ``args`` are passed as those arguments, so the compiled form can be
+    cached by the transport and reused across calls.
+    """
     wrapped = (
-        'try\n'
+        'on run argv\n'
+        + 'try\n'
         + script
         + '\n'
         + 'on error errMsg number errNum\n'
-        + 'return "__MICPIPE_APPLESCRIPT_ERROR__:" & errNum & ":" & errMsg\n'
-        + 'end try'
+        + 'return "' + ERROR_PREFIX + '" & errNum & ":" & errMsg\n'
+        + 'end try\n'
+        + 'end run'
     )
-    process = subprocess.Popen(
-        ["osascript", "-e", wrapped],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
+    args = tuple(args)
+    started = time.perf_counter()
+    out = (get_transport().run(wrapped, name=name, args=args) or "").strip()
+    call_accounting.record(
+        name or "applescript",
+        "applescript",
+        len(wrapped) + sum(len(str(a)) for a in args),
+        time.perf_counter() - started,
+        len(out),
     )
-    out, err = process.communicate()
-    out = (out or "").strip()
-    
+
     debug = os.environ.get("MICPIPE_DEBUG_APPLESCRIPT") in ("1", "true", "TRUE", "yes", "YES")
-    if out.startswith("__MICPIPE_APPLESCRIPT_ERROR__:"):
-        if debug:
-            logger.debug(out)
-        return out
+    if debug and out.startswith(ERROR_PREFIX):
+        logger.debug(out)
     return out
 
+
+def _page_result(raw, location):
+    """PageResult for the output of a script that runs page JS at ``location``."""
+    if raw.startswith(ERROR_PREFIX):
+        return PageResult("SCRIPT_ERROR", payload=raw[len(ERROR_PREFIX):])
+    return PageResult.parse(raw, location)
+
+@dataclass
+class BatchOp:
+    """One named probe in a ChromeController.run_batch call."""
+    name: str
+    location: Optional[Tuple[int, int]] = None
+    expect: Optional[Tuple[str, ...]] = None
+    args: Optional[dict] = None
+
+
 class ChromeController:
     """Base class for controlling various AI chat interfaces in Chrome."""
+    # Page probe name -> JS expression, defined per service. Probes run inside
+    # the injected page agent, where ``args`` holds call arguments and
+    # ``find(key, locate)`` returns a cached DOM lookup.
+    PROBES = {}
+    # JS function declarations shared by all probes of a service.
+    AGENT_HELPERS = ""
+
     def __init__(self, service_name, url_pattern, title_pattern, default_url):
         self.service_name = service_name
         self.url_pattern = url_pattern
         self.title_pattern = title_pattern
         self.default_url = default_url
         self.last_error = ""
+        self.cdp = None
+        self._cdp_location = None
+        self.agent = PageAgent(self.PROBES, self.AGENT_HELPERS)
+
+    def set_js_backend(self, cdp=None):
+        """Evaluate page JS over a CDPTransport, or over AppleScript when ``cdp`` is None."""
+        if self.cdp is not None and self.cdp is not cdp:
+            self.cdp.close()
+        self.cdp = cdp
+        self._cdp_location = None
 
     def create_dedicated_window(self, bounds=(50, 50, 500, 400)):
-        """Create a dedicated Chrome window and return (window_id, tab_index) or None."""
+        """Create a dedicated Chrome window and return (window_id, tab_id) or None."""
         self.last_error = ""
         open_url = self.default_url
-        script = f'''
+        script = '''
+        set winBounds to {(item 1 of argv) as integer, (item 2 of argv) as integer, (item 3 of argv) as integer, (item 4 of argv) as integer}
+        set openUrl to item 5 of argv
         tell application "Google Chrome"
             if (count of windows) = 0 then
                 make new window
             end if
-            set newWin to make new window with properties {{bounds:{{{bounds[0]}, {bounds[1]}, {bounds[2]}, {bounds[3]}}}}}
-            set URL of active tab of newWin to "{open_url}"
+            set newWin to make new window with properties {bounds:winBounds}
+            set URL of active tab of newWin to openUrl
             if (count of windows) > 1 then
                 set index of newWin to (count of windows)
             end if
-            return "WIN_ID:" & (id of newWin) & ",TAB:1"
+            return "WIN_ID:" & (id of newWin) & ",TAB:" & (id of active tab of newWin)
         end tell
         '''
-        res = run_applescript(script)
+        res = run_applescript(script, "create_dedicated_window", (*bounds, open_url))
         if not res:
             self.last_error = "EMPTY_RESULT"
             logger.error(f"{self.service_name} create_dedicated_window returned empty result.")
             return None
-        if res.startswith("__MICPIPE_APPLESCRIPT_ERROR__"):
+        if res.startswith(ERROR_PREFIX):
             self.last_error = res
             logger.error(f"{self.service_name} create_dedicated_window failed: {res}")
             return None
@@ -71,8 +155,8 @@ class ChromeController:
             try:
                 win_part, tab_part = res.split(",TAB:")
                 win_id = int(win_part.replace("WIN_ID:", ""))
-                tab_idx = int(tab_part)
-                return (win_id, tab_idx)
+                tab_id = int(tab_part)
+                return (win_id, tab_id)
             except Exception:
                 self.last_error = f"PARSE_ERROR:{res}"
                 logger.error(f"{self.service_name} create_dedicated_window parse failed: {res}")
@@ -81,31 +165,32 @@ class ChromeController:
         logger.error(f"{self.service_name} create_dedicated_window unexpected result: {res}")
         return None
 
-    def is_window_alive(self, window_id, tab_index) -> bool:
+    def is_window_alive(self, window_id, tab_id) -> bool:
         """Check if a specific window/tab still exists and matches the service."""
         try:
             win_id = int(window_id)
-            tab_idx = int(tab_index)
+            tab_id = int(tab_id)
         except (ValueError, TypeError):
             return False
-        if win_id <= 0 or tab_idx <= 0:
+        if win_id <= 0 or tab_id <= 0:
             return False
 
-        script = f'''
+        script = '''
+        set winId to (item 1 of argv) as integer
+        set tabId to (item 2 of argv) as integer
+        set urlPattern to item 3 of argv
+        set titlePattern to item 4 of argv
         tell application "Google Chrome"
             if (count of windows) = 0 then return "NO_WINDOW"
-            set targetWin to missing value
-            set targetWinId to {win_id} as integer
-            repeat with win in windows
-                set currentWinId to (id of win) as integer
-                if currentWinId = targetWinId then
-                    set targetWin to win
-                    exit repeat
-                end if
-            end repeat
-            if targetWin is missing value then return "NOT_FOUND"
             try
-                set t to tab {tab_idx} of targetWin
+                set targetWin to window id winId
+                get id of targetWin
+            on error
+                return "NOT_FOUND"
+            end try
+            try
+                set t to tab id tabId of targetWin
+                get id of t
             on error
                 return "TAB_NOT_FOUND"
             end try
@@ -117,13 +202,15 @@ class ChromeController:
             try
                 set tTitle to (title of t) as text
             end try
-            if (tUrl contains "{self.url_pattern}") or (tTitle contains "{self.title_pattern}") then
+            if (tUrl contains urlPattern) or (tTitle contains titlePattern) then
                 return "OK"
             end if
             return "MISMATCH"
         end tell
         '''
-        res = run_applescript(script)
+        res = run_applescript(
+            script, "is_window_alive", (win_id, tab_id, self.url_pattern, self.title_pattern)
+        )
         return res == "OK"
 
     def reveal_window(self, window_id, bounds=(60, 60, 1100, 800)) -> bool:
@@ -134,26 +221,24 @@ class ChromeController:
             return False
         if win_id <= 0:
             return False
-        script = f'''
+        script = '''
+        set winId to (item 1 of argv) as integer
+        set winBounds to {(item 2 of argv) as integer, (item 3 of argv) as integer, (item 4 of argv) as integer, (item 5 of argv) as integer}
         tell application "Google Chrome"
             if (count of windows) = 0 then return "NO_WINDOW"
-            set targetWin to missing value
-            set targetWinId to {win_id} as integer
-            repeat with win in windows
-                set currentWinId to (id of win) as integer
-                if currentWinId = targetWinId then
-                    set targetWin to win
-                    exit repeat
-                end if
-            end repeat
-            if targetWin is missing value then return "NOT_FOUND"
-            set bounds of targetWin to {{{bounds[0]}, {bounds[1]}, {bounds[2]}, {bounds[3]}}}
+            try
+                set targetWin to window id winId
+                get id of targetWin
+            on error
+                return "NOT_FOUND"
+            end try
+            set bounds of targetWin to winBounds
             set index of targetWin to 1
             activate
             return "OK"
         end tell
         '''
-        res = run_applescript(script)
+        res = run_applescript(script, "reveal_window", (win_id, *bounds))
         return res == "OK"
 
     def set_window_bounds(self, window_id, bounds) -> bool:
@@ -164,24 +249,22 @@ class ChromeController:
             return False
         if win_id <= 0:
             return False
-        script = f'''
+        script = '''
+        set winId to (item 1 of argv) as integer
+        set winBounds to {(item 2 of argv) as integer, (item 3 of argv) as integer, (item 4 of argv) as integer, (item 5 of argv) as integer}
         tell application "Google Chrome"
             if (count of windows) = 0 then return "NO_WINDOW"
-            set targetWin to missing value
-            set targetWinId to {win_id} as integer
-            repeat with win in windows
-                set currentWinId to (id of win) as integer
-                if currentWinId = targetWinId then
-                    set targetWin to win
-                    exit repeat
-                end if
-            end repeat
-            if targetWin is missing value then return "NOT_FOUND"
-            set bounds of targetWin to {{{bounds[0]}, {bounds[1]}, {bounds[2]}, {bounds[3]}}}
+            try
+                set targetWin to window id winId
+                get id of targetWin
+            on error
+                return "NOT_FOUND"
+            end try
+            set bounds of targetWin to winBounds
             return "OK"
         end tell
         '''
-        res = run_applescript(script)
+        res = run_applescript(script, "set_window_bounds", (win_id, *bounds))
         return res == "OK"
 
     def demote_window(self, window_id) -> bool:
@@ -196,51 +279,47 @@ class ChromeController:
             return False
         if win_id <= 0:
             return False
-        script = f'''
+        script = '''
+        set winId to (item 1 of argv) as integer
         tell application "Google Chrome"
             if (count of windows) < 2 then return "SKIP"
-            set targetWin to missing value
-            set targetWinId to {win_id} as integer
-            repeat with win in windows
-                set currentWinId to (id of win) as integer
-                if currentWinId = targetWinId then
-                    set targetWin to win
-                    exit repeat
-                end if
-            end repeat
-            if targetWin is missing value then return "NOT_FOUND"
+            try
+                set targetWin to window id winId
+                get id of targetWin
+            on error
+                return "NOT_FOUND"
+            end try
             set index of targetWin to (count of windows)
             return "OK"
         end tell
         '''
-        res = run_applescript(script)
+        res = run_applescript(script, "demote_window", (win_id,))
         return res in ("OK", "SKIP")
 
-    def reload_tab(self, window_id, tab_index) -> bool:
+    def reload_tab(self, window_id, tab_id) -> bool:
         """Reload a specific tab in a specific Chrome window."""
         try:
             win_id = int(window_id)
-            tab_idx = int(tab_index)
+            tab_id = int(tab_id)
         except (ValueError, TypeError):
             return False
-        if win_id <= 0 or tab_idx <= 0:
+        if win_id <= 0 or tab_id <= 0:
             return False
 
-        script = f'''
+        script = '''
+        set winId to (item 1 of argv) as integer
+        set tabId to (item 2 of argv) as integer
         tell application "Google Chrome"
             if (count of windows) = 0 then return "NO_WINDOW"
-            set targetWin to missing value
-            set targetWinId to {win_id} as integer
-            repeat with win in windows
-                set currentWinId to (id of win) as integer
-                if currentWinId = targetWinId then
-                    set targetWin to win
-                    exit repeat
-                end if
-            end repeat
-            if targetWin is missing value then return "NOT_FOUND"
             try
-                set targetTab to tab {tab_idx} of targetWin
+                set targetWin to window id winId
+                get id of targetWin
+            on error
+                return "NOT_FOUND"
+            end try
+            try
+                set targetTab to tab id tabId of targetWin
+                get id of targetTab
             on error
                 return "TAB_NOT_FOUND"
             end try
@@ -248,7 +327,7 @@ class ChromeController:
             return "RELOADED"
         end tell
         '''
-        res = run_applescript(script)
+        res = run_applescript(script, "reload_tab", (win_id, tab_id))
         return res == "RELOADED"
 
     def close_window(self, window_id) -> bool:
@@ -260,24 +339,21 @@ class ChromeController:
         if win_id <= 0:
             return False
 
-        script = f'''
+        script = '''
+        set winId to (item 1 of argv) as integer
         tell application "Google Chrome"
             if (count of windows) = 0 then return "NO_WINDOW"
-            set targetWin to missing value
-            set targetWinId to {win_id} as integer
-            repeat with win in windows
-                set currentWinId to (id of win) as integer
-                if currentWinId = targetWinId then
-                    set targetWin to win
-                    exit repeat
-                end if
-            end repeat
-            if targetWin is missing value then return "NOT_FOUND"
+            try
+                set targetWin to window id winId
+                get id of targetWin
+            on error
+                return "NOT_FOUND"
+            end try
             close targetWin
             return "CLOSED"
         end tell
         '''
-        res = run_applescript(script)
+        res = run_applescript(script, "close_window", (win_id,))
         return res == "CLOSED"
 
     def is_recording_active(self, preferred_location=None) -> bool:
@@ -285,103 +361,215 @@ class ChromeController:
         return False
 
     def get_tab_location(self):
-        """Return (window_id, tab_index) for the first matching tab, or None."""
-        script = f'''
+        """Return (window_id, tab_id) for the first matching tab, or None.
+
+        This is a discovery scan; the "whose" filter lets Chrome match all tabs
+        of a window in one Apple event instead of two per tab.
+        """
+        script = '''
+        set urlPattern to item 1 of argv
+        set titlePattern to item 2 of argv
         tell application "Google Chrome"
             if (count of windows) = 0 then return "NOT_FOUND"
             repeat with win in windows
-                set tabIndex to 1
-                repeat with t in tabs of win
-                    try
-                        if (URL of t contains "{self.url_pattern}") or (title of t contains "{self.title_pattern}") then
-                            return "WIN_ID:" & (id of win) & ",TAB:" & tabIndex
-                        end if
-                    end try
-                    set tabIndex to tabIndex + 1
-                end repeat
+                try
+                    set matched to id of (every tab of win whose (URL contains urlPattern) or (title contains titlePattern))
+                    if (count of matched) > 0 then
+                        return "WIN_ID:" & (id of win) & ",TAB:" & (item 1 of matched)
+                    end if
+                end try
             end repeat
             return "NOT_FOUND"
         end tell
         '''
-        res = run_applescript(script)
-        if not res or res.startswith("__MICPIPE_APPLESCRIPT_ERROR__"):
+        res = run_applescript(script, "get_tab_location", (self.url_pattern, self.title_pattern))
+        if not res or res.startswith(ERROR_PREFIX):
             return None
         if res.startswith("WIN_ID:") and ",TAB:" in res:
             try:
                 win_part, tab_part = res.split(",TAB:")
                 win_id = int(win_part.replace("WIN_ID:", ""))
-                tab_idx = int(tab_part)
-                return (win_id, tab_idx)
+                tab_id = int(tab_part)
+                return (win_id, tab_id)
             except Exception:
                 return None
         return None
 
     def get_front_tab_location(self):
-        """Return (window_id, tab_index) if the front tab matches, else None."""
-        script = f'''
+        """Return (window_id, tab_id) if the front tab matches, else None."""
+        script = '''
+        set urlPattern to item 1 of argv
+        set titlePattern to item 2 of argv
         tell application "Google Chrome"
             if (count of windows) = 0 then return "NOT_FOUND"
             try
                 set frontWin to front window
                 set winId to id of frontWin
-                set tabIndex to active tab index of frontWin
                 set t to active tab of frontWin
-                if (URL of t contains "{self.url_pattern}") or (title of t contains "{self.title_pattern}") then
-                    return "WIN_ID:" & winId & ",TAB:" & tabIndex
+                if (URL of t contains urlPattern) or (title of t contains titlePattern) then
+                    return "WIN_ID:" & winId & ",TAB:" & (id of t)
                 end if
             end try
             return "NOT_MATCHED"
         end tell
         '''
-        res = run_applescript(script)
-        if not res or res.startswith("__MICPIPE_APPLESCRIPT_ERROR__"):
+        res = run_applescript(script, "get_front_tab_location", (self.url_pattern, self.title_pattern))
+        if not res or res.startswith(ERROR_PREFIX):
             return None
         if res.startswith("WIN_ID:") and ",TAB:" in res:
             try:
                 win_part, tab_part = res.split(",TAB:")
                 win_id = int(win_part.replace("WIN_ID:", ""))
-                tab_idx = int(tab_part)
-                return (win_id, tab_idx)
+                tab_id = int(tab_part)
+                return (win_id, tab_id)
+            except Exception:
+                return None
+        return None
+
+    def resolve_tab_id(self, window_id, tab_index):
+        """Translate a legacy (window_id, tab_index) location into (window_id, tab_id), or None."""
+        try:
+            win_id = int(window_id)
+            tab_idx = int(tab_index)
+        except (ValueError, TypeError):
+            return None
+        if win_id <= 0 or tab_idx <= 0:
+            return None
+        script = '''
+        set winId to (item 1 of argv) as integer
+        set tabIndex to (item 2 of argv) as integer
+        tell application "Google Chrome"
+            try
+                return "WIN_ID:" & winId & ",TAB:" & (id of tab tabIndex of window id winId)
+            on error
+                return "NOT_FOUND"
+            end try
+        end tell
+        '''
+        res = run_applescript(script, "resolve_tab_id", (win_id, tab_idx))
+        if res.startswith("WIN_ID:") and ",TAB:" in res:
+            try:
+                win_part, tab_part = res.split(",TAB:")
+                return (int(win_part.replace("WIN_ID:", "")), int(tab_part))
             except Exception:
                 return None
         return None
 
-    def _execute_js(self, js_code, preferred_location=None, open_url=None):
-        b64_js = base64.b64encode(js_code.encode('utf-8')).decode('utf-8')
+    def _cdp_bind(self, location):
+        """Attach the CDP session to the tab at ``location``; returns False if it cannot."""
+        if self._cdp_location == location and self.cdp.attached:
+            return True
+        try:
+            candidates = self.cdp.find_targets(self.url_pattern, self.title_pattern)
+            if not candidates:
+                return False
+            target = candidates[0]
+            if len(candidates) > 1:
+                # Several service tabs are open: tag the dedicated one through
+                # AppleScript once, then pick the target that carries the tag.
+                marker = f"{location[0]}:{location[1]}"
+                tag_js = f"window.__micpipeTabKey = {json.dumps(marker)}; '{{\"s\":\"TAGGED\"}}'"
+                tagged = self._execute_applescript_js(tag_js, location, probe="tag_cdp_target")
+                if not tagged.delivered:
+                    return False
+                target = next(
+                    (t for t in candidates if self.cdp.probe(t, "window.__micpipeTabKey") == marker),
+                    None,
+                )
+                if target is None:
+                    return False
+            self.cdp.attach(target)
+        except CDPError as e:
+            logger.debug(f"{self.service_name} CDP bind failed: {e}")
+            return False
+        self._cdp_location = location
+        return True
+
+    def evaluate_js(self, expression, preferred_location=None, probe=None):
+        """Evaluate a JS expression in the dedicated tab and return its JSON value.
+
+        Uses CDP when enabled; otherwise the value is JSON-encoded in the page
+        and decoded here. Returns None when the tab cannot be reached.
+        """
+        location = tuple(preferred_location) if preferred_location else None
+        if self.cdp is not None and location and self._cdp_bind(location):
+            try:
+                return self._cdp_evaluate(expression, probe)
+            except CDPError as e:
+                logger.debug(f"{self.service_name} CDP evaluate failed: {e}")
+                self._cdp_location = None
+                return None
+        wrapped = f"JSON.stringify({{s: 'VALUE', p: ({expression})}})"
+        res = self._execute_applescript_js(wrapped, preferred_location, probe=probe)
+        return res.payload if res.delivered else None
+
+    def _execute_js(self, js_code, preferred_location=None, open_url=None, probe=None):
+        """Run JS that answers with an envelope in the dedicated tab and return its PageResult.
 
+        ``probe`` names the page operation for fakes and logs.
+        """
+        if self.cdp is not None and preferred_location:
+            try:
+                location = (int(preferred_location[0]), int(preferred_location[1]))
+            except (ValueError, TypeError, IndexError):
+                location = None
+            if location and self._cdp_bind(location):
+                try:
+                    value = self._cdp_evaluate(js_code, probe)
+                except CDPError as e:
+                    # The script may already have run, so do not replay it over AppleScript.
+                    logger.debug(f"[_execute_js] CDP evaluate failed: {e}")
+                    self._cdp_location = None
+                    return PageResult("CDP_ERROR", payload=str(e))
+                result = PageResult.parse(value if isinstance(value, (str, dict)) else _js_value_text(value), location)
+                logger.debug(f"[_execute_js] via CDP, result={str(result)[:200]}")
+                return result
+        return self._execute_applescript_js(js_code, preferred_location, probe=probe)
+
+    def _cdp_evaluate(self, js_code, probe=None):
+        started = time.perf_counter()
+        value = None
+        try:
+            value = self.cdp.evaluate(js_code)
+            return value
+        finally:
+            call_accounting.record(
+                f"cdp:{probe or 'js'}",
+                "cdp",
+                len(js_code),
+                time.perf_counter() - started,
+                len(_js_value_text(value)),
+            )
+
+    def _execute_applescript_js(self, js_code, preferred_location=None, probe=None):
+        """Run JS in the tab at ``preferred_location`` over AppleScript; returns a PageResult."""
         # Check if preferred_location is window_id or URL based on type
         preferred_win_id = 0
-        preferred_tab_index = 0
+        preferred_tab_id = 0
         if preferred_location and len(preferred_location) == 2:
             try:
                 # Try to parse first element as int (window ID)
                 preferred_win_id = int(preferred_location[0])
-                preferred_tab_index = int(preferred_location[1])
+                preferred_tab_id = int(preferred_location[1])
             except (ValueError, TypeError):
                 # Not a number, might be URL from new code
                 preferred_win_id = 0
-                preferred_tab_index = 0
-
-        script = f'''
+                preferred_tab_id = 0
+
+        script = '''
+        set winId to (item 1 of argv) as integer
+        set tabId to (item 2 of argv) as integer
+        set urlPattern to item 3 of argv
+        set titlePattern to item 4 of argv
+        set jsCode to item 5 of argv
         tell application "Google Chrome"
             if (count of windows) = 0 then return "NO_WINDOW"
-            if {preferred_win_id} <= 0 or {preferred_tab_index} <= 0 then return "NO_LOCATION"
-
-            set foundWin to missing value
-            set targetWinId to {preferred_win_id} as integer
-
-            repeat with win in windows
-                set currentWinId to (id of win) as integer
-                if currentWinId = targetWinId then
-                    set foundWin to win
-                    exit repeat
-                end if
-            end repeat
-
-            if foundWin is missing value then return "NOT_FOUND"
+            if winId <= 0 or tabId <= 0 then return "NO_LOCATION"
 
+            -- Address the tab directly; cost does not depend on how many windows are open.
             try
-                set pt to tab {preferred_tab_index} of foundWin
+                set pt to tab id tabId of window id winId
+                get id of pt
             on error
                 return "NOT_FOUND"
             end try
@@ -396,138 +584,692 @@ class ChromeController:
                 set ptTitle to (title of pt) as text
             end try
 
-            if not ((ptUrl contains "{self.url_pattern}") or (ptTitle contains "{self.title_pattern}")) then
+            if not ((ptUrl contains urlPattern) or (ptTitle contains titlePattern)) then
                 return "NOT_FOUND"
             end if
 
-            set res to execute pt javascript "eval(decodeURIComponent(escape(window.atob('{b64_js}'))))"
-            return "SUCCESS:USED_WIN_ID=" & {preferred_win_id} & ",TAB=" & {preferred_tab_index} & ":" & res
+            return execute pt javascript jsCode
         end tell
         '''
-        result = run_applescript(script)
-        logger.debug(f"[_execute_js] preferred_win_id={preferred_win_id}, result={result[:200]}")
+        raw = run_applescript(
+            script,
+            f"execute_js:{probe or 'js'}",
+            (preferred_win_id, preferred_tab_id, self.url_pattern, self.title_pattern, js_code),
+        )
+        result = _page_result(raw, (preferred_win_id, preferred_tab_id))
+        logger.debug(f"[_execute_js] preferred_win_id={preferred_win_id}, result={str(result)[:200]}")
         return result
 
-    def is_front_tab_match(self) -> bool:
-        return self.get_front_tab_location() is not None
+    def _activate_and_execute_js(self, js_code, preferred_location=None, probe=None):
+        """Briefly bring the tab to the front, run JS, then restore the previous window order."""
+        if not preferred_location:
+            return PageResult("NO_LOCATION")
+        win_id, tab_id = preferred_location
+
+        script = '''
+        set winId to (item 1 of argv) as integer
+        set tabId to (item 2 of argv) as integer
+        set urlPattern to item 3 of argv
+        set titlePattern to item 4 of argv
+        set jsCode to item 5 of argv
+        tell application "Google Chrome"
+            set originalWin to front window
+            set originalTabIndex to active tab index of originalWin
 
-class ChatGPTChrome(ChromeController):
-    def __init__(self):
-        super().__init__("ChatGPT", "chatgpt.com", "ChatGPT", "https://chatgpt.com")
+            set targetWin to missing value
+            set targetTab to missing value
+            set targetTabIndex to 0
 
-    def ensure_chatgpt_tab_exists(self):
-        """Create a dedicated ChatGPT window. Returns status string."""
-        location = self.create_dedicated_window()
-        return "CREATED" if location else "ERROR"
+            -- Address window and tab by ID; the tab's current index is only
+            -- needed to activate it and is read from that one window.
+            if winId > 0 and tabId > 0 then
+                try
+                    set targetWin to window id winId
+                    set targetTab to tab id tabId of targetWin
+                    set tabIds to id of tabs of targetWin
+                    repeat with i from 1 to count of tabIds
+                        if (item i of tabIds) = tabId then
+                            set targetTabIndex to i
+                            exit repeat
+                        end if
+                    end repeat
+                    if targetTabIndex = 0 then set targetTab to missing value
+                on error
+                    set targetTab to missing value
+                end try
+            end if
 
-    def is_front_tab_chatgpt(self):
-        """Check if the front tab in Chrome is a ChatGPT tab. Returns 'YES' or 'NO'."""
-        return "YES" if self.get_front_tab_location() is not None else "NO"
+            -- Validate the preferred tab is still the right service tab.
+            if targetTab is not missing value then
+                set ptUrl to ""
+                set ptTitle to ""
+                try
+                    set ptUrl to (URL of targetTab) as text
+                end try
+                try
+                    set ptTitle to (title of targetTab) as text
+                end try
+                if not ((ptUrl contains urlPattern) or (ptTitle contains titlePattern)) then
+                    return "NOT_FOUND"
+                end if
+            end if
 
-    def get_chatgpt_tab_location(self):
-        """Alias for get_tab_location for clarity."""
-        return self.get_tab_location()
+            if targetTab is missing value then return "NOT_FOUND"
 
-    def get_front_chatgpt_tab_location(self):
-        """Alias for get_front_tab_location for clarity."""
-        return self.get_front_tab_location()
+            set active tab index of targetWin to targetTabIndex
+            set index of targetWin to 1
+            delay 0.15
+            set res to execute targetTab javascript jsCode
+
+            try
+                set index of originalWin to 1
+                set active tab index of originalWin to originalTabIndex
+            end try
+            try
+                if (count of windows) > 1 then
+                    set index of targetWin to (count of windows)
+                end if
+            end try
+            return res
+        end tell
+        '''
+        raw = run_applescript(
+            script,
+            f"activate_and_execute_js:{probe or 'js'}",
+            (win_id, tab_id, self.url_pattern, self.title_pattern, js_code),
+        )
+        return _page_result(raw, (int(win_id), int(tab_id)))
+
+    def _call_agent(self, execute, name, args, preferred_location, diagnostics=False):
+        res = execute(self.agent.call_js(name, args, diagnostics=diagnostics), preferred_location, probe=name)
+        if is_agent_missing(res):
+            # First call after a page load (or an agent upgrade): install and retry.
+            logger.debug(f"{self.service_name} page agent missing; installing {self.agent.version}")
+            res = execute(
+                self.agent.call_js(name, args, install=True, diagnostics=diagnostics), preferred_location, probe=name
+            )
+        return res
+
+    def _run_probe(self, name, preferred_location=None, args=None, diagnostics=False):
+        """Run probe ``name`` in the dedicated tab and return its PageResult.
+
+        With ``diagnostics`` the probe also reports what it saw (e.g. why an
+        element was not found); they cost page time, so ask only when logging them.
+        """
+        return self._call_agent(self._execute_js, name, args, preferred_location, diagnostics)
+
+    def get_text_and_clear(self, activate_first=True, preferred_location=None, diagnostics=False):
+        if not activate_first:
+            return self._run_probe("get_text_and_clear", preferred_location, diagnostics=diagnostics)
+        return self._call_agent(
+            self._activate_and_execute_js, "get_text_and_clear", None, preferred_location, diagnostics
+        )
+
+    def _batch_js(self, ops, install=False):
+        """Build one page script that runs ``ops`` in order and returns one BATCH envelope."""
+        plan = {
+            "ops": [op.name for op in ops],
+            "expect": [list(op.expect) if op.expect else None for op in ops],
+            "args": [op.args for op in ops],
+        }
+        return self.agent.batch_js(plan, install=install)
+
+    # Runs one page script per (window id, tab id, js) triple in argv and
+    # joins the per-tab results with ASCII 31.
+    _BATCH_MULTI_SCRIPT = '''
+        set urlPattern to item 1 of argv
+        set titlePattern to item 2 of argv
+        tell application "Google Chrome"
+            if (count of windows) = 0 then return "NO_WINDOW"
+            set parts to {}
+            repeat with i from 3 to (count of argv) by 3
+                set winId to (item i of argv) as integer
+                set tabId to (item (i + 1) of argv) as integer
+                set jsCode to item (i + 2) of argv
+                set part to "NOT_FOUND"
+                try
+                    set pt to tab id tabId of window id winId
+                    set ptUrl to ""
+                    set ptTitle to ""
+                    try
+                        set ptUrl to (URL of pt) as text
+                    end try
+                    try
+                        set ptTitle to (title of pt) as text
+                    end try
+                    if (ptUrl contains urlPattern) or (ptTitle contains titlePattern) then
+                        set part to execute pt javascript jsCode
+                    end if
+                end try
+                set end of parts to part
+            end repeat
+            set AppleScript's text item delimiters to (character id 31)
+            return parts as text
+        end tell
+        '''
+
+    def _run_batch_groups(self, ops, groups, install=False):
+        """Run each (location, op indexes) group; returns one PageResult per group."""
+        if len(groups) == 1:
+            key, indexes = groups[0]
+            return [self._execute_js(
+                self._batch_js([ops[i] for i in indexes], install),
+                key,
+                probe="batch:" + ",".join(ops[i].name for i in indexes),
+            )]
+        args = [self.url_pattern, self.title_pattern]
+        for key, indexes in groups:
+            args += [key[0], key[1], self._batch_js([ops[i] for i in indexes], install)]
+        raw = run_applescript(self._BATCH_MULTI_SCRIPT, "execute_js_multi:batch", args)
+        if raw.startswith(ERROR_PREFIX) or raw == "NO_WINDOW":
+            return [_page_result(raw, None)] * len(groups)
+        parts = raw.split(chr(31))
+        parts += [""] * (len(groups) - len(parts))
+        return [_page_result(part, key) for (key, _), part in zip(groups, parts)]
+
+    def run_batch(self, operations, preferred_location=None):
+        """Run several named probes in one Chrome round trip and return one result per operation.
+
+        ``operations`` holds BatchOp items or probe names; operations without
+        a location use ``preferred_location``. Operations for the same tab run
+        in order inside one page script. When a status is not one of the
+        operation's ``expect`` statuses, the remaining operations for that tab
+        are skipped and reported as SKIPPED. Each result is a PageResult, as
+        from a single probe call.
+        """
+        ops = [op if isinstance(op, BatchOp) else BatchOp(op) for op in operations]
+        groups = {}
+        for index, op in enumerate(ops):
+            location = op.location or preferred_location
+            try:
+                key = (int(location[0]), int(location[1]))
+            except (ValueError, TypeError, IndexError):
+                key = (0, 0)
+            groups.setdefault(key, []).append(index)
+
+        ordered = list(groups.items())
+        raw = self._run_batch_groups(ops, ordered)
+        missing = [n for n, part in enumerate(raw) if is_agent_missing(part)]
+        if missing:
+            logger.debug(f"{self.service_name} page agent missing in {len(missing)} tab(s); installing")
+            retried = self._run_batch_groups(ops, [ordered[n] for n in missing], install=True)
+            for n, part in zip(missing, retried):
+                raw[n] = part
+
+        results = [None] * len(ops)
+        for (key, indexes), part in zip(ordered, raw):
+            if not part.delivered or part.status != "BATCH" or not isinstance(part.payload, list):
+                for i in indexes:
+                    results[i] = part
+                continue
+            for n, i in enumerate(indexes):
+                if n < len(part.payload):
+                    results[i] = PageResult.from_envelope(part.payload[n], part.location)
+                else:
+                    results[i] = PageResult("SKIPPED", part.location)
+        return results
 
-    def is_page_ready(self, preferred_location=None):
-        js = '''
+    def is_front_tab_match(self) -> bool:
+        return self.get_front_tab_location() is not None
+
+class ChatGPTChrome(ChromeController):
+    AGENT_HELPERS = '''
+    // Diagnostics: where the probe ran.
+    function pageInfo() {
+        var info = { href: null, title: null };
+        try { info.href = location.href; } catch (e) {}
+        try { info.title = document.title; } catch (e) {}
+        return info;
+    }
+
+    function isVisible(el) {
+        try {
+            if (!el) return false;
+            var r = el.getBoundingClientRect();
+            return !!(r && r.width > 0 && r.height > 0);
+        } catch (e) {
+            return false;
+        }
+    }
+
+    function findComposerBox() {
+        // 1) Known stable IDs / test IDs (varies by rollout)
+        var el = document.querySelector('#prompt-textarea');
+        if (el) return { el: el, via: '#prompt-textarea' };
+
+        el = document.querySelector('[data-testid="prompt-textarea"]');
+        if (el) return { el: el, via: '[data-testid=\"prompt-textarea\"]' };
+
+        // 2) Prefer the textbox inside the form that owns the send button (less ambiguity)
+        var sendBtn = document.querySelector('button[data-testid="send-button"]');
+        if (sendBtn && sendBtn.closest) {
+            var form = sendBtn.closest('form');
+            if (form) {
+                el =
+                    form.querySelector('#prompt-textarea') ||
+                    form.querySelector('[data-testid="prompt-textarea"]') ||
+                    form.querySelector('textarea') ||
+                    form.querySelector('div[contenteditable="true"][role="textbox"]') ||
+                    form.querySelector('div[contenteditable="true"]');
+                if (el) return { el: el, via: 'send-button.closest(form)' };
+            }
+        }
+
+        // 3) Last resort: pick a visible textarea/contenteditable textbox
+        var candidates = []
+            .concat(Array.from(document.querySelectorAll('textarea')))
+            .concat(Array.from(document.querySelectorAll('div[contenteditable="true"][role="textbox"]')))
+            .concat(Array.from(document.querySelectorAll('div[contenteditable="true"]')));
+
+        for (var i = 0; i < candidates.length; i++) {
+            if (isVisible(candidates[i])) return { el: candidates[i], via: 'visible-candidate' };
+        }
+        return null;
+    }
+
+    function readComposer(box) {
+        var text = "";
+        try {
+            if (typeof box.value === 'string') text = box.value;
+            if (!text) text = box.innerText || box.textContent || "";
+        } catch(e) {}
+        return text;
+    }
+
+    function clearComposer(box) {
+        try {
+            if (typeof box.value === 'string') box.value = "";
+        } catch(e) {}
+        try {
+            box.innerText = "";
+            box.textContent = "";
+            box.innerHTML = "";
+        } catch(e) {}
+        try {
+            box.dispatchEvent(new Event('input', { bubbles: true }));
+            box.dispatchEvent(new Event('change', { bubbles: true }));
+        } catch(e) {}
+    }
+
+    function fillComposer(box, text) {
+        box.focus();
+        // Select all and delete (clear)
+        document.execCommand('selectAll', false, null);
+        document.execCommand('delete', false, null);
+
+        // Insert text via execCommand (this triggers React state updates more reliably)
+        var success = document.execCommand('insertText', false, text);
+
+        if (!success) {
+            // Fallback to setting property
+            if (box.tagName === 'TEXTAREA' || typeof box.value === 'string') {
+                box.value = text;
+            } else {
+                box.innerText = text;
+            }
+            box.dispatchEvent(new Event('input', { bubbles: true }));
+            box.dispatchEvent(new Event('change', { bubbles: true }));
+        }
+    }
+
+    function findSendButton() {
+        var sendBtn = document.querySelector('button[data-testid="send-button"]') ||
+                      document.querySelector('button[aria-label="Send prompt"]') ||
+                      document.querySelector('button[data-testid="composer-submit-button"]') ||
+                      document.querySelector('#composer-submit-button');
+
+        // If still not found, search by SVG path (extreme fallback)
+        if (!sendBtn) {
+            var svgs = document.querySelectorAll('svg');
+            for (var i = 0; i < svgs.length; i++) {
+                if (svgs[i].innerHTML.indexOf('M15.192') !== -1) { // ChatGPT send icon signature
+                    sendBtn = svgs[i].closest('button');
+                    if (sendBtn) break;
+                }
+            }
+        }
+        return sendBtn;
+    }
+
+    function isGenerating() {
+        var stopBtn = document.querySelector('button[data-testid="stop-button"]') ||
+                      document.querySelector('button[aria-label="Stop streaming"]') ||
+                      document.querySelector('button[aria-label="Stop generating"]');
+        return !!stopBtn || !!document.querySelector('.streaming') || !!document.querySelector('.result-streaming');
+    }
+
+    function assistantMessages() {
+        return document.querySelectorAll('[data-message-author-role="assistant"]');
+    }
+
+    function lastAssistantText() {
+        var assistants = assistantMessages();
+        if (assistants.length === 0) return "";
+        var last = assistants[assistants.length - 1];
+        var md = last.querySelector('.markdown') ||
+                 last.querySelector('[class*="markdown"]') ||
+                 last.querySelector('.prose') ||
+                 last;
+        return (md.innerText || md.textContent || "").trim();
+    }
+
+    // Follow the reply to the message about to be sent. Call right before
+    // clicking send: the reply is the first assistant message past the
+    // current count, and it is complete once the page stops generating.
+    function watchResponse(timeoutMs) {
+        if (state.response) state.response.finish("CANCELLED");
+        var watch = { status: "PENDING", started: false, delivered: "", waiters: [] };
+        var baseline = assistantMessages().length;
+        var observer = null;
+        var timer = null;
+        watch.notify = function() {
+            var waiters = watch.waiters;
+            watch.waiters = [];
+            waiters.forEach(function(wake) { wake(); });
+        };
+        watch.finish = function(status) {
+            if (watch.status !== "PENDING") return;
+            watch.status = status;
+            if (observer) observer.disconnect();
+            clearTimeout(timer);
+            watch.notify();
+        };
+        function update() {
+            var arrived = assistantMessages().length > baseline;
+            var generating = isGenerating();
+            if (arrived || generating) watch.started = true;
+            if (watch.started && arrived && !generating && lastAssistantText()) {
+                watch.finish("COMPLETE");
+            } else {
+                watch.notify();
+            }
+        }
+        state.response = watch;
+        try {
+            observer = new MutationObserver(update);
+            observer.observe(document.body, {
+                childList: true, subtree: true, characterData: true,
+                attributes: true, attributeFilter: ['class', 'data-testid', 'aria-label']
+            });
+        } catch(e) {}
+        timer = setTimeout(function() { watch.finish("TIMEOUT"); }, timeoutMs || 30000);
+        return watch;
+    }
+
+    function findSubmitDictation() {
+        return Array.from(document.querySelectorAll('button')).find(b =>
+            (b.ariaLabel && b.ariaLabel.includes('Submit dictation')) ||
+            b.querySelector('svg path[d*="M20 6L9 17l-5-5"]')
+        );
+    }
+
+    // Follow the page into recording state after a Dictate click. state.start
+    // turns ACTIVE as soon as Submit dictation shows up, or FAILED after
+    // timeoutMs; start_status reads it.
+    function watchStart(timeoutMs) {
+        var watch = { status: "PENDING", waiters: [] };
+        var observer = null;
+        var timer = null;
+        watch.finish = function(status) {
+            if (watch.status !== "PENDING") return;
+            watch.status = status;
+            if (observer) observer.disconnect();
+            if (timer) clearTimeout(timer);
+            watch.waiters.splice(0).forEach(function(w) { try { w(); } catch (e) {} });
+        };
+        if (state.start) state.start.finish("REPLACED");
+        state.start = watch;
+        function check() {
+            if (find('submit_dictation', findSubmitDictation)) watch.finish("ACTIVE");
+        }
+        try {
+            observer = new MutationObserver(check);
+            observer.observe(document.body, {
+                childList: true, subtree: true,
+                attributes: true, attributeFilter: ['aria-label']
+            });
+        } catch(e) {}
+        timer = setTimeout(function() { watch.finish("FAILED"); }, timeoutMs || 1500);
+        check();
+        return watch;
+    }
+    '''
+    PROBES = {
+        "is_page_ready": '''
         (function() {
             if (document.readyState !== 'complete') return "PAGE_NOT_READY";
-            var buttons = Array.from(document.querySelectorAll('button'));
-            var btn = buttons.find(b =>
-                (b.ariaLabel && b.ariaLabel.toLowerCase().includes('dictat')) ||
-                b.querySelector('svg path[d*="M12 1a3 3 0 0 0-3 3v8a3 3 0 0 0 6 0V4a3 3 0 0 0-3-3z"]')
-            );
+            var btn = find('dictate', function() {
+                return Array.from(document.querySelectorAll('button')).find(b =>
+                    (b.ariaLabel && b.ariaLabel.toLowerCase().includes('dictat')) ||
+                    b.querySelector('svg path[d*="M12 1a3 3 0 0 0-3 3v8a3 3 0 0 0 6 0V4a3 3 0 0 0-3-3z"]')
+                );
+            });
             if (btn) return "READY";
-            // Diagnostic: collect aria-labels of all buttons for debugging
-            var labels = buttons.map(function(b) { return b.ariaLabel || ''; })
-                                .filter(function(l) { return l; });
-            return "BTN_NOT_FOUND|LABELS=" + labels.join(',');
+            return reply("BTN_NOT_FOUND", null, function() {
+                // The aria-labels of all buttons, to see what the page shows instead.
+                var labels = Array.from(document.querySelectorAll('button'))
+                    .map(function(b) { return b.ariaLabel || ''; })
+                    .filter(function(l) { return l; });
+                return { labels: labels };
+            });
         })()
-        '''
-        return self._execute_js(js, preferred_location)
-
-    def start_dictation(self, preferred_location=None):
-        js = '''
+        ''',
+        "start_dictation": '''
         (function() {
-            var buttons = Array.from(document.querySelectorAll('button'));
-            var btn = buttons.find(b =>
-                (b.ariaLabel && b.ariaLabel.toLowerCase().includes('dictat')) ||
-                b.querySelector('svg path[d*="M12 1a3 3 0 0 0-3 3v8a3 3 0 0 0 6 0V4a3 3 0 0 0-3-3z"]')
-            );
-            if (btn) { btn.click(); return "START_DONE"; }
+            var btn = find('dictate', function() {
+                return Array.from(document.querySelectorAll('button')).find(b =>
+                    (b.ariaLabel && b.ariaLabel.toLowerCase().includes('dictat')) ||
+                    b.querySelector('svg path[d*="M12 1a3 3 0 0 0-3 3v8a3 3 0 0 0 6 0V4a3 3 0 0 0-3-3z"]')
+                );
+            });
+            if (btn) {
+                btn.click();
+                // With args.verify_ms the page confirms the start by itself.
+                if (args.verify_ms) watchStart(args.verify_ms);
+                return "START_DONE";
+            }
             return "START_BTN_NOT_FOUND";
         })()
-        '''
-        return self._execute_js(js, preferred_location)
-
-    def is_recording_active(self, preferred_location=None):
-        js = '''
+        ''',
+        # Outcome of the verification started by start_dictation: PENDING,
+        # ACTIVE, FAILED or NO_WATCH. Over CDP, args.wait_ms holds the call
+        # until it is settled.
+        "start_status": '''
         (function() {
-            var buttons = Array.from(document.querySelectorAll('button'));
-            var btn = buttons.find(b =>
-                (b.ariaLabel && b.ariaLabel.includes('Submit dictation')) ||
-                b.querySelector('svg path[d*="M20 6L9 17l-5-5"]')
-            );
+            var watch = state.start;
+            if (!watch) return "NO_WATCH";
+            if (watch.status !== "PENDING" || !args.wait_ms) return watch.status;
+            return new Promise(function(resolve) {
+                watch.waiters.push(function() { resolve(watch.status); });
+                setTimeout(function() { resolve(watch.status); }, args.wait_ms);
+            });
+        })()
+        ''',
+        "is_recording_active": '''
+        (function() {
+            var btn = find('submit_dictation', findSubmitDictation);
             return btn ? "ACTIVE" : "INACTIVE";
         })()
-        '''
-        return self._execute_js(js, preferred_location)
-
-    def stop_dictation(self, preferred_location=None):
-        """Stop dictation by clicking Submit dictation button to finish and keep transcribed text."""
-        js = '''
+        ''',
+        "stop_dictation": '''
         (function() {
-            // Return window ID for debugging
-            var winInfo = "UNKNOWN";
-            try {
-                winInfo = window.location.href;
-            } catch(e) {}
-
-            var buttons = Array.from(document.querySelectorAll('button'));
             // Submit dictation button - finishes recording and keeps transcribed text.
             // If this selector fails due to UI/locale changes, the caller should notify the user.
-            var btn = buttons.find(b =>
-                (b.ariaLabel && b.ariaLabel.includes('Submit dictation')) ||
-                b.querySelector('svg path[d*="M20 6L9 17l-5-5"]')
-            );
+            var btn = find('submit_dictation', function() {
+                return Array.from(document.querySelectorAll('button')).find(b =>
+                    (b.ariaLabel && b.ariaLabel.includes('Submit dictation')) ||
+                    b.querySelector('svg path[d*="M20 6L9 17l-5-5"]')
+                );
+            });
             if (btn) {
                 btn.click();
-                return "SUBMIT_CLICKED:URL=" + winInfo;
+                return "SUBMIT_CLICKED";
             }
-            return "SUBMIT_BTN_NOT_FOUND:URL=" + winInfo;
+            return reply("SUBMIT_BTN_NOT_FOUND", null, pageInfo);
         })()
-        '''
-        result = self._execute_js(js, preferred_location)
-        logger.debug(f"[stop_dictation] preferred_location={preferred_location}, result={result}")
-        return result
-
-    def cancel_dictation(self, preferred_location=None):
-        js = '''
+        ''',
+        "cancel_dictation": '''
         (function() {
             var buttons = Array.from(document.querySelectorAll('button'));
             var btn = buttons.find(b => b.ariaLabel && b.ariaLabel.toLowerCase().includes('stop dictation'));
             if (btn) { btn.click(); return "CANCEL_DONE"; }
             return "CANCEL_BTN_NOT_FOUND";
         })()
-        '''
-        return self._execute_js(js, preferred_location)
-
-    # ---- Voice Conversation (Advanced Voice Mode) ----
-
-    def start_voice_conversation(self, preferred_location=None):
-        """Click the 'Use Voice' / 'Start Voice' button to start a real-time voice conversation."""
-        js = '''
+        ''',
+        # Click Submit dictation and watch the composer until the transcript
+        # lands (or args.timeout_ms passes); the text is then read and cleared
+        # right away and handed out by collect_result. With args.pipe
+        # ({slot, prompt}) the transcript is not handed out: the slot prompt is
+        # prepended in place and the message is sent as soon as the send button
+        # is enabled, finishing with SENT and the slot as payload.
+        "stop_and_collect": '''
         (function() {
-            function findVoiceButton(buttons) {
-                var btn = buttons.find(function(b) {
-                    var label = (b.ariaLabel || '').toLowerCase();
-                    return label.includes('start voice') ||
-                           label.includes('use voice') ||
-                           label.includes('voice mode');
+            var btn = find('submit_dictation', function() {
+                return Array.from(document.querySelectorAll('button')).find(b =>
+                    (b.ariaLabel && b.ariaLabel.includes('Submit dictation')) ||
+                    b.querySelector('svg path[d*="M20 6L9 17l-5-5"]')
+                );
+            });
+            if (!btn) return reply("SUBMIT_BTN_NOT_FOUND", null, pageInfo);
+
+            if (state.collect) state.collect.finish("CANCELLED", "");
+            var job = { status: "PENDING", text: "", waiters: [] };
+            var pipe = args.pipe || null;
+            var observer = null;
+            var interval = null;
+            var timer = null;
+            function stopWatching() {
+                if (observer) observer.disconnect();
+                observer = null;
+                clearInterval(interval);
+                clearTimeout(timer);
+            }
+            job.finish = function(status, text) {
+                if (job.status !== "PENDING") return;
+                job.status = status;
+                job.text = text;
+                stopWatching();
+                job.waiters.forEach(function(resolve) { resolve(); });
+                job.waiters = [];
+            };
+            function send(box, transcript) {
+                stopWatching();
+                var prompt = pipe.prompt || "";
+                try {
+                    fillComposer(box, prompt ? prompt + "\\n" + transcript : transcript);
+                } catch(e) {
+                    job.finish("ERROR", e.message);
+                    return;
+                }
+                function trySend() {
+                    var sendBtn = findSendButton();
+                    if (!sendBtn || sendBtn.disabled) return;
+                    watchResponse(pipe.response_timeout_ms);
+                    sendBtn.click();
+                    job.finish("SENT", pipe.slot);
+                }
+                // React enables the send button once it has seen the input.
+                observer = new MutationObserver(trySend);
+                observer.observe(document.body, {
+                    childList: true, subtree: true, attributes: true, attributeFilter: ['disabled']
+                });
+                timer = setTimeout(function() {
+                    var sendBtn = findSendButton();
+                    job.finish(sendBtn ? "SEND_BTN_DISABLED" : "SEND_BTN_NOT_FOUND", "");
+                }, pipe.send_timeout_ms || 3000);
+                trySend();
+            }
+            function check() {
+                var found = findComposerBox();
+                if (!found || !found.el) return;
+                var text = readComposer(found.el);
+                if (text && text.trim()) {
+                    if (pipe) {
+                        send(found.el, text.trim());
+                    } else {
+                        clearComposer(found.el);
+                        job.finish("TEXT", text.trim());
+                    }
+                }
+            }
+            state.collect = job;
+
+            btn.click();
+            try {
+                observer = new MutationObserver(check);
+                observer.observe(document.body, { childList: true, subtree: true, characterData: true });
+            } catch(e) {}
+            // Textarea values change without DOM mutations; check those periodically too.
+            interval = setInterval(check, 100);
+            timer = setTimeout(function() { job.finish("TIMEOUT", ""); }, args.timeout_ms || 8000);
+            return "SUBMIT_CLICKED";
+        })()
+        ''',
+        # Result of the last stop_and_collect: PENDING, TEXT (the transcript as
+        # payload), SENT (the slot), TIMEOUT, NO_JOB or a send failure. With
+        # args.wait_ms (CDP only, which awaits promises) it waits in the page
+        # for the result instead of returning PENDING.
+        "collect_result": '''
+        (function() {
+            var job = state.collect;
+            if (!job) return "NO_JOB";
+            function take() {
+                if (job.status === "PENDING") return "PENDING";
+                if (state.collect === job) state.collect = null;
+                return reply(job.status, job.text);
+            }
+            if (job.status !== "PENDING" || !args.wait_ms) return take();
+            return new Promise(function(resolve) {
+                job.waiters.push(function() { resolve(take()); });
+                setTimeout(function() { resolve(take()); }, args.wait_ms);
+            });
+        })()
+        ''',
+        "get_text_and_clear": '''
+        (function() {
+            var found = find('composer', findComposerBox);
+            if (!found || !found.el) {
+                return reply("NOT_FOUND", null, function() {
+                    var info = pageInfo();
+                    info.promptTextareas = document.querySelectorAll('#prompt-textarea').length;
+                    info.testidTextareas = document.querySelectorAll('[data-testid="prompt-textarea"]').length;
+                    info.sendButtons = document.querySelectorAll('button[data-testid="send-button"]').length;
+                    return info;
+                });
+            }
+            var box = found.el;
+
+            // Ensure the composer is focused; in some UI states transcription is only materialized after focus.
+            try { box.focus(); } catch(e) {}
+
+            var text = readComposer(box);
+
+            if (!text || !text.trim()) {
+                return reply("EMPTY", null, function() {
+                    var info = pageInfo();
+                    info.via = found.via;
+                    info.tag = box.tagName;
+                    info.id = box.id;
+                    info.dataTestid = box.getAttribute('data-testid');
+                    info.isVisible = isVisible(box);
+                    info.valLen = (typeof box.value === 'string') ? box.value.length : 0;
+                    info.innerLen = (box.innerText || box.textContent || "").length;
+                    return info;
+                });
+            }
+
+            clearComposer(box);
+            return reply("TEXT", text.trim());
+        })()
+        ''',
+        "start_voice_conversation": '''
+        (function() {
+            function findVoiceButton(buttons) {
+                var btn = buttons.find(function(b) {
+                    var label = (b.ariaLabel || '').toLowerCase();
+                    return label.includes('start voice') ||
+                           label.includes('use voice') ||
+                           label.includes('voice mode');
                 });
 
                 if (!btn) {
@@ -583,12 +1325,8 @@ class ChatGPTChrome(ChromeController):
 
             return "VOICE_BTN_NOT_FOUND";
         })()
-        '''
-        return self._execute_js(js, preferred_location)
-
-    def stop_voice_conversation(self, preferred_location=None):
-        """Stop an active voice conversation by clicking the end/stop button."""
-        js = '''
+        ''',
+        "stop_voice_conversation": '''
         (function() {
             var buttons = Array.from(document.querySelectorAll('button'));
 
@@ -612,12 +1350,8 @@ class ChatGPTChrome(ChromeController):
             if (btn) { btn.click(); return "VOICE_STOP_CLICKED"; }
             return "VOICE_STOP_BTN_NOT_FOUND";
         })()
-        '''
-        return self._execute_js(js, preferred_location)
-
-    def is_voice_conversation_active(self, preferred_location=None):
-        """Check if a voice conversation overlay is currently active."""
-        js = '''
+        ''',
+        "is_voice_conversation_active": '''
         (function() {
             // Look for voice overlay container or end button
             var overlay = document.querySelector('[data-testid="voice-mode-container"]') ||
@@ -637,12 +1371,8 @@ class ChatGPTChrome(ChromeController):
 
             return "INACTIVE";
         })()
-        '''
-        return self._execute_js(js, preferred_location)
-
-    def is_voice_available(self, preferred_location=None):
-        """Check if the 'Use Voice' / 'Start Voice' button is present (requires ChatGPT Plus)."""
-        js = '''
+        ''',
+        "is_voice_available": '''
         (function() {
             var buttons = Array.from(document.querySelectorAll('button'));
             var btn = buttons.find(function(b) {
@@ -657,12 +1387,8 @@ class ChatGPTChrome(ChromeController):
             }
             return btn ? "AVAILABLE" : "NOT_AVAILABLE";
         })()
-        '''
-        return self._execute_js(js, preferred_location)
-
-    def get_voice_activity_snapshot(self, preferred_location=None):
-        """Capture the latest conversation message text for voice idle detection."""
-        js = '''
+        ''',
+        "get_voice_activity_snapshot": '''
         (function() {
             function normalizeText(text) {
                 return (text || '')
@@ -694,7 +1420,7 @@ class ChatGPTChrome(ChromeController):
 
             var assistant = getLastMessage('assistant');
             var user = getLastMessage('user');
-            return JSON.stringify({
+            return reply("SNAPSHOT", {
                 active: !!endBtn,
                 assistant_text: assistant.text,
                 assistant_count: assistant.count,
@@ -702,246 +1428,26 @@ class ChatGPTChrome(ChromeController):
                 user_count: user.count
             });
         })()
-        '''
-        return self._execute_js(js, preferred_location)
-
-    def get_text_and_clear(self, activate_first=True, preferred_location=None):
-        js_code = '''
+        ''',
+        "pre_fill_prompt": '''
         (function() {
-            function diag(payload) {
-                try { return JSON.stringify(payload); } catch (e) { return String(payload); }
-            }
-
-            function isVisible(el) {
-                try {
-                    if (!el) return false;
-                    var r = el.getBoundingClientRect();
-                    return !!(r && r.width > 0 && r.height > 0);
-                } catch (e) {
-                    return false;
-                }
-            }
-
-            function findComposerBox() {
-                // 1) Known stable IDs / test IDs (varies by rollout)
-                var el = document.querySelector('#prompt-textarea');
-                if (el) return { el: el, via: '#prompt-textarea' };
-
-                el = document.querySelector('[data-testid="prompt-textarea"]');
-                if (el) return { el: el, via: '[data-testid=\"prompt-textarea\"]' };
-
-                // 2) Prefer the textbox inside the form that owns the send button (less ambiguity)
-                var sendBtn = document.querySelector('button[data-testid="send-button"]');
-                if (sendBtn && sendBtn.closest) {
-                    var form = sendBtn.closest('form');
-                    if (form) {
-                        el =
-                            form.querySelector('#prompt-textarea') ||
-                            form.querySelector('[data-testid="prompt-textarea"]') ||
-                            form.querySelector('textarea') ||
-                            form.querySelector('div[contenteditable="true"][role="textbox"]') ||
-                            form.querySelector('div[contenteditable="true"]');
-                        if (el) return { el: el, via: 'send-button.closest(form)' };
-                    }
-                }
-
-                // 3) Last resort: pick a visible textarea/contenteditable textbox
-                var candidates = []
-                    .concat(Array.from(document.querySelectorAll('textarea')))
-                    .concat(Array.from(document.querySelectorAll('div[contenteditable="true"][role="textbox"]')))
-                    .concat(Array.from(document.querySelectorAll('div[contenteditable="true"]')));
-
-                for (var i = 0; i < candidates.length; i++) {
-                    if (isVisible(candidates[i])) return { el: candidates[i], via: 'visible-candidate' };
-                }
-                return null;
-            }
-
-            var found = findComposerBox();
-            if (!found || !found.el) {
-                return "NOT_FOUND|DBG=" + diag({
-                    href: (function(){ try { return location.href; } catch(e) { return null; } })(),
-                    title: (function(){ try { return document.title; } catch(e) { return null; } })(),
-                    promptTextareas: document.querySelectorAll('#prompt-textarea').length,
-                    testidTextareas: document.querySelectorAll('[data-testid="prompt-textarea"]').length,
-                    sendButtons: document.querySelectorAll('button[data-testid="send-button"]').length,
-                });
+            var box = document.querySelector('#prompt-textarea');
+            if (!box) {
+                box = document.querySelector('[data-testid="prompt-textarea"]');
             }
-            var box = found.el;
-
-            // Ensure the composer is focused; in some UI states transcription is only materialized after focus.
-            try { box.focus(); } catch(e) {}
+            if (!box) return "NOT_FOUND";
 
-            var text = "";
             try {
-                if (typeof box.value === 'string') text = box.value;
-                if (!text) text = box.innerText || box.textContent || "";
-            } catch(e) {}
-
-            if (!text || !text.trim()) {
-                var valLen = 0;
-                var innerLen = 0;
-                try { valLen = (typeof box.value === 'string') ? box.value.length : 0; } catch(e) {}
-                try { innerLen = (box.innerText || box.textContent || "").length; } catch(e) {}
-                return "EMPTY|DBG=" + diag({
-                    href: (function(){ try { return location.href; } catch(e) { return null; } })(),
-                    title: (function(){ try { return document.title; } catch(e) { return null; } })(),
-                    via: found.via,
-                    tag: (function(){ try { return box.tagName; } catch(e) { return null; } })(),
-                    id: (function(){ try { return box.id; } catch(e) { return null; } })(),
-                    dataTestid: (function(){ try { return box.getAttribute('data-testid'); } catch(e) { return null; } })(),
-                    isVisible: isVisible(box),
-                    valLen: valLen,
-                    innerLen: innerLen,
-                });
+                fillComposer(box, args.text);
+                return "FILLED";
+            } catch(e) {
+                return reply("ERROR", e.message);
             }
-
-            // Clear composer
-            try {
-                if (typeof box.value === 'string') box.value = "";
-            } catch(e) {}
-            try {
-                box.innerText = "";
-                box.textContent = "";
-                box.innerHTML = "";
-            } catch(e) {}
-
-            try {
-                box.dispatchEvent(new Event('input', { bubbles: true }));
-                box.dispatchEvent(new Event('change', { bubbles: true }));
-            } catch(e) {}
-
-            return text.trim();
         })()
-        '''
-        if not activate_first:
-            return self._execute_js(js_code, preferred_location)
-
-        if not preferred_location:
-            return "NO_LOCATION"
-        b64_js = base64.b64encode(js_code.encode('utf-8')).decode('utf-8')
-        win_id, tab_idx = preferred_location
-
-        script = f'''
-        tell application "Google Chrome"
-            set originalWin to front window
-            set originalTabIndex to active tab index of originalWin
-
-            set targetWin to missing value
-            set targetTab to missing value
-            set targetTabIndex to 0
-
-            -- Find window by ID
-            if {win_id} > 0 and {tab_idx} > 0 then
-                try
-                    set targetWinId to {win_id} as integer
-                    repeat with win in windows
-                        set currentWinId to (id of win) as integer
-                        if currentWinId = targetWinId then
-                            set targetWin to win
-                            set targetTab to tab {tab_idx} of targetWin
-                            set targetTabIndex to {tab_idx}
-                            exit repeat
-                        end if
-                    end repeat
-                end try
-            end if
-
-            -- Validate the preferred tab is still the right service tab.
-            if targetTab is not missing value then
-                set ptUrl to ""
-                set ptTitle to ""
-                try
-                    set ptUrl to (URL of targetTab) as text
-                end try
-                try
-                    set ptTitle to (title of targetTab) as text
-                end try
-                if not ((ptUrl contains "{self.url_pattern}") or (ptTitle contains "{self.title_pattern}")) then
-                    return "NOT_FOUND"
-                end if
-            end if
-
-            if targetTab is missing value then return "NOT_FOUND"
-
-            set active tab index of targetWin to targetTabIndex
-            set index of targetWin to 1
-            delay 0.15
-            set res to execute targetTab javascript "eval(decodeURIComponent(escape(window.atob('{b64_js}'))))"
-
-            try
-                set index of originalWin to 1
-                set active tab index of originalWin to originalTabIndex
-            end try
-            try
-                if (count of windows) > 1 then
-                    set index of targetWin to (count of windows)
-                end if
-            end try
-            return "SUCCESS:" & res
-        end tell
-        '''
-        return run_applescript(script)
-
-    def pre_fill_prompt(self, prompt, preferred_location=None):
-        """Pre-fill prompt text in the input box using execCommand for better reactivity"""
-        js_code = f'''
-        (function() {{
-            var box = document.querySelector('#prompt-textarea');
-            if (!box) {{
-                box = document.querySelector('[data-testid="prompt-textarea"]');
-            }}
-            if (!box) return "NOT_FOUND";
-            
-            try {{
-                box.focus();
-                // Select all and delete (clear)
-                document.execCommand('selectAll', false, null);
-                document.execCommand('delete', false, null);
-                
-                // Insert text via execCommand (this triggers React state updates more reliably)
-                var success = document.execCommand('insertText', false, {json.dumps(prompt)});
-                
-                if (!success) {{
-                    // Fallback to setting property
-                    if (box.tagName === 'TEXTAREA' || typeof box.value === 'string') {{
-                        box.value = {json.dumps(prompt)};
-                    }} else {{
-                        box.innerText = {json.dumps(prompt)};
-                    }}
-                    box.dispatchEvent(new Event('input', {{ bubbles: true }}));
-                    box.dispatchEvent(new Event('change', {{ bubbles: true }}));
-                }}
-                
-                return "SUCCESS";
-            }} catch(e) {{
-                return "ERROR:" + e.message;
-            }}
-        }})()
-        '''
-        return self._execute_js(js_code, preferred_location)
-
-
-    def submit_message(self, preferred_location=None):
-        """Click the send button to submit the message"""
-        js = '''
+        ''',
+        "submit_message": '''
         (function() {
-            var sendBtn = document.querySelector('button[data-testid="send-button"]') ||
-                          document.querySelector('button[aria-label="Send prompt"]') ||
-                          document.querySelector('button[data-testid="composer-submit-button"]') ||
-                          document.querySelector('#composer-submit-button');
-            
-            // If still not found, search by SVG path (extreme fallback)
-            if (!sendBtn) {
-                var svgs = document.querySelectorAll('svg');
-                for (var i = 0; i < svgs.length; i++) {
-                    if (svgs[i].innerHTML.indexOf('M15.192') !== -1) { // ChatGPT send icon signature
-                        sendBtn = svgs[i].closest('button');
-                        if (sendBtn) break;
-                    }
-                }
-            }
-
+            var sendBtn = findSendButton();
             if (sendBtn) {
                 if (sendBtn.disabled) return "SEND_BTN_DISABLED";
                 sendBtn.click();
@@ -949,13 +1455,55 @@ class ChatGPTChrome(ChromeController):
             }
             return "SEND_BTN_NOT_FOUND";
         })()
-        '''
-        return self._execute_js(js, preferred_location)
-
-
-    def is_response_complete(self, preferred_location=None):
-        """Check if AI response is complete (Simpler, more robust version)"""
-        js = '''
+        ''',
+        # Start following the reply to the next message (see watchResponse).
+        "watch_response": '''
+        (function() {
+            watchResponse(args.timeout_ms);
+            return "WATCHING";
+        })()
+        ''',
+        # Text of the watched reply past args.offset, as the payload
+        # {end, reset, text}: end is the offset to pass next time; with reset
+        # earlier text changed and text is the whole reply instead of what
+        # follows the offset. Status is WAITING, GENERATING, COMPLETE, TIMEOUT
+        # or CANCELLED, or NO_WATCH. With args.wait_ms (CDP only) it waits in
+        # the page until there is something new.
+        "response_delta": '''
+        (function() {
+            var watch = state.response;
+            if (!watch) return "NO_WATCH";
+            var offset = args.offset || 0;
+            function take() {
+                var text = lastAssistantText();
+                if (!watch.started) text = "";
+                var reset = offset > 0 && (text.length < offset ||
+                    text.slice(0, offset) !== watch.delivered.slice(0, offset));
+                watch.delivered = text;
+                var status = watch.status;
+                if (status === "PENDING") status = watch.started ? "GENERATING" : "WAITING";
+                return reply(status, { end: text.length, reset: reset, text: text.slice(reset ? 0 : offset) });
+            }
+            if (watch.status !== "PENDING" || !args.wait_ms) return take();
+            if (watch.started && lastAssistantText().length !== offset) return take();
+            return new Promise(function(resolve) {
+                var done = false;
+                var timer = setTimeout(function() { done = true; resolve(take()); }, args.wait_ms);
+                function wake() {
+                    if (done) return;
+                    if (watch.status === "PENDING" && (!watch.started || lastAssistantText().length === offset)) {
+                        watch.waiters.push(wake);
+                        return;
+                    }
+                    done = true;
+                    clearTimeout(timer);
+                    resolve(take());
+                }
+                watch.waiters.push(wake);
+            });
+        })()
+        ''',
+        "is_response_complete": '''
         (function() {
             // 1. If stop button exists, we are definitely NOT done
             var stopBtn = document.querySelector('button[data-testid="stop-button"]') ||
@@ -974,14 +1522,8 @@ class ChatGPTChrome(ChromeController):
             // 4. If stop button is gone and we have messages, we consider it potential completion
             return "COMPLETE";
         })()
-        '''
-        return self._execute_js(js, preferred_location)
-
-
-
-    def click_copy_button(self, preferred_location=None):
-        """Extract text content from the last AI response directly (no clipboard API needed)"""
-        js = """
+        ''',
+        "click_copy_button": """
         (function() {
             var assistants = document.querySelectorAll('[data-message-author-role="assistant"]');
             if (assistants.length === 0) return "NO_RESPONSE";
@@ -1006,68 +1548,185 @@ class ChatGPTChrome(ChromeController):
             text = text.trim();
             
             if (text) {
-                return "TEXT:" + text;
+                return reply("TEXT", text);
             }
             return "EMPTY_RESPONSE";
         })()
-        """
-        return self._execute_js(js, preferred_location)
-
-
+        """,
+    }
 
-class GeminiChrome(ChromeController):
     def __init__(self):
-        super().__init__("Gemini", "gemini.google.com", "Gemini", "https://gemini.google.com/app")
+        super().__init__("ChatGPT", "chatgpt.com", "ChatGPT", "https://chatgpt.com")
 
-    def ensure_gemini_tab_exists(self):
-        """Create a dedicated Gemini window. Returns status string."""
+    def ensure_chatgpt_tab_exists(self):
+        """Create a dedicated ChatGPT window. Returns status string."""
         location = self.create_dedicated_window()
         return "CREATED" if location else "ERROR"
 
-    def is_front_tab_gemini(self):
-        """Check if the front tab in Chrome is a Gemini tab. Returns 'YES' or 'NO'."""
+    def is_front_tab_chatgpt(self):
+        """Check if the front tab in Chrome is a ChatGPT tab. Returns 'YES' or 'NO'."""
         return "YES" if self.get_front_tab_location() is not None else "NO"
 
-    def get_gemini_tab_location(self):
+    def get_chatgpt_tab_location(self):
         """Alias for get_tab_location for clarity."""
         return self.get_tab_location()
 
-    def get_front_gemini_tab_location(self):
+    def get_front_chatgpt_tab_location(self):
         """Alias for get_front_tab_location for clarity."""
         return self.get_front_tab_location()
 
-    def is_page_ready(self, preferred_location=None):
-        js = '''
+    def is_page_ready(self, preferred_location=None, diagnostics=False):
+        """READY, PAGE_NOT_READY or BTN_NOT_FOUND (diagnostics: the button labels on the page)."""
+        return self._run_probe("is_page_ready", preferred_location, diagnostics=diagnostics)
+
+    def start_dictation(self, preferred_location=None, verify_timeout=None):
+        """Click Dictate; with ``verify_timeout`` the page then confirms the start (see start_status)."""
+        args = {"verify_ms": int(verify_timeout * 1000)} if verify_timeout else None
+        return self._run_probe("start_dictation", preferred_location, args)
+
+    def start_status(self, preferred_location=None, wait=None):
+        """Outcome of the page-side start verification: PENDING, ACTIVE, FAILED or NO_WATCH."""
+        args = {"wait_ms": int(wait * 1000)} if wait and self.cdp is not None else None
+        return self._run_probe("start_status", preferred_location, args)
+
+    def is_recording_active(self, preferred_location=None):
+        return self._run_probe("is_recording_active", preferred_location)
+
+    def stop_dictation(self, preferred_location=None):
+        """Stop dictation by clicking Submit dictation button to finish and keep transcribed text."""
+        result = self._run_probe("stop_dictation", preferred_location)
+        logger.debug(f"[stop_dictation] preferred_location={preferred_location}, result={result}")
+        return result
+
+    def cancel_dictation(self, preferred_location=None):
+        return self._run_probe("cancel_dictation", preferred_location)
+
+    def stop_and_collect(
+        self,
+        preferred_location=None,
+        timeout=4.0,
+        pipe_slot=None,
+        pipe_prompt=None,
+        send_timeout=3.0,
+        response_timeout=30.0,
+    ):
+        """Click Submit dictation and start capturing the transcript in the page.
+
+        Returns the same statuses as stop_dictation; poll collect_result()
+        afterwards until the text arrives. With ``pipe_slot`` set the page sends
+        ``pipe_prompt`` + transcript itself (collect_result() then reports
+        SENT); read the reply with response_delta().
+        """
+        args = {"timeout_ms": int(timeout * 1000)}
+        if pipe_slot is not None:
+            args["pipe"] = {
+                "slot": pipe_slot,
+                "prompt": pipe_prompt or "",
+                "send_timeout_ms": int(send_timeout * 1000),
+                "response_timeout_ms": int(response_timeout * 1000),
+            }
+        result = self._run_probe("stop_and_collect", preferred_location, args)
+        logger.debug(f"[stop_and_collect] preferred_location={preferred_location}, result={result}")
+        return result
+
+    def collect_result(self, preferred_location=None, wait=None):
+        """One look at the stop_and_collect job: PENDING, TEXT (with the transcript), SENT, ...
+
+        Over CDP, ``wait`` seconds lets the page hold the call until the job finishes.
+        """
+        args = {"wait_ms": int(wait * 1000)} if wait and self.cdp is not None else None
+        return self._run_probe("collect_result", preferred_location, args)
+
+    def watch_response(self, preferred_location=None, timeout=30.0):
+        """Start following the reply to the next message; call right before sending it."""
+        return self._run_probe("watch_response", preferred_location, {"timeout_ms": int(timeout * 1000)})
+
+    def response_delta(self, offset, preferred_location=None, wait=None):
+        """One read of the watched reply past ``offset``.
+
+        Returns ``(status, end, reset, delta)``; pass ``end`` as the next
+        offset. Status is WAITING or GENERATING while the reply is in progress,
+        then COMPLETE, TIMEOUT, CANCELLED, NO_WATCH or ERROR.
+        """
+        args = {"offset": offset}
+        if wait and self.cdp is not None:
+            args["wait_ms"] = int(wait * 1000)
+        res = self._run_probe("response_delta", preferred_location, args)
+        delta = res.payload
+        if not isinstance(delta, dict) or not isinstance(delta.get("end"), int):
+            if res.status != "NO_WATCH":
+                logger.debug(f"[response_delta] unexpected result: {str(res)[:200]}")
+            return ("NO_WATCH" if res.status == "NO_WATCH" else "ERROR"), offset, False, ""
+        return res.status, delta["end"], bool(delta.get("reset")), str(delta.get("text") or "")
+
+    # ---- Voice Conversation (Advanced Voice Mode) ----
+
+    def start_voice_conversation(self, preferred_location=None):
+        """Click the 'Use Voice' / 'Start Voice' button to start a real-time voice conversation."""
+        return self._run_probe("start_voice_conversation", preferred_location)
+
+    def stop_voice_conversation(self, preferred_location=None):
+        """Stop an active voice conversation by clicking the end/stop button."""
+        return self._run_probe("stop_voice_conversation", preferred_location)
+
+    def is_voice_conversation_active(self, preferred_location=None):
+        """Check if a voice conversation overlay is currently active."""
+        return self._run_probe("is_voice_conversation_active", preferred_location)
+
+    def is_voice_available(self, preferred_location=None):
+        """Check if the 'Use Voice' / 'Start Voice' button is present (requires ChatGPT Plus)."""
+        return self._run_probe("is_voice_available", preferred_location)
+
+    def get_voice_activity_snapshot(self, preferred_location=None):
+        """SNAPSHOT with the latest conversation message texts (a dict) for voice idle detection."""
+        return self._run_probe("get_voice_activity_snapshot", preferred_location)
+
+
+    def pre_fill_prompt(self, prompt, preferred_location=None):
+        """Pre-fill prompt text in the input box using execCommand for better reactivity"""
+        return self._run_probe("pre_fill_prompt", preferred_location, {"text": prompt})
+
+
+    def submit_message(self, preferred_location=None):
+        """Click the send button to submit the message"""
+        return self._run_probe("submit_message", preferred_location)
+
+
+    def is_response_complete(self, preferred_location=None):
+        """Check if AI response is complete (Simpler, more robust version)"""
+        return self._run_probe("is_response_complete", preferred_location)
+
+
+
+    def click_copy_button(self, preferred_location=None):
+        """Extract text content from the last AI response directly (no clipboard API needed)"""
+        return self._run_probe("click_copy_button", preferred_location)
+
+
+
+class GeminiChrome(ChromeController):
+    PROBES = {
+        "is_page_ready": '''
         (function() {
             if (document.readyState !== 'complete') return "PAGE_NOT_READY";
             var btn = document.querySelector('.speech_dictation_mic_button');
             return btn ? "READY" : "BTN_NOT_FOUND";
         })()
-        '''
-        return self._execute_js(js, preferred_location)
-
-    def start_dictation(self, preferred_location=None):
-        js = '''
+        ''',
+        "start_dictation": '''
         (function() {
             var btn = document.querySelector('.speech_dictation_mic_button');
             if (btn) { btn.click(); return "START_DONE"; }
             return "START_BTN_NOT_FOUND";
         })()
-        '''
-        return self._execute_js(js, preferred_location)
-
-    def is_recording_active(self, preferred_location=None):
-        js = '''
+        ''',
+        "is_recording_active": '''
         (function() {
             var micOn = document.querySelector('.speech_dictation_mic_button mat-icon.mic-on');
             return micOn ? "ACTIVE" : "INACTIVE";
         })()
-        '''
-        return self._execute_js(js, preferred_location)
-
-    def stop_dictation(self, preferred_location=None):
-        """Stop dictation - in Gemini, clicking the mic button again stops and submits."""
-        js = '''
+        ''',
+        "stop_dictation": '''
         (function() {
             // Check if mic is actively listening (has mic-on icon)
             var micOn = document.querySelector('.speech_dictation_mic_button mat-icon.mic-on');
@@ -1081,15 +1740,8 @@ class GeminiChrome(ChromeController):
             if (sendBtn) { sendBtn.click(); return "SEND_CLICKED"; }
             return "STOP_BTN_NOT_FOUND";
         })()
-        '''
-        return self._execute_js(js, preferred_location)
-
-    def cancel_dictation(self, preferred_location=None):
-        """Gemini does not support cancel - this is a no-op that returns a status."""
-        return "CANCEL_NOT_SUPPORTED"
-
-    def get_text_and_clear(self, activate_first=True, preferred_location=None):
-        js_code = '''
+        ''',
+        "get_text_and_clear": '''
         (function() {
             try {
                 // Gemini uses .ql-editor with role=textbox
@@ -1128,77 +1780,49 @@ class GeminiChrome(ChromeController):
                     editor.dispatchEvent(new Event('change', { bubbles: true }));
                 } catch(e) {}
 
-                return text;
+                return reply("TEXT", text);
             } catch(err) {
-                return "ERROR:" + err.message;
+                return reply("ERROR", err.message);
             }
         })()
-        '''
-        if not activate_first:
-            return self._execute_js(js_code, preferred_location)
+        ''',
+    }
 
-        if not preferred_location:
-            return "NO_LOCATION"
-        b64_js = base64.b64encode(js_code.encode('utf-8')).decode('utf-8')
-        win_id, tab_idx = preferred_location
+    def __init__(self):
+        super().__init__("Gemini", "gemini.google.com", "Gemini", "https://gemini.google.com/app")
 
-        script = f'''
-        tell application "Google Chrome"
-            set originalWin to front window
-            set originalTabIndex to active tab index of originalWin
+    def ensure_gemini_tab_exists(self):
+        """Create a dedicated Gemini window. Returns status string."""
+        location = self.create_dedicated_window()
+        return "CREATED" if location else "ERROR"
 
-            set targetWin to missing value
-            set targetTab to missing value
-            set targetTabIndex to 0
+    def is_front_tab_gemini(self):
+        """Check if the front tab in Chrome is a Gemini tab. Returns 'YES' or 'NO'."""
+        return "YES" if self.get_front_tab_location() is not None else "NO"
 
-            -- Find window by ID
-            if {win_id} > 0 and {tab_idx} > 0 then
-                try
-                    set targetWinId to {win_id} as integer
-                    repeat with win in windows
-                        set currentWinId to (id of win) as integer
-                        if currentWinId = targetWinId then
-                            set targetWin to win
-                            set targetTab to tab {tab_idx} of targetWin
-                            set targetTabIndex to {tab_idx}
-                            exit repeat
-                        end if
-                    end repeat
-                end try
-            end if
+    def get_gemini_tab_location(self):
+        """Alias for get_tab_location for clarity."""
+        return self.get_tab_location()
 
-            -- Validate the preferred tab is still the right service tab.
-            if targetTab is not missing value then
-                set ptUrl to ""
-                set ptTitle to ""
-                try
-                    set ptUrl to (URL of targetTab) as text
-                end try
-                try
-                    set ptTitle to (title of targetTab) as text
-                end try
-                if not ((ptUrl contains "{self.url_pattern}") or (ptTitle contains "{self.title_pattern}")) then
-                    return "NOT_FOUND"
-                end if
-            end if
+    def get_front_gemini_tab_location(self):
+        """Alias for get_front_tab_location for clarity."""
+        return self.get_front_tab_location()
 
-            if targetTab is missing value then return "NOT_FOUND"
+    def is_page_ready(self, preferred_location=None, diagnostics=False):
+        return self._run_probe("is_page_ready", preferred_location, diagnostics=diagnostics)
 
-            set active tab index of targetWin to targetTabIndex
-            set index of targetWin to 1
-            delay 0.15
-            set res to execute targetTab javascript "eval(decodeURIComponent(escape(window.atob('{b64_js}'))))"
+    def start_dictation(self, preferred_location=None, verify_timeout=None):
+        # Gemini has no page-side start verification; callers check is_recording_active.
+        return self._run_probe("start_dictation", preferred_location)
+
+    def is_recording_active(self, preferred_location=None):
+        return self._run_probe("is_recording_active", preferred_location)
+
+    def stop_dictation(self, preferred_location=None):
+        """Stop dictation - in Gemini, clicking the mic button again stops and submits."""
+        return self._run_probe("stop_dictation", preferred_location)
+
+    def cancel_dictation(self, preferred_location=None):
+        """Gemini does not support cancel - this is a no-op that returns a status."""
+        return PageResult("CANCEL_NOT_SUPPORTED")
 
-            try
-                set index of originalWin to 1
-                set active tab index of originalWin to originalTabIndex
-            end try
-            try
-                if (count of windows) > 1 then
-                    set index of targetWin to (count of windows)
-                end if
-            end try
-            return "SUCCESS:" & res
-        end tell
-        '''
-        return run_applescript(script)
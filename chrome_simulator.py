@@ -0,0 +1,897 @@
+import base64
+import hashlib
+import json
+import random
+import re
+import socket
+import threading
+import time
+
+from applescript_transport import ERROR_PREFIX, AppleScriptTransport
+from page_agent import AGENT_MISSING
+
+_BATCH_PLAN_RE = re.compile(r"var plan = (\{.*?\});")
+_AGENT_INSTALL_RE = re.compile(r"/\* micpipe-agent (\S+) \*/")
+_AGENT_REQUIRE_RE = re.compile(r'agent\.v !== "([^"]+)"')
+_CALL_ARGS_RE = re.compile(r'agent\.call\("[^"]*", (\{.*\}), (?:true|false)\);')
+_CALL_NAME_RE = re.compile(r'agent\.call\("([^"]*)"')
+_TAB_KEY_RE = re.compile(r'window\.__micpipeTabKey = ("[^"]*")')
+# RFC 6455 handshake GUID, kept separate from cdp_transport's so the stand-in checks it.
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# Page responses for a signed-in, idle ChatGPT tab, keyed by probe name: a
+# status, or a (status, payload) pair.
+DEFAULT_PAGE_PROBES = {
+    "is_page_ready": "READY",
+    "start_dictation": "START_DONE",
+    "start_status": "ACTIVE",
+    "is_recording_active": "INACTIVE",
+    "stop_dictation": "SUBMIT_CLICKED",
+    "cancel_dictation": "CANCEL_DONE",
+    "stop_and_collect": "SUBMIT_CLICKED",
+    "collect_result": "TIMEOUT",
+    "start_voice_conversation": "VOICE_START_CLICKED",
+    "stop_voice_conversation": "VOICE_STOP_CLICKED",
+    "is_voice_conversation_active": "INACTIVE",
+    "is_voice_available": "AVAILABLE",
+    "get_voice_activity_snapshot": (
+        "SNAPSHOT",
+        {"active": False, "assistant_text": "", "assistant_count": 0, "user_text": "", "user_count": 0},
+    ),
+    "get_text_and_clear": "EMPTY",
+    "pre_fill_prompt": "FILLED",
+    "submit_message": "SENT",
+    "watch_response": "WATCHING",
+    "response_delta": "NO_WATCH",
+    "is_response_complete": "COMPLETE",
+    "click_copy_button": "NO_RESPONSE",
+}
+
+
+def _envelope(response):
+    """The agent's envelope for a probe response: a status, a (status, payload) pair or an envelope."""
+    if isinstance(response, dict):
+        return response
+    if isinstance(response, tuple):
+        status, payload = response
+        return {"s": status} if payload in (None, "") else {"s": status, "p": payload}
+    return {"s": "NO_RESULT" if response is None else str(response)}
+
+
+class SimClock:
+    """Deterministic clock: time only moves when something sleeps or advances it."""
+
+    def __init__(self, start=0.0):
+        self._now = float(start)
+        self._lock = threading.Lock()
+
+    def now(self):
+        return self._now
+
+    def advance(self, seconds):
+        if seconds > 0:
+            with self._lock:
+                self._now += seconds
+
+    sleep = advance
+
+
+class SimulatedChatGPTPage:
+    """A signed-in ChatGPT page whose behaviour follows ``clock``.
+
+    The page becomes ready ``load`` seconds after it (re)loads; a Dictate
+    click shows the recording UI after ``start`` seconds; the transcript
+    arrives ``transcribe`` seconds after the stop click; an AI Pipe message is
+    sent ``send`` seconds later and its reply streams from ``first_token`` to
+    ``first_token + stream`` seconds after sending. Voice mode connects after
+    ``voice_connect`` seconds. Every delay is scaled by a log-normal factor
+    drawn from ``rng`` (spread ``jitter``), so a seeded run is reproducible.
+    A ``start_failure_rate`` share of Dictate clicks never starts recording.
+
+    Probes it does not model fall back to the tab's static probes.
+    """
+
+    def __init__(
+        self,
+        clock,
+        rng=None,
+        load=2.0,
+        start=0.3,
+        transcribe=0.7,
+        send=0.4,
+        first_token=0.9,
+        stream=1.5,
+        voice_connect=0.8,
+        jitter=0.25,
+        start_failure_rate=0.0,
+        response="Sure. Here is the simulated reply.\nIt streams in sentence by sentence. Done.",
+    ):
+        self.clock = clock
+        self.rng = rng or random.Random(0)
+        self.timing = {
+            "load": load,
+            "start": start,
+            "transcribe": transcribe,
+            "send": send,
+            "first_token": first_token,
+            "stream": stream,
+            "voice_connect": voice_connect,
+        }
+        self.jitter = jitter
+        self.start_failure_rate = start_failure_rate
+        self.response = response
+        self.dictations = 0
+        self.load()
+
+    def _delay(self, name):
+        base = self.timing[name]
+        if not self.jitter:
+            return base
+        return base * self.rng.lognormvariate(0.0, self.jitter)
+
+    def load(self):
+        """(Re)load the page: everything in flight is lost."""
+        self.ready_at = self.clock.now() + self._delay("load")
+        self.recording = False
+        self.recording_at = None  # When the recording UI shows (None: it never will)
+        self.start_watch_until = None
+        self.composer = ""
+        self.composer_at = None
+        self.job = None
+        self.reply = None
+        self.voice_at = None
+
+    def respond(self, probe, args):
+        handler = getattr(self, f"_probe_{probe}", None)
+        if handler is None:
+            return None
+        return handler(self.clock.now(), args or {})
+
+    # ---- Dictation ----
+
+    def _probe_is_page_ready(self, now, _args):
+        return "READY" if now >= self.ready_at else "PAGE_NOT_READY"
+
+    def _probe_start_dictation(self, now, args):
+        if now < self.ready_at:
+            return "START_BTN_NOT_FOUND"
+        self.recording = True
+        fails = self.start_failure_rate and self.rng.random() < self.start_failure_rate
+        self.recording_at = None if fails else now + self._delay("start")
+        verify_ms = args.get("verify_ms")
+        self.start_watch_until = now + verify_ms / 1000.0 if verify_ms else None
+        return "START_DONE"
+
+    def _probe_start_status(self, now, _args):
+        if self.start_watch_until is None:
+            return "NO_WATCH"
+        if self.recording_at is not None and now >= self.recording_at:
+            return "ACTIVE"
+        return "FAILED" if now >= self.start_watch_until else "PENDING"
+
+    def _probe_is_recording_active(self, now, _args):
+        active = self.recording and self.recording_at is not None and now >= self.recording_at
+        return "ACTIVE" if active else "INACTIVE"
+
+    def _stop(self, now):
+        if self._probe_is_recording_active(now, None) != "ACTIVE":
+            return False
+        self.recording = False
+        self.start_watch_until = None
+        self.dictations += 1
+        self.composer = f"Simulated dictation number {self.dictations}."
+        self.composer_at = now + self._delay("transcribe")
+        return True
+
+    def _probe_stop_dictation(self, now, _args):
+        return "SUBMIT_CLICKED" if self._stop(now) else "SUBMIT_BTN_NOT_FOUND"
+
+    def _probe_stop_and_collect(self, now, args):
+        if not self._stop(now):
+            return "SUBMIT_BTN_NOT_FOUND"
+        self.job = {
+            "deadline": now + args.get("timeout_ms", 4000) / 1000.0,
+            "pipe": args.get("pipe"),
+            "sent_at": None,
+        }
+        if self.job["pipe"] is not None:
+            self.job["sent_at"] = self.composer_at + self._delay("send")
+        return "SUBMIT_CLICKED"
+
+    def _probe_collect_result(self, now, _args):
+        job = self.job
+        if job is None:
+            return "NO_JOB"
+        if job["pipe"] is not None:
+            if now < job["sent_at"]:
+                return "PENDING"
+            if self.composer:
+                # The page sends prompt + transcript and follows the reply itself.
+                self._start_reply(job["sent_at"])
+                self.composer = ""
+            return "SENT", job["pipe"].get("slot")
+        if now < self.composer_at:
+            return "TIMEOUT" if now >= job["deadline"] else "PENDING"
+        if self.composer:
+            job["text"], self.composer = self.composer, ""
+        return "TEXT", job.get("text", "")
+
+    def _probe_cancel_dictation(self, _now, _args):
+        if not self.recording:
+            return "CANCEL_BTN_NOT_FOUND"
+        self.recording = False
+        self.recording_at = None
+        self.start_watch_until = None
+        return "CANCEL_DONE"
+
+    def _probe_get_text_and_clear(self, now, _args):
+        if not self.composer or now < self.composer_at:
+            return "EMPTY"
+        text, self.composer = self.composer, ""
+        return "TEXT", text
+
+    # ---- AI Pipe ----
+
+    def _probe_pre_fill_prompt(self, now, args):
+        self.composer = args.get("text", "")
+        self.composer_at = now
+        return "FILLED"
+
+    def _probe_watch_response(self, _now, _args):
+        self.reply = {"started_at": None}
+        return "WATCHING"
+
+    def _probe_submit_message(self, now, _args):
+        if not self.composer:
+            return "SEND_BTN_DISABLED"
+        self.composer = ""
+        self._start_reply(now)
+        return "SENT"
+
+    def _start_reply(self, sent_at):
+        first = sent_at + self._delay("first_token")
+        self.reply = {"started_at": first, "done_at": first + self._delay("stream")}
+
+    def _probe_response_delta(self, now, args):
+        reply = self.reply
+        if reply is None:
+            return "NO_WATCH"
+        offset = int(args.get("offset", 0))
+        if reply["started_at"] is None or now < reply["started_at"]:
+            return "WAITING", {"end": offset, "reset": False, "text": ""}
+        if now >= reply["done_at"]:
+            status, text = "COMPLETE", self.response
+        else:
+            share = (now - reply["started_at"]) / (reply["done_at"] - reply["started_at"])
+            status, text = "GENERATING", self.response[:int(len(self.response) * share)]
+        reset = offset > len(text)
+        return status, {"end": len(text), "reset": reset, "text": text[0 if reset else offset:]}
+
+    # ---- Voice ----
+
+    def _probe_start_voice_conversation(self, now, _args):
+        if now < self.ready_at:
+            return "VOICE_BTN_NOT_FOUND"
+        self.voice_at = now + self._delay("voice_connect")
+        return "VOICE_START_CLICKED"
+
+    def _probe_is_voice_conversation_active(self, now, _args):
+        return "ACTIVE" if self.voice_at is not None and now >= self.voice_at else "INACTIVE"
+
+    def _probe_stop_voice_conversation(self, _now, _args):
+        if self.voice_at is None:
+            return "VOICE_STOP_BTN_NOT_FOUND"
+        self.voice_at = None
+        return "VOICE_STOP_CLICKED"
+
+
+class FakeTab:
+    """A tab whose page answers probes from ``probes`` (a value or ``callable(js)``).
+
+    Answers are wrapped in the page agent's JSON envelope, as the real agent does.
+
+    With a ``page`` (e.g. SimulatedChatGPTPage) the page answers the probes it
+    models first, given the call's arguments. The tab also tracks which page
+    agent version is installed; calls that require a different version answer
+    ``AGENT_MISSING`` until the agent is injected, and a reload removes it.
+    """
+
+    def __init__(self, tab_id, url, title="", probes=None, page=None):
+        self.id = tab_id
+        self.url = url
+        self.title = title
+        self.probes = dict(DEFAULT_PAGE_PROBES if probes is None else probes)
+        self.page = page
+        self.reload_count = 0
+        self.executed = []
+        self.agent_version = None
+        self.agent_installs = 0
+        self.tab_key = None  # window.__micpipeTabKey, set when MicPipe tags its CDP target
+
+    def reload(self):
+        self.reload_count += 1
+        self.agent_version = None
+        self.tab_key = None
+        if self.page is not None:
+            self.page.load()
+
+    def matches(self, url_pattern, title_pattern):
+        return url_pattern in self.url or title_pattern in self.title
+
+    def execute(self, probe, js):
+        tagged = _TAB_KEY_RE.search(js)
+        if tagged:
+            self.tab_key = json.loads(tagged.group(1))
+            return json.dumps({"s": "TAGGED"})
+        installed = _AGENT_INSTALL_RE.search(js)
+        if installed:
+            self.agent_version = installed.group(1)
+            self.agent_installs += 1
+        required = _AGENT_REQUIRE_RE.search(js)
+        if required and required.group(1) != self.agent_version:
+            return json.dumps({"s": AGENT_MISSING})
+        if probe.startswith("batch"):
+            return self._execute_batch(js)
+        m = _CALL_ARGS_RE.search(js)
+        return json.dumps(self._run(probe, js, json.loads(m.group(1)) if m else None))
+
+    def _run(self, probe, js, args=None):
+        self.executed.append(probe)
+        response = self.page.respond(probe, args) if self.page is not None else None
+        if response is None:
+            response = self.probes.get(probe, "")
+            if callable(response):
+                response = response(js)
+        return _envelope(response)
+
+    def _execute_batch(self, js):
+        m = _BATCH_PLAN_RE.search(js)
+        if not m:
+            return "missing value"
+        plan = json.loads(m.group(1))
+        args = plan.get("args") or [None] * len(plan["ops"])
+        out = []
+        for name, expect, op_args in zip(plan["ops"], plan["expect"], args):
+            result = self._run(name, js, op_args)
+            out.append(result)
+            if expect and result["s"] not in expect:
+                break
+        return json.dumps({"s": "BATCH", "p": out})
+
+
+class FakeWindow:
+    def __init__(self, window_id, bounds=(0, 0, 800, 600)):
+        self.id = window_id
+        self.bounds = tuple(bounds)
+        self.tabs = []
+        self.active_tab_index = 1
+
+
+class FakeChrome(AppleScriptTransport):
+    """In-memory Chrome that implements the ``run_applescript`` contract.
+
+    Install it with ``chrome_script.set_transport(FakeChrome())`` to exercise
+    every ``ChromeController`` method without macOS. Calls are dispatched on
+    the operation name and arguments passed by the controller, recorded in
+    ``calls``, and can be slowed down with ``latency`` for benchmarking.
+
+    ``apple_events`` approximates the Apple events each script sends: one per
+    call, plus one per open window when the script walks ``windows``. Each
+    event costs ``event_latency`` seconds.
+
+    With a ``clock`` (SimClock) that time is added to the clock instead of
+    slept, and ``page_factory(url)`` can give each new tab a simulated page.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency=0.0, page_probes=None, event_latency=0.0, clock=None, page_factory=None):
+        self.latency = latency
+        self.event_latency = event_latency
+        self.page_probes = page_probes
+        self.clock = clock
+        self.page_factory = page_factory
+        self.windows = []  # Front-to-back order, like Chrome's "index".
+        self.calls = []
+        self.activations = 0
+        self.apple_events = 0
+        self._next_window_id = 1000
+        self._next_tab_id = 1
+        self._lock = threading.Lock()
+
+    # ---- Model helpers ----
+
+    def add_window(self, urls=("https://example.com",), titles=None, bounds=(0, 0, 800, 600), front=True):
+        """Create a window with one tab per URL and return it."""
+        window = FakeWindow(self._next_window_id, bounds)
+        self._next_window_id += 1
+        for i, url in enumerate(urls):
+            title = titles[i] if titles else ""
+            page = self.page_factory(url) if self.page_factory is not None else None
+            window.tabs.append(FakeTab(self._next_tab_id, url, title, self.page_probes, page))
+            self._next_tab_id += 1
+        if front:
+            self.windows.insert(0, window)
+        else:
+            self.windows.append(window)
+        return window
+
+    def find_window(self, window_id):
+        for window in self.windows:
+            if window.id == window_id:
+                return window
+        return None
+
+    def tab_at(self, window_id, tab_index):
+        window = self.find_window(window_id)
+        if window is None or not (1 <= tab_index <= len(window.tabs)):
+            return None
+        return window.tabs[tab_index - 1]
+
+    def find_tab(self, window_id, tab_id):
+        window = self.find_window(window_id)
+        if window is None:
+            return None
+        for tab in window.tabs:
+            if tab.id == tab_id:
+                return tab
+        return None
+
+    def call_count(self, name=None):
+        if name is None:
+            return len(self.calls)
+        return sum(1 for call_name, _ in self.calls if call_name == name)
+
+    # ---- Transport ----
+
+    def run(self, script, name=None, args=()):
+        events = 1 + (len(self.windows) if "repeat with win in windows" in (script or "") else 0)
+        with self._lock:
+            self.calls.append((name, tuple(args)))
+            self.apple_events += events
+        if self.latency or self.event_latency:
+            (self.clock.sleep if self.clock is not None else time.sleep)(
+                self.latency + events * self.event_latency
+            )
+        op, _, probe = (name or "").partition(":")
+        handler = getattr(self, f"_op_{op}", None)
+        if handler is None:
+            return f"{ERROR_PREFIX}-2741:FakeChrome does not support {name or 'anonymous scripts'}"
+        with self._lock:
+            return handler(probe, *args)
+
+    def _op_create_dedicated_window(self, _probe, left, top, right, bottom, url):
+        if not self.windows:
+            self.add_window()
+        window = self.add_window(urls=(url,), bounds=(left, top, right, bottom))
+        if len(self.windows) > 1:
+            self.windows.remove(window)
+            self.windows.append(window)
+        return f"WIN_ID:{window.id},TAB:{window.tabs[0].id}"
+
+    def _op_is_window_alive(self, _probe, win_id, tab_id, url_pattern, title_pattern):
+        if not self.windows:
+            return "NO_WINDOW"
+        if self.find_window(win_id) is None:
+            return "NOT_FOUND"
+        tab = self.find_tab(win_id, tab_id)
+        if tab is None:
+            return "TAB_NOT_FOUND"
+        return "OK" if tab.matches(url_pattern, title_pattern) else "MISMATCH"
+
+    def _op_reveal_window(self, _probe, win_id, left, top, right, bottom):
+        if not self.windows:
+            return "NO_WINDOW"
+        window = self.find_window(win_id)
+        if window is None:
+            return "NOT_FOUND"
+        window.bounds = (left, top, right, bottom)
+        self.windows.remove(window)
+        self.windows.insert(0, window)
+        self.activations += 1
+        return "OK"
+
+    def _op_set_window_bounds(self, _probe, win_id, left, top, right, bottom):
+        if not self.windows:
+            return "NO_WINDOW"
+        window = self.find_window(win_id)
+        if window is None:
+            return "NOT_FOUND"
+        window.bounds = (left, top, right, bottom)
+        return "OK"
+
+    def _op_demote_window(self, _probe, win_id):
+        if len(self.windows) < 2:
+            return "SKIP"
+        window = self.find_window(win_id)
+        if window is None:
+            return "NOT_FOUND"
+        self.windows.remove(window)
+        self.windows.append(window)
+        return "OK"
+
+    def _op_reload_tab(self, _probe, win_id, tab_id):
+        if not self.windows:
+            return "NO_WINDOW"
+        if self.find_window(win_id) is None:
+            return "NOT_FOUND"
+        tab = self.find_tab(win_id, tab_id)
+        if tab is None:
+            return "TAB_NOT_FOUND"
+        tab.reload()
+        return "RELOADED"
+
+    def _op_close_window(self, _probe, win_id):
+        if not self.windows:
+            return "NO_WINDOW"
+        window = self.find_window(win_id)
+        if window is None:
+            return "NOT_FOUND"
+        self.windows.remove(window)
+        return "CLOSED"
+
+    def _op_get_tab_location(self, _probe, url_pattern, title_pattern):
+        for window in self.windows:
+            for tab in window.tabs:
+                if tab.matches(url_pattern, title_pattern):
+                    return f"WIN_ID:{window.id},TAB:{tab.id}"
+        return "NOT_FOUND"
+
+    def _op_get_front_tab_location(self, _probe, url_pattern, title_pattern):
+        if not self.windows:
+            return "NOT_FOUND"
+        window = self.windows[0]
+        tab = self.tab_at(window.id, window.active_tab_index)
+        if tab is not None and tab.matches(url_pattern, title_pattern):
+            return f"WIN_ID:{window.id},TAB:{tab.id}"
+        return "NOT_MATCHED"
+
+    def _op_resolve_tab_id(self, _probe, win_id, tab_idx):
+        tab = self.tab_at(win_id, tab_idx)
+        return f"WIN_ID:{win_id},TAB:{tab.id}" if tab is not None else "NOT_FOUND"
+
+    def _op_execute_js(self, probe, win_id, tab_id, url_pattern, title_pattern, js):
+        if not self.windows:
+            return "NO_WINDOW"
+        if win_id <= 0 or tab_id <= 0:
+            return "NO_LOCATION"
+        tab = self.find_tab(win_id, tab_id)
+        if tab is None or not tab.matches(url_pattern, title_pattern):
+            return "NOT_FOUND"
+        return tab.execute(probe, js)
+
+    def _op_execute_js_multi(self, probe, url_pattern, title_pattern, *targets):
+        if not self.windows:
+            return "NO_WINDOW"
+        parts = []
+        for i in range(0, len(targets), 3):
+            win_id, tab_id, js = targets[i:i + 3]
+            tab = self.find_tab(win_id, tab_id)
+            if tab is None or not tab.matches(url_pattern, title_pattern):
+                parts.append("NOT_FOUND")
+                continue
+            parts.append(tab.execute(probe, js))
+        return chr(31).join(parts)
+
+    def _op_activate_and_execute_js(self, probe, win_id, tab_id, url_pattern, title_pattern, js):
+        tab = self.find_tab(win_id, tab_id)
+        if tab is None or not tab.matches(url_pattern, title_pattern):
+            return "NOT_FOUND"
+        self.activations += 1
+        return tab.execute(probe, js)
+
+
+class FakeDevTools:
+    """Stand-in for Chrome's DevTools endpoint (``--remote-debugging-port``) over a FakeChrome.
+
+    Serves ``/json`` and ``/json/list`` with one page target per tab and
+    answers ``Runtime.evaluate`` on each target's WebSocket by running the
+    expression in the tab, like FakeChrome does for AppleScript's "execute
+    javascript". Point a CDPTransport at ``port`` after ``start``. Only the
+    standard library is used, so it runs anywhere.
+
+    ``drop_sessions`` closes the open WebSockets, as Chrome does when a tab
+    navigates or the browser restarts; with ``reject_handshake`` new
+    WebSockets are closed before the handshake completes.
+    """
+
+    def __init__(self, chrome, host="127.0.0.1", latency=0.0):
+        self.chrome = chrome
+        self.host = host
+        self.latency = latency
+        self.port = None
+        self.reject_handshake = False
+        self.calls = []  # (tab id, CDP method)
+        self._listener = None
+        self._sessions = set()
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._listener = socket.create_server((self.host, 0))
+        self.port = self._listener.getsockname()[1]
+        threading.Thread(target=self._accept, name="fake-devtools", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+        self.drop_sessions()
+
+    def drop_sessions(self):
+        with self._lock:
+            sessions, self._sessions = list(self._sessions), set()
+        for conn in sessions:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            conn.close()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._listener.accept()
+            except (OSError, AttributeError):
+                return  # Stopped.
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _targets(self):
+        with self.chrome._lock:
+            tabs = [tab for window in self.chrome.windows for tab in window.tabs]
+        return [
+            {
+                "id": str(tab.id),
+                "type": "page",
+                "url": tab.url,
+                "title": tab.title,
+                "webSocketDebuggerUrl": f"ws://{self.host}:{self.port}/devtools/page/{tab.id}",
+            }
+            for tab in tabs
+        ]
+
+    def _serve(self, conn):
+        with conn:
+            f = conn.makefile("rb")
+            request_line = f.readline().decode("latin-1").split()
+            headers = {}
+            for line in iter(f.readline, b"\r\n"):
+                if not line:
+                    return
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            path = request_line[1] if len(request_line) > 1 else ""
+            if path.split("?")[0] in ("/json", "/json/list"):
+                body = json.dumps(self._targets()).encode("utf-8")
+                conn.sendall(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("ascii")
+                    + body
+                )
+                return
+            tab = self._find_tab(path)
+            if tab is None or headers.get("upgrade", "").lower() != "websocket":
+                conn.sendall(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                return
+            if self.reject_handshake:
+                return
+            accept = base64.b64encode(
+                hashlib.sha1((headers.get("sec-websocket-key", "") + _WS_GUID).encode("ascii")).digest()
+            ).decode("ascii")
+            conn.sendall(
+                "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode("ascii")
+            )
+            with self._lock:
+                self._sessions.add(conn)
+            try:
+                self._session(conn, f, tab)
+            except (OSError, ValueError):
+                pass  # Dropped, or a frame we do not model.
+            finally:
+                with self._lock:
+                    self._sessions.discard(conn)
+
+    def _find_tab(self, path):
+        prefix = "/devtools/page/"
+        if not path.startswith(prefix):
+            return None
+        with self.chrome._lock:
+            for window in self.chrome.windows:
+                for tab in window.tabs:
+                    if str(tab.id) == path[len(prefix):]:
+                        return tab
+        return None
+
+    def _session(self, conn, f, tab):
+        while True:
+            opcode, payload = _read_client_frame(f)
+            if opcode == 0x8:
+                return
+            if opcode == 0x9:
+                _send_server_frame(conn, 0xA, payload)
+                continue
+            if opcode != 0x1:
+                continue
+            message = json.loads(payload.decode("utf-8"))
+            method = message.get("method")
+            with self._lock:
+                self.calls.append((tab.id, method))
+            if self.latency:
+                time.sleep(self.latency)
+            if method == "Runtime.evaluate":
+                value = self._evaluate(tab, (message.get("params") or {}).get("expression", ""))
+                reply = {"id": message.get("id"), "result": {"result": {"type": "string", "value": value}}}
+            else:
+                reply = {"id": message.get("id"), "error": {"code": -32601, "message": f"'{method}' wasn't found"}}
+            _send_server_frame(conn, 0x1, json.dumps(reply).encode("utf-8"))
+
+    def _evaluate(self, tab, expression):
+        if expression.strip() == "window.__micpipeTabKey":
+            return tab.tab_key
+        if _BATCH_PLAN_RE.search(expression):
+            probe = "batch"
+        else:
+            m = _CALL_NAME_RE.search(expression)
+            probe = m.group(1) if m else "js"
+        with self.chrome._lock:
+            return tab.execute(probe, expression)
+
+
+def _read_client_frame(f):
+    """One (opcode, payload) WebSocket frame from a client; client frames are masked."""
+    head = f.read(2)
+    if len(head) < 2:
+        raise ValueError("connection closed")
+    opcode = head[0] & 0x0F
+    length = head[1] & 0x7F
+    if length == 126:
+        length = int.from_bytes(f.read(2), "big")
+    elif length == 127:
+        length = int.from_bytes(f.read(8), "big")
+    key = f.read(4) if head[1] & 0x80 else b"\0\0\0\0"
+    payload = f.read(length)
+    return opcode, bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+
+
+def _send_server_frame(conn, opcode, payload):
+    header = bytearray([0x80 | opcode])
+    n = len(payload)
+    if n < 126:
+        header.append(n)
+    elif n < (1 << 16):
+        header.append(126)
+        header += n.to_bytes(2, "big")
+    else:
+        header.append(127)
+        header += n.to_bytes(8, "big")
+    conn.sendall(bytes(header) + payload)
+
+
+def benchmark_window_scaling(window_counts=(1, 10, 30, 100), tabs_per_window=10, calls=50, event_latency=0.0002):
+    """Measure per-call cost of dedicated-tab operations as unrelated windows pile up.
+
+    Returns one dict per window count with the mean wall time (ms) and modeled
+    Apple events per call for addressed operations and for the discovery scan.
+    """
+    import chrome_script
+
+    previous = None
+    rows = []
+    try:
+        for count in window_counts:
+            chrome = FakeChrome(event_latency=event_latency)
+            replaced = chrome_script.set_transport(chrome)
+            if previous is None:
+                previous = replaced
+            controller = chrome_script.ChatGPTChrome()
+            for _ in range(count):
+                chrome.add_window(urls=["https://example.com"] * tabs_per_window, front=False)
+            location = controller.create_dedicated_window()
+            # Move the dedicated tab so stale indexes would point elsewhere.
+            window = chrome.find_window(location[0])
+            window.tabs.insert(0, FakeTab(-1, "https://example.com"))
+
+            row = {"windows": len(chrome.windows)}
+            for label, op in (
+                ("execute_js", lambda: controller.is_page_ready(preferred_location=location)),
+                ("is_window_alive", lambda: controller.is_window_alive(*location)),
+                ("get_tab_location", controller.get_tab_location),
+            ):
+                events_before = chrome.apple_events
+                start = time.perf_counter()
+                for _ in range(calls):
+                    op()
+                row[f"{label}_ms"] = (time.perf_counter() - start) * 1000 / calls
+                row[f"{label}_events"] = (chrome.apple_events - events_before) / calls
+            rows.append(row)
+    finally:
+        chrome_script.set_transport(previous)
+    return rows
+
+
+def check_cdp_transport(calls=50):
+    """Exercise CDPTransport against a FakeDevTools endpoint and time its round trip.
+
+    A second ChatGPT tab is open, so MicPipe has to tag its dedicated tab over
+    AppleScript before it attaches. Checks that page calls and batches over
+    CDP reach the dedicated tab and answer as they do over AppleScript, that
+    a dropped session is re-attached, and that a handshake the endpoint hangs
+    up on fails without leaking the socket. Returns a dict with the mean
+    milliseconds per page call over CDP (``cdp_ms``: a loopback WebSocket
+    round trip plus JSON, with no browser behind it) and the failed checks.
+    """
+    import gc
+    import warnings
+
+    import chrome_script
+    from cdp_transport import CDPError, CDPSession, CDPTransport
+
+    chrome = FakeChrome()
+    chrome.add_window()
+    other = chrome.add_window(urls=("https://chatgpt.com/",), front=False).tabs[0]
+    server = FakeDevTools(chrome).start()
+    previous = chrome_script.set_transport(chrome)
+    controller = chrome_script.ChatGPTChrome()
+    result = {"calls": calls, "failures": []}
+    failures = result["failures"]
+    try:
+        location = controller.create_dedicated_window()
+        tab = chrome.find_tab(*location)
+
+        def probe():
+            status = controller.is_page_ready(preferred_location=location)
+            batch = controller.run_batch(["is_page_ready", "is_recording_active"], location)
+            return (status.status, status.location), [r.status for r in batch]
+
+        expected = probe()
+        applescript_calls = chrome.call_count()
+        controller.set_js_backend(CDPTransport(server.port, timeout=2.0))
+        got = probe()
+        start = time.perf_counter()
+        for _ in range(calls):
+            controller.is_page_ready(preferred_location=location)
+        result["cdp_ms"] = (time.perf_counter() - start) * 1000 / calls
+        if got != expected:
+            failures.append(f"CDP answered {got}, AppleScript {expected}")
+        if sum(1 for tab_id, _ in server.calls if tab_id == tab.id) < calls + 1:
+            failures.append("page calls did not reach the dedicated tab over CDP")
+        if other.executed:
+            failures.append(f"the other ChatGPT tab ran {other.executed}")
+        if chrome.call_count() - applescript_calls > 1:
+            # Only the tag_cdp_target call may still use AppleScript.
+            failures.append(f"{chrome.call_count() - applescript_calls} AppleScript calls while on CDP")
+
+        server.drop_sessions()
+        controller.is_page_ready(preferred_location=location)  # Fails on the dropped session.
+        status = controller.is_page_ready(preferred_location=location)
+        if (status.status, status.location) != expected[0]:
+            failures.append("not re-attached after the session was dropped")
+
+        server.reject_handshake = True
+        target = next(t for t in server._targets() if t["id"] == str(tab.id))
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always", ResourceWarning)
+            try:
+                CDPSession(target["webSocketDebuggerUrl"], timeout=2.0)
+                failures.append("a rejected handshake did not raise CDPError")
+            except CDPError:
+                pass
+            gc.collect()
+        if any(issubclass(w.category, ResourceWarning) for w in caught):
+            failures.append("a rejected handshake leaked its socket")
+    finally:
+        controller.set_js_backend(None)
+        server.stop()
+        chrome_script.set_transport(previous)
+    return result
+
+
+if __name__ == "__main__":
+    for row in benchmark_window_scaling():
+        print(
+            f"windows={row['windows']:4d}  "
+            f"execute_js={row['execute_js_ms']:.2f}ms/{row['execute_js_events']:.0f}ev  "
+            f"is_window_alive={row['is_window_alive_ms']:.2f}ms/{row['is_window_alive_events']:.0f}ev  "
+            f"get_tab_location={row['get_tab_location_ms']:.2f}ms/{row['get_tab_location_events']:.0f}ev"
+        )
@@ -0,0 +1,212 @@
+import argparse
+import json
+import os
+import sys
+
+# Per-user state directory shared with the running app (see MicPipeApp.state_path).
+STATE_DIR = os.path.join(os.path.expanduser("~"), "Library", "Application Support", "MicPipe")
+
+
+def _socket_path():
+    from control_socket import SOCKET_NAME
+
+    return os.path.join(STATE_DIR, SOCKET_NAME)
+
+
+def _send_cmd(cmd: str):
+    """Send a command to the running MicPipe instance via command file (apps without a control socket)."""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    cmd_path = os.path.join(STATE_DIR, "cmd")
+    temp_path = f"{cmd_path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        f.write(cmd)
+    os.replace(temp_path, cmd_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="micpipe",
+        description="MicPipe menubar app and CLI control for voice conversation.",
+        epilog=(
+            "Examples:\n"
+            "  micpipe\n"
+            "  micpipe --debug\n"
+            "  micpipe stats\n"
+            "  micpipe bench --runs 50\n"
+            "  micpipe bench --startup\n"
+            "  micpipe bench --cdp\n"
+            "  micpipe status\n"
+            "  micpipe events\n"
+            "  micpipe voice start\n"
+            "  micpipe voice stop --wait\n"
+            "  micpipe voice toggle"
+        ),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--debug", action="store_true", help="Run the app with debug logging and a visible Chrome window")
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+
+    subparsers.add_parser(
+        "stats",
+        help="Show dictation latency percentiles",
+        description="Print p50/p95/p99 latency per pipeline phase and service, as recorded by the app.",
+    )
+
+    bench_parser = subparsers.add_parser(
+        "bench",
+        help="Benchmark the app flows offline against a simulated Chrome",
+        description=(
+            "Run the dictation, AI Pipe and voice flows against a simulated Chrome and "
+            "macOS on a virtual clock, and print latency percentiles and throughput. "
+            "Runs on any platform; nothing on this machine is touched."
+        ),
+    )
+    bench_parser.add_argument("--runs", type=int, default=20, help="Measured runs per flow (default: 20)")
+    bench_parser.add_argument("--seed", type=int, default=0, help="Seed of the simulated timings (default: 0)")
+    bench_parser.add_argument(
+        "--calls", action="store_true", help="Also print the Chrome calls made per user action"
+    )
+    bench_parser.add_argument(
+        "--startup",
+        action="store_true",
+        help="Instead of the flows, measure how long the CLI entry points take to import",
+    )
+    bench_parser.add_argument(
+        "--cdp",
+        action="store_true",
+        help="Instead of the flows, check and time the CDP transport against a local stand-in DevTools server",
+    )
+    bench_parser.add_argument(
+        "--flow",
+        action="append",
+        choices=["dictation", "pipe", "voice"],
+        help="Flow to run; repeat for several (default: all)",
+    )
+
+    subparsers.add_parser(
+        "status",
+        help="Show the state of the running MicPipe app",
+        description="Ask the running MicPipe app for its state over its control socket.",
+    )
+    subparsers.add_parser(
+        "events",
+        help="Print state changes of the running MicPipe app",
+        description="Print one JSON line per state change of the running MicPipe app until interrupted.",
+    )
+
+    voice_parser = subparsers.add_parser(
+        "voice",
+        help="Control the running MicPipe voice conversation",
+        description="Send a voice conversation command to the running MicPipe app.",
+    )
+    voice_parser.add_argument(
+        "voice_action",
+        nargs="?",
+        default="toggle",
+        choices=["toggle", "start", "stop", "end"],
+        metavar="action",
+        help="Voice action: start/stop are idempotent, toggle flips the current state",
+    )
+    voice_parser.add_argument(
+        "--wait", action="store_true", help="Return once the voice conversation has started or stopped"
+    )
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        from latency_stats import LatencyRecorder
+
+        print(LatencyRecorder(os.path.join(STATE_DIR, "latency_stats.json")).format_table())
+        return
+
+    if args.command == "bench" and args.startup:
+        import startup_bench
+
+        report = startup_bench.run_benchmark(args.runs)
+        print(report.format())
+        if report.violations:
+            raise SystemExit(1)
+        return
+
+    if args.command == "bench" and args.cdp:
+        import chrome_simulator
+
+        result = chrome_simulator.check_cdp_transport(args.runs)
+        print(f"MicPipe CDP transport: {result['calls']} page calls against a stand-in DevTools server")
+        print(f"  {result['cdp_ms']:.2f}ms/call: CDPTransport's own cost (loopback WebSocket and JSON, no browser)")
+        if result["failures"]:
+            print(f"\n{len(result['failures'])} failed check(s):")
+            for failure in result["failures"]:
+                print(f"  {failure}")
+            raise SystemExit(1)
+        return
+
+    if args.command == "bench":
+        import logging
+
+        import flow_bench
+
+        logging.basicConfig(level=logging.DEBUG if args.debug else logging.ERROR)
+        report = flow_bench.run_benchmark(args.runs, tuple(args.flow or flow_bench.FLOWS), args.seed)
+        print(report.format())
+        if args.calls:
+            print()
+            print(report.format_calls())
+        if report.violations:
+            raise SystemExit(1)
+        return
+
+    if args.command in ("status", "events", "voice"):
+        import control_socket
+
+        try:
+            if args.command == "status":
+                status = control_socket.request(_socket_path(), "status")["status"]
+                print(", ".join(f"{key}: {value}" for key, value in status.items()))
+            elif args.command == "events":
+                try:
+                    for event in control_socket.subscribe(_socket_path()):
+                        print(json.dumps(event), flush=True)
+                except KeyboardInterrupt:
+                    pass
+            else:
+                action = "stop" if args.voice_action == "end" else args.voice_action
+                try:
+                    reply = control_socket.request(
+                        _socket_path(), "voice", timeout=60.0 if args.wait else control_socket.CLIENT_TIMEOUT_SECONDS,
+                        action=action, wait=args.wait,
+                    )
+                except control_socket.ControlUnavailable:
+                    # No control socket (e.g. an older app); the app polls this file.
+                    _send_cmd(f"voice-{action}")
+                    print(f"Sent voice-{action} command to MicPipe.")
+                    return
+                print(f"MicPipe: voice {reply['action']} ({reply['status']['state']})")
+        except control_socket.ControlUnavailable:
+            print("MicPipe is not running.", file=sys.stderr)
+            raise SystemExit(1)
+        except (control_socket.ControlError, OSError) as e:
+            print(f"MicPipe: {e}", file=sys.stderr)
+            raise SystemExit(1)
+        return
+
+    # One app per user: take the lock before the app touches Chrome or its state.
+    from control_socket import LOCK_NAME, InstanceLock
+
+    instance_lock = InstanceLock(os.path.join(STATE_DIR, LOCK_NAME))
+    if not instance_lock.acquire():
+        print("MicPipe is already running.", file=sys.stderr)
+        import rumps
+
+        rumps.alert("MicPipe", "MicPipe is already running. Use the menu bar icon of the running app.")
+        raise SystemExit(1)
+
+    # Only the menu bar app needs the macOS frameworks.
+    from micpipe import MicPipeApp, configure_logging
+
+    configure_logging(args.debug)
+    app = MicPipeApp(debug=args.debug, instance_lock=instance_lock)
+    app.run_app()
+
+
+if __name__ == "__main__":
+    main()
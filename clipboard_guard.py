@@ -1,50 +1,310 @@
+"""Snapshot and restore of the general pasteboard around a paste.
+
+A snapshot is taken right before MicPipe overwrites the clipboard, and only
+when the pasteboard changed since the last one (its change count moved);
+otherwise the last snapshot is reused. Snapshots keep at most
+MEMORY_LIMIT_BYTES of pasteboard data in memory; larger payloads (a copied
+image or file) are spilled to a memory-mapped temp file.
+
+The text MicPipe pastes can be written as a promise (``on_read``): the
+pasteboard asks MicPipe for it when the target app reads it, which tells the
+paste path that the clipboard may be restored.
+
+The pasteboard itself is behind a PasteboardBackend: AppKitPasteboard on
+macOS, MemoryPasteboard for tests and other platforms.
+"""
+import logging
+import mmap
+import tempfile
+import threading
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Pasteboard bytes a snapshot keeps in memory; the rest is spilled to disk.
+MEMORY_LIMIT_BYTES = 1024 * 1024
+
+
+class PasteboardBackend:
+    """The pasteboard operations the clipboard guard needs."""
+
+    def change_count(self) -> int:
+        raise NotImplementedError
+
+    def types(self) -> List[str]:
+        raise NotImplementedError
+
+    def data_for_type(self, pb_type) -> Optional[memoryview]:
+        """The raw bytes of one type, or None when it does not materialize."""
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def set_data(self, pb_type, data) -> None:
+        """Set one type from a bytes-like object."""
+        raise NotImplementedError
+
+    def write_text(self, text, on_read=None) -> bool:
+        """Replace the contents with ``text``.
+
+        With ``on_read`` the text is promised instead and ``on_read()`` runs
+        when another app first reads it; returns whether it was promised.
+        """
+        raise NotImplementedError
+
+
+_provider_class = None
+
+
+def _text_provider_class():
+    """NSPasteboardItem data provider that hands out one text and reports the read."""
+    global _provider_class
+    if _provider_class is None:
+        from Foundation import NSObject
+
+        class MicPipeTextProvider(NSObject):
+            def pasteboard_item_provideDataForType_(self, pasteboard, item, pb_type):
+                item.setString_forType_(self.text, pb_type)
+                on_read, self.on_read = self.on_read, None
+                if on_read is not None:
+                    on_read()
+
+            def pasteboardFinishedWithDataProvider_(self, pasteboard):
+                pass
+
+        _provider_class = MicPipeTextProvider
+    return _provider_class
+
+
+class AppKitPasteboard(PasteboardBackend):
+    """NSPasteboard.generalPasteboard()."""
+
+    def __init__(self):
+        from AppKit import NSPasteboard
+
+        self._pb = NSPasteboard.generalPasteboard()
+
+    def change_count(self):
+        return int(self._pb.changeCount())
+
+    def types(self):
+        return [str(t) for t in self._pb.types() or []]
+
+    def data_for_type(self, pb_type):
+        data = self._pb.dataForType_(pb_type)
+        # NSData exposes its bytes as a buffer: no copy until they are stored.
+        return None if data is None else memoryview(data)
+
+    def clear(self):
+        self._pb.clearContents()
+
+    def set_data(self, pb_type, data):
+        self._pb.setData_forType_(data if isinstance(data, bytes) else bytes(data), pb_type)
+
+    def write_text(self, text, on_read=None):
+        if on_read is not None:
+            try:
+                from AppKit import NSPasteboardItem, NSPasteboardTypeString
+
+                provider = _text_provider_class().alloc().init()
+                provider.text = text
+                provider.on_read = on_read
+                item = NSPasteboardItem.alloc().init()
+                if item.setDataProvider_forTypes_(provider, [NSPasteboardTypeString]):
+                    self._pb.clearContents()
+                    if self._pb.writeObjects_([item]):
+                        # The pasteboard does not retain the provider for us.
+                        self._provider = provider
+                        return True
+            except Exception as e:
+                logger.debug(f"Could not promise clipboard text: {e}")
+        self._pb.clearContents()
+        self._pb.writeObjects_([text])
+        return False
 
-from AppKit import NSPasteboard
+
+class MemoryPasteboard(PasteboardBackend):
+    """In-memory pasteboard: ``{type: bytes}`` plus a change count, like NSPasteboard's."""
+
+    TEXT_TYPE = "public.utf8-plain-text"
+
+    def __init__(self, items=None, promises=True):
+        self.data = dict(items or {})
+        self._change_count = 0
+        self.reads = 0  # dataForType calls, to check that snapshots are skipped
+        self.promises = promises
+        self._on_read = None
+
+    def change_count(self):
+        return self._change_count
+
+    def types(self):
+        return list(self.data)
+
+    def data_for_type(self, pb_type):
+        self.reads += 1
+        raw = self.data.get(pb_type)
+        if raw is not None and pb_type == self.TEXT_TYPE and self._on_read is not None:
+            on_read, self._on_read = self._on_read, None
+            on_read()
+        return None if raw is None else memoryview(raw)
+
+    def read_text(self):
+        """Read the text the way a target app's paste does."""
+        raw = self.data_for_type(self.TEXT_TYPE)
+        return None if raw is None else raw.tobytes().decode("utf-8")
+
+    def clear(self):
+        self.data = {}
+        self._on_read = None
+        self._change_count += 1
+
+    def set_data(self, pb_type, data):
+        self.data[pb_type] = bytes(data)
+
+    def write_text(self, text, on_read=None):
+        self.clear()
+        self.data[self.TEXT_TYPE] = text.encode("utf-8")
+        if on_read is not None and self.promises:
+            self._on_read = on_read
+            return True
+        return False
+
+
+class _Spilled:
+    """One pasteboard payload kept in a memory-mapped temp file.
+
+    The file is deleted once the snapshot holding it is dropped.
+    """
+
+    __slots__ = ("size", "_file", "_map")
+
+    def __init__(self, data):
+        self.size = data.nbytes
+        self._file = tempfile.TemporaryFile(prefix="micpipe-clipboard-")
+        try:
+            self._file.write(data)
+            self._file.flush()
+            self._map = mmap.mmap(self._file.fileno(), self.size, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+
+    def view(self):
+        return memoryview(self._map)
 
 
 @dataclass
 class PasteboardSnapshot:
     """
-    Semantic snapshot of NSPasteboard.generalPasteboard().
-    Stores (type, raw_bytes) for all materialized types.
+    Semantic snapshot of the general pasteboard at ``change_count``.
+    Stores (type, payload) for all materialized types; a payload is bytes,
+    or a _Spilled file when the snapshot was over its memory limit.
     """
-    items: List[Tuple[str, bytes]]
+    items: List[Tuple[str, object]]
+    change_count: int = -1
+    spilled_bytes: int = 0
+
 
+_backend = None
+_last_snapshot = None
+_lock = threading.Lock()
 
-def snapshot_clipboard() -> PasteboardSnapshot:
-    """Take a semantic snapshot of the current clipboard."""
-    pb = NSPasteboard.generalPasteboard()
-    types = pb.types() or []
 
-    items: List[Tuple[str, bytes]] = []
+def get_backend() -> PasteboardBackend:
+    """Return the pasteboard backend, creating the AppKit one on first use."""
+    global _backend
+    with _lock:
+        if _backend is None:
+            _backend = AppKitPasteboard()
+        return _backend
 
-    for t in types:
-        data = pb.dataForType_(t)
+
+def set_backend(backend):
+    """Install a backend (e.g. a MemoryPasteboard) and return the previous one."""
+    global _backend, _last_snapshot
+    with _lock:
+        previous = _backend
+        _backend = backend
+        _last_snapshot = None
+        return previous
+
+
+def _take_snapshot(backend, change_count, memory_limit):
+    items = []
+    in_memory = 0
+    spilled = 0
+    for t in backend.types():
+        data = backend.data_for_type(t)
         if data is None:
             # Some lazy/promised types may not materialize; safe to skip
             continue
-        items.append((str(t), bytes(data)))
+        size = data.nbytes
+        if in_memory + size > memory_limit and size:
+            try:
+                items.append((t, _Spilled(data)))
+                spilled += size
+                continue
+            except Exception as e:
+                logger.debug(f"Could not spill clipboard type {t} ({size} bytes): {e}")
+        items.append((t, bytes(data)))
+        in_memory += size
+    if spilled:
+        logger.debug(f"Clipboard snapshot: {in_memory} bytes in memory, {spilled} bytes spilled")
+    return PasteboardSnapshot(items=items, change_count=change_count, spilled_bytes=spilled)
 
-    return PasteboardSnapshot(items=items)
 
+def snapshot_clipboard(memory_limit=MEMORY_LIMIT_BYTES) -> PasteboardSnapshot:
+    """Snapshot the clipboard; take it right before overwriting it.
 
-def restore_clipboard(snapshot: PasteboardSnapshot) -> None:
-    """Restore clipboard from a previously taken snapshot."""
-    pb = NSPasteboard.generalPasteboard()
-    pb.clearContents()
+    Returns the previous snapshot when the pasteboard has not changed since
+    it was taken (or restored).
+    """
+    global _last_snapshot
+    backend = get_backend()
+    with _lock:
+        change_count = backend.change_count()
+        if _last_snapshot is not None and _last_snapshot.change_count == change_count:
+            return _last_snapshot
+        _last_snapshot = _take_snapshot(backend, change_count, memory_limit)
+        return _last_snapshot
 
-    for t, raw in snapshot.items:
-        try:
-            pb.setData_forType_(raw, t)
-        except Exception:
-            # Private / unsupported types may fail -- acceptable and expected
-            pass
+
+def clipboard_change_count() -> int:
+    return get_backend().change_count()
+
+
+def restore_clipboard(snapshot: PasteboardSnapshot, written_change_count=None) -> None:
+    """Restore clipboard from a previously taken snapshot.
+
+    With ``written_change_count`` (the change count right after MicPipe's own
+    write) nothing is restored if someone else has written since, e.g. the
+    user copied something while the paste was in progress.
+    """
+    global _last_snapshot
+    backend = get_backend()
+    with _lock:
+        if written_change_count is not None and backend.change_count() != written_change_count:
+            logger.debug("Clipboard changed after the paste; not restoring it")
+            return
+        backend.clear()
+        for t, payload in snapshot.items:
+            try:
+                if isinstance(payload, _Spilled):
+                    with payload.view() as view:
+                        backend.set_data(t, view)
+                else:
+                    backend.set_data(t, payload)
+            except Exception:
+                # Private / unsupported types may fail -- acceptable and expected
+                pass
+        # The pasteboard holds the snapshot again, so it stays reusable.
+        snapshot.change_count = backend.change_count()
+        _last_snapshot = snapshot
 
 
-def overwrite_clipboard_with_text(text: str) -> None:
-    """Replace clipboard contents with plain text."""
-    pb = NSPasteboard.generalPasteboard()
-    pb.clearContents()
-    pb.writeObjects_([text])
+def overwrite_clipboard_with_text(text: str, on_read=None) -> bool:
+    """Replace clipboard contents with plain text; see PasteboardBackend.write_text for ``on_read``."""
+    return get_backend().write_text(text, on_read)
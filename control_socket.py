@@ -0,0 +1,225 @@
+"""Local control socket of the running app, and its client for the CLI.
+
+The app listens on a Unix socket in its state directory
+(``~/Library/Application Support/MicPipe/control.sock``). Requests and
+replies are single JSON lines:
+
+    -> {"id": 1, "cmd": "voice", "action": "start"}
+    <- {"id": 1, "ok": true, "action": "start", "status": {"state": "IDLE", "voice": false, ...}}
+    <- {"id": 1, "ok": false, "error": "unknown voice action 'x'"}
+
+``{"cmd": "subscribe"}`` turns the connection into a stream of
+``{"event": "state", ...}`` lines, one per app state change.
+
+The socket is only bound while the process holds the instance lock
+(InstanceLock), so at most one MicPipe app runs per user. This module only
+uses the standard library, and asyncio only in the server, so the CLI client
+loads quickly (see startup_bench).
+"""
+import fcntl
+import json
+import logging
+import os
+import socket
+
+logger = logging.getLogger(__name__)
+
+SOCKET_NAME = "control.sock"
+LOCK_NAME = "micpipe.lock"
+CLIENT_TIMEOUT_SECONDS = 2.0
+MAX_LINE_BYTES = 64 * 1024
+
+
+class ControlUnavailable(ConnectionError):
+    """No app is listening on the control socket."""
+
+
+class ControlError(Exception):
+    """The app rejected a request; the message is the app's error."""
+
+
+class InstanceLock:
+    """Exclusive lock on ``path`` held for the life of the process (flock)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def acquire(self):
+        """Take the lock; returns False if another process holds it."""
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        f = open(self.path, "a+")
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        f.seek(0)
+        f.truncate()
+        f.write(f"{os.getpid()}\n")
+        f.flush()
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class ControlServer:
+    """Answers control requests on ``path`` from the app's flow loop.
+
+    ``handlers`` maps a command name to a coroutine function that takes the
+    request dict and returns the fields of the reply; it raises ControlError
+    to reply with an error. ``publish`` may be called from any thread.
+    """
+
+    def __init__(self, path, handlers, loop):
+        self.path = path
+        self.handlers = handlers
+        self.loop = loop
+        self._server = None
+        self._subscribers = set()
+
+    def start(self, timeout=5.0):
+        """Bind the socket. Call only while holding the InstanceLock: a leftover socket file is replaced."""
+        import asyncio
+
+        asyncio.run_coroutine_threadsafe(self._start(), self.loop).result(timeout)
+        logger.debug(f"Control socket listening on {self.path}")
+
+    async def _start(self):
+        import asyncio
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._serve, path=self.path, limit=MAX_LINE_BYTES)
+        os.chmod(self.path, 0o600)
+
+    def close(self, timeout=2.0):
+        if self._server is None:
+            return
+        import asyncio
+
+        try:
+            asyncio.run_coroutine_threadsafe(self._close(), self.loop).result(timeout)
+        except Exception as e:
+            logger.debug(f"Failed to close control socket: {e}")
+        self._server = None
+
+    async def _close(self):
+        self._server.close()
+        for writer in list(self._subscribers):
+            writer.close()
+        self._subscribers.clear()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    writer.write(_line({"ok": False, "error": "request too long"}))
+                    break
+                if not line:
+                    break
+                writer.write(_line(await self._reply(line, writer)))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._subscribers.discard(writer)
+            writer.close()
+
+    async def _reply(self, line, writer):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("not an object")
+        except ValueError as e:
+            return {"ok": False, "error": f"bad request: {e}"}
+        reply = {"id": request.get("id")}
+        cmd = request.get("cmd")
+        if cmd == "subscribe":
+            self._subscribers.add(writer)
+            return {**reply, "ok": True}
+        handler = self.handlers.get(cmd)
+        if handler is None:
+            return {**reply, "ok": False, "error": f"unknown command '{cmd}'"}
+        try:
+            return {**reply, "ok": True, **(await handler(request) or {})}
+        except ControlError as e:
+            return {**reply, "ok": False, "error": str(e)}
+        except Exception as e:
+            logger.exception(f"Control command '{cmd}' failed")
+            return {**reply, "ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    def publish(self, event):
+        """Send ``event`` (a dict) to every subscriber."""
+        if self._server is None or not self._subscribers:
+            return
+        self.loop.call_soon_threadsafe(self._publish, _line(event))
+
+    def _publish(self, line):
+        for writer in list(self._subscribers):
+            if writer.is_closing():
+                self._subscribers.discard(writer)
+                continue
+            writer.write(line)
+
+
+def _line(message):
+    return (json.dumps(message, ensure_ascii=True) + "\n").encode("ascii")
+
+
+def _connect(path, timeout):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path)
+    except (FileNotFoundError, ConnectionRefusedError) as e:
+        sock.close()
+        raise ControlUnavailable(f"MicPipe is not running ({e})") from e
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def request(path, cmd, timeout=CLIENT_TIMEOUT_SECONDS, **fields):
+    """Send one request to the app at ``path`` and return its reply.
+
+    Raises ControlUnavailable when no app is listening and ControlError when
+    the app answers with an error.
+    """
+    with _connect(path, timeout) as sock:
+        sock.sendall(_line({"id": 1, "cmd": cmd, **fields}))
+        with sock.makefile("rb") as f:
+            line = f.readline(MAX_LINE_BYTES)
+    if not line:
+        raise ControlUnavailable("MicPipe closed the connection")
+    reply = json.loads(line)
+    if not reply.get("ok"):
+        raise ControlError(reply.get("error") or "request failed")
+    return reply
+
+
+def subscribe(path):
+    """Yield the app's events (dicts) until it closes the connection."""
+    with _connect(path, CLIENT_TIMEOUT_SECONDS) as sock:
+        sock.sendall(_line({"id": 1, "cmd": "subscribe"}))
+        with sock.makefile("rb") as f:
+            ack = json.loads(f.readline(MAX_LINE_BYTES) or b"{}")
+            if not ack.get("ok"):
+                raise ControlError(ack.get("error") or "subscribe failed")
+            # Events arrive whenever the app's state changes.
+            sock.settimeout(None)
+            for line in f:
+                yield json.loads(line)
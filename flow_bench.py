@@ -0,0 +1,334 @@
+"""Offline end-to-end benchmark of the dictation, AI Pipe and voice flows.
+
+The real MicPipeApp runs against the Chrome simulator (chrome_simulator) and
+the macOS stand-ins (macos_standins), driven by synthetic key events. Flows
+run on a virtual-time event loop and Chrome calls run inline, so the suite
+runs on any machine in a few seconds and a given seed always produces the
+same simulated latencies. ``micpipe bench`` prints the report.
+"""
+import asyncio
+import contextlib
+import logging
+import os
+import random
+import selectors
+import sys
+import tempfile
+import time
+
+import call_accounting
+from chrome_simulator import FakeChrome, SimClock, SimulatedChatGPTPage
+from latency_stats import HdrHistogram
+
+logger = logging.getLogger(__name__)
+
+FLOWS = ("dictation", "pipe", "voice")
+# One AppleScript round-trip through the persistent osascript worker.
+CALL_LATENCY_SECONDS = 0.03
+# How long the key is held while speaking, and the pause between runs.
+SPEAK_SECONDS = 2.0
+PAUSE_SECONDS = 1.0
+FN_KEYCODE = 63
+# Most Chrome round-trips one user action may make (see call_accounting); a
+# run over budget is reported as a violation and `micpipe bench` exits non-zero.
+# Voice makes a fixed number of calls; dictations poll, so their count varies
+# with the simulated timings and the budgets leave room for the slowest seeds.
+CALL_BUDGETS = {
+    "dictation": 15,
+    "ai_pipe": 36,
+    "voice_start": 7,
+    "voice_stop": 3,
+}
+
+
+class _VirtualSelector:
+    """Selector that never blocks: a wait for the next timer advances ``clock`` instead."""
+
+    def __init__(self, clock):
+        self._clock = clock
+        self._selector = selectors.DefaultSelector()
+
+    def register(self, fileobj, events, data=None):
+        return self._selector.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        return self._selector.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        return self._selector.modify(fileobj, events, data)
+
+    def get_key(self, fileobj):
+        return self._selector.get_key(fileobj)
+
+    def get_map(self):
+        return self._selector.get_map()
+
+    def close(self):
+        self._selector.close()
+
+    def select(self, timeout=None):
+        # Real I/O (the loop's self-pipe) is still picked up, without waiting.
+        events = self._selector.select(0)
+        if events or timeout == 0:
+            return events
+        if timeout is None:
+            raise RuntimeError("Virtual-time loop has nothing left to run")
+        self._clock.advance(timeout)
+        return events
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    """Event loop on a SimClock; executor jobs (``asyncio.to_thread``) run inline."""
+
+    def __init__(self, clock):
+        super().__init__(_VirtualSelector(clock))
+        self.clock = clock
+
+    def time(self):
+        return self.clock.now()
+
+    def run_in_executor(self, executor, func, *args):
+        future = self.create_future()
+        try:
+            future.set_result(func(*args))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+class FlowStats:
+    """Latency (simulated ms) and cost of one measured step, e.g. ``dictation.stop``."""
+
+    def __init__(self, name):
+        self.name = name
+        self.latency = HdrHistogram()
+        self.failures = 0
+        self.round_trips = 0
+        self.cpu = 0.0
+
+    @property
+    def runs(self):
+        return self.latency.total
+
+
+class BenchReport:
+    def __init__(self, iterations, seed):
+        self.iterations = iterations
+        self.seed = seed
+        self.steps = {}
+        self.wall = {}  # Flow -> wall seconds for its measured runs
+        self.phases = ""  # The app's own per-phase table (see latency_stats)
+        self.actions = {}  # Action name -> UserActions of the measured runs
+        self.violations = []  # CallBudgetExceeded messages
+
+    def add_action(self, action):
+        self.actions.setdefault(action.name, []).append(action)
+        budget = CALL_BUDGETS.get(action.name)
+        if budget is None:
+            return
+        try:
+            call_accounting.assert_call_budget(action, budget)
+        except call_accounting.CallBudgetExceeded as e:
+            self.violations.append(str(e))
+
+    def format_calls(self):
+        """Per-action call counts and the table of the last run of each action."""
+        lines = ["Chrome calls per user action:"]
+        for name, actions in self.actions.items():
+            counts = sorted(a.count for a in actions)
+            budget = CALL_BUDGETS.get(name)
+            lines.append(
+                f"  {name}: {len(actions)} runs, {counts[0]}-{counts[-1]} calls"
+                + (f" (budget {budget})" if budget is not None else "")
+            )
+        for actions in self.actions.values():
+            lines += ["", actions[-1].format_table()]
+        return "\n".join(lines)
+
+    def step(self, name):
+        if name not in self.steps:
+            self.steps[name] = FlowStats(name)
+        return self.steps[name]
+
+    def format(self):
+        lines = [
+            f"MicPipe offline benchmark: {self.iterations} runs per flow, seed {self.seed}",
+            "Latencies are simulated time from key event to flow done; cpu is real time per run.",
+            "",
+            f"  {'step':<16} {'runs':>5} {'fail':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'trips':>6} {'cpu':>8}",
+        ]
+        for stats in self.steps.values():
+            runs = stats.runs
+            cells = " ".join(f"{stats.latency.quantile(q):>6}ms" for q in (0.5, 0.95, 0.99))
+            lines.append(
+                f"  {stats.name:<16} {runs:>5} {stats.failures:>5} {cells} "
+                f"{stats.round_trips / max(runs, 1):>6.1f} {stats.cpu * 1000 / max(runs, 1):>6.2f}ms"
+            )
+        lines.append("")
+        for flow, seconds in self.wall.items():
+            lines.append(f"  {flow:<16} {self.iterations / seconds if seconds else 0:>8.1f} flows/s (wall)")
+        if self.phases:
+            lines += ["", "Dictation phases (simulated, including warm-up runs):", self.phases]
+        if self.violations:
+            lines += ["", f"{len(self.violations)} Chrome call budget violation(s):"]
+            lines += self.violations
+        return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def _sandbox(home):
+    """Point the app's state at ``home`` and keep real Chrome (CDP) out of the run."""
+    saved = {key: os.environ.get(key) for key in ("HOME", "MICPIPE_CDP_PORT")}
+    os.environ["HOME"] = home
+    os.environ.pop("MICPIPE_CDP_PORT", None)
+    try:
+        yield
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+@contextlib.contextmanager
+def _recorded_pastes(clock):
+    """Replace the paste backends with one that records ``(time, text)``."""
+    import paste_tool
+
+    recorder = paste_tool.RecordingPaste(clock=clock.now)
+    previous = paste_tool.set_backends([recorder])
+    try:
+        yield recorder.pastes
+    finally:
+        paste_tool.set_backends(previous)
+
+
+class _Bench:
+    def __init__(self, app, chrome, clock, pastes, report):
+        import Quartz
+
+        self.quartz = Quartz
+        self.app = app
+        self.chrome = chrome
+        self.clock = clock
+        self.pastes = pastes
+        self.report = report
+
+    def _key(self, flags):
+        event = self.quartz.CGEventCreateKeyboardEvent(None, FN_KEYCODE, bool(flags))
+        self.quartz.CGEventSetFlags(event, flags)
+        self.app.event_callback(None, self.quartz.kCGEventFlagsChanged, event, None)
+
+    async def _step(self, name, flags, ok, record):
+        """Send a key event, wait for the session lane to settle and measure it."""
+        from macos_standins import recorder
+        from micpipe import SESSION_LANE
+
+        notifications = len(recorder.notifications)
+        trips = self.chrome.call_count()
+        cpu = time.process_time()
+        start = self.clock.now()
+        self._key(flags)
+        await self.app.flows.wait_idle(SESSION_LANE)
+        elapsed = self.clock.now() - start
+        if not record:
+            return
+        stats = self.report.step(name)
+        stats.latency.add(elapsed * 1000)
+        stats.round_trips += self.chrome.call_count() - trips
+        stats.cpu += time.process_time() - cpu
+        if not ok() or len(recorder.notifications) > notifications:
+            stats.failures += 1
+
+    async def dictation(self, flow, record):
+        """Hold Fn, speak, release; ``flow`` is "dictation" or "pipe"."""
+        fn = self.quartz.kCGEventFlagMaskSecondaryFn
+        self.app.current_pipe_slot = -2 if flow == "pipe" else -1
+        pasted = len(self.pastes)
+        key_down = self.clock.now()
+        await self._step(f"{flow}.start", fn, lambda: self.app.is_recording, record)
+        await asyncio.sleep(max(0.0, key_down + SPEAK_SECONDS - self.clock.now()))
+        await self._step(f"{flow}.stop", 0, lambda: len(self.pastes) > pasted, record)
+
+    async def voice(self, _flow, record):
+        """Control+Fn starts a voice conversation, Fn ends it."""
+        fn = self.quartz.kCGEventFlagMaskSecondaryFn
+        control = self.quartz.kCGEventFlagMaskControl
+        await self._step("voice.start", fn | control, lambda: self.app.is_voice_conversation, record)
+        self._key(0)
+        await asyncio.sleep(SPEAK_SECONDS)
+        await self._step("voice.stop", fn, lambda: not self.app.is_voice_conversation, record)
+        self._key(0)
+
+    async def run(self, flows, iterations, warmup):
+        # Let the dedicated window created at launch finish loading.
+        await asyncio.sleep(5.0)
+        for flow in flows:
+            scenario = self.voice if flow == "voice" else self.dictation
+            for _ in range(warmup):
+                await scenario(flow, False)
+                await asyncio.sleep(PAUSE_SECONDS)
+            started = time.perf_counter()
+            for _ in range(iterations):
+                finished = len(call_accounting.ledger.history)
+                await scenario(flow, True)
+                await asyncio.sleep(PAUSE_SECONDS)
+                for action in list(call_accounting.ledger.history)[finished:]:
+                    self.report.add_action(action)
+            self.report.wall[flow] = time.perf_counter() - started
+
+
+def run_benchmark(iterations=20, flows=FLOWS, seed=0, warmup=5, call_latency=CALL_LATENCY_SECONDS):
+    """Run each flow ``iterations`` times (after ``warmup`` unmeasured runs) and return a BenchReport.
+
+    ``warmup`` runs also let the poll scheduler learn the simulated page's
+    latencies, so the report reflects steady state.
+    """
+    import macos_standins
+
+    if "micpipe" in sys.modules and not getattr(sys.modules.get("rumps"), "__micpipe_standin__", False):
+        raise RuntimeError("micpipe was already imported with the real macOS frameworks")
+    macos_standins.install(force=True)
+    import chrome_script
+    from chrome_scheduler import InlineChromeScheduler
+    from flow_runner import FlowRunner
+    from micpipe import MicPipeApp
+
+    report = BenchReport(iterations, seed)
+    clock = SimClock()
+    rng = random.Random(seed)
+
+    def page_factory(url):
+        return SimulatedChatGPTPage(clock, rng) if "chatgpt.com" in url else None
+
+    chrome = FakeChrome(latency=call_latency, clock=clock, page_factory=page_factory)
+    chrome.add_window()  # The user's own browser window.
+    loop = VirtualTimeLoop(clock)
+    previous = chrome_script.set_transport(chrome)
+    previous_ledger = call_accounting.set_ledger(call_accounting.CallLedger(keep=None))
+    try:
+        with tempfile.TemporaryDirectory() as home, _sandbox(home), _recorded_pastes(clock) as pastes:
+            app = MicPipeApp(
+                clock=clock.now,
+                flows=FlowRunner(loop=loop),
+                chrome_scheduler=InlineChromeScheduler(),
+            )
+            app.trigger_key = FN_KEYCODE
+            bench = _Bench(app, chrome, clock, pastes, report)
+            loop.run_until_complete(bench.run(flows, iterations, warmup))
+            report.phases = app.latency.format_table()
+            app.flush_state()  # Before the temporary home is removed.
+    finally:
+        chrome_script.set_transport(previous)
+        call_accounting.set_ledger(previous_ledger)
+        loop.close()
+    return report
+
+
+def main(iterations=20, flows=FLOWS, seed=0):
+    print(run_benchmark(iterations, flows, seed).format())
+
+
+if __name__ == "__main__":
+    main()
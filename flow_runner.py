@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import threading
+import time
+
+from chrome_scheduler import BACKGROUND, FOREGROUND, ChromeScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncChrome:
+    """Awaitable view of the active ChromeController.
+
+    ``await chrome.start_dictation(...)`` queues the controller method on the
+    shared ChromeScheduler, so calls from concurrent flows never interleave
+    AppleScript round-trips and foreground calls overtake background probes.
+    Identical ``READS`` already in flight are shared. Cancelling the awaiting
+    flow returns immediately; a call already in Chrome finishes in the
+    background and its result is dropped. ``run(fn, ...)`` does the same for
+    any blocking function that talks to Chrome.
+    """
+
+    # Read-only controller calls whose concurrent duplicates can share one round-trip.
+    READS = frozenset({
+        "is_page_ready",
+        "is_recording_active",
+        "is_voice_conversation_active",
+        "get_voice_activity_snapshot",
+        "is_window_alive",
+        "collect_result",
+    })
+
+    def __init__(self, get_controller, scheduler=None, priority=FOREGROUND, deadline=None):
+        self._get_controller = get_controller
+        self._scheduler = scheduler or ChromeScheduler()
+        self._priority = priority
+        self._deadline = deadline
+
+    def options(self, priority=None, deadline=None):
+        """The same controller and queue with another priority or a per-call deadline.
+
+        ``deadline`` is how many seconds a call may wait in the queue before it
+        fails with ChromeDeadlineExceeded instead of running.
+        """
+        return AsyncChrome(
+            self._get_controller,
+            self._scheduler,
+            self._priority if priority is None else priority,
+            self._deadline if deadline is None else deadline,
+        )
+
+    @property
+    def background(self):
+        return self.options(priority=BACKGROUND)
+
+    def run(self, fn, *args, **kwargs):
+        return self._call(fn, args, kwargs, None)
+
+    async def _call(self, fn, args, kwargs, key):
+        deadline = time.monotonic() + self._deadline if self._deadline is not None else None
+        cmd = self._scheduler.submit(fn, args, kwargs, self._priority, deadline, key)
+        try:
+            # Shielded so one cancelled caller doesn't cancel a shared call for the others.
+            return await asyncio.shield(asyncio.wrap_future(cmd.future))
+        finally:
+            self._scheduler.release(cmd)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            # Bind to the controller active now, not when the worker gets to it.
+            controller = self._get_controller()
+            key = None
+            if name in self.READS:
+                key = (id(controller), name, args, tuple(sorted(kwargs.items())))
+                try:
+                    hash(key)
+                except TypeError:
+                    key = None
+            return self._call(getattr(controller, name), args, kwargs, key)
+
+        return call
+
+    def shutdown(self):
+        self._scheduler.shutdown()
+
+
+class FlowRunner:
+    """Run app flows as coroutines on one asyncio loop in a background thread.
+
+    Flows submitted to the same ``lane`` run one after another in submission
+    order, so a stop never overtakes the start it belongs to. ``preempt=True``
+    cancels whatever the lane is running or has queued first (e.g. Esc), and
+    ``dedupe=True`` drops a flow whose function is already queued or running
+    in the lane. Submitting is thread-safe (Quartz callback, rumps timer, menu).
+
+    Given a ``loop``, flows run on it and the caller is responsible for running
+    it (the offline benchmark uses a virtual-time loop).
+    """
+
+    def __init__(self, name="micpipe-flows", loop=None):
+        self._lanes = {}
+        self._submitted = {}
+        if loop is not None:
+            self.loop = loop
+            self._thread = None
+            return
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name=name, daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, fn, *args, lane=None, preempt=False, dedupe=False):
+        """Schedule ``fn(*args)`` (a coroutine function); returns a concurrent Future."""
+        future = asyncio.run_coroutine_threadsafe(
+            self._start(fn, args, lane, preempt, dedupe), self.loop
+        )
+        if lane is not None:
+            submitted = self._submitted.setdefault(lane, set())
+            submitted.add(future)
+            future.add_done_callback(submitted.discard)
+        return future
+
+    def call_soon(self, fn, *args):
+        """Run a plain function on the loop thread (e.g. to touch flow state)."""
+        self.loop.call_soon_threadsafe(fn, *args)
+
+    async def _start(self, fn, args, lane, preempt, dedupe):
+        if lane is None:
+            return await self._run(fn, args)
+        tasks = [t for t in self._lanes.get(lane, []) if not t.done()]
+        if dedupe and any(getattr(t, "flow_fn", None) == fn for t in tasks):
+            logger.debug(f"Flow {fn.__name__} already queued in lane {lane}; skipping")
+            return None
+        if preempt:
+            for t in tasks:
+                t.cancel()
+        previous = tasks[-1] if tasks else None
+        task = asyncio.ensure_future(self._chain(previous, fn, args))
+        task.flow_fn = fn
+        tasks.append(task)
+        self._lanes[lane] = tasks
+        return await asyncio.shield(task)
+
+    async def _chain(self, previous, fn, args):
+        if previous is not None:
+            # Wait for the previous flow, whatever its outcome.
+            await asyncio.wait([previous])
+        return await self._run(fn, args)
+
+    async def _run(self, fn, args):
+        try:
+            return await fn(*args)
+        except asyncio.CancelledError:
+            logger.debug(f"Flow {fn.__name__} cancelled")
+            raise
+        except Exception:
+            logger.exception(f"Flow {fn.__name__} failed")
+            return None
+
+    async def wait_idle(self, lane):
+        """Wait (on the loop) until every flow submitted to ``lane`` so far has finished."""
+        while True:
+            pending = [f for f in list(self._submitted.get(lane, ())) if not f.done()]
+            if not pending:
+                return
+            await asyncio.wait([asyncio.wrap_future(f) for f in pending])
+
+    def cancel_lane(self, lane):
+        """Cancel everything running or queued in ``lane``."""
+        def cancel():
+            for t in self._lanes.pop(lane, []):
+                t.cancel()
+        self.loop.call_soon_threadsafe(cancel)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
@@ -0,0 +1,175 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from write_behind import STATS_WRITE_DELAY_SECONDS, WriteBehind
+
+logger = logging.getLogger(__name__)
+
+# Phases of one dictation, in pipeline order. Each span runs from the
+# previous mark of the same trace (the key edge for the first one).
+START_PHASES = ("window_ensure", "page_ready", "dictation_started")
+STOP_PHASES = ("stop_clicked", "text_received", "ai_submit", "ai_complete", "pasted")
+PHASES = START_PHASES + ("start_total",) + STOP_PHASES + ("stop_total",)
+
+
+class HdrHistogram:
+    """Log-linear histogram of millisecond values, in the style of HdrHistogram.
+
+    Values below ``2 ** SUB_BITS`` ms are counted exactly; above that every
+    power of two is split into ``2 ** (SUB_BITS - 1)`` equal buckets, so any
+    quantile is within ~3% of the true value while the range stays unbounded.
+    """
+
+    SUB_BITS = 6
+
+    def __init__(self, counts=None, minimum=None, maximum=None):
+        self.counts = {}
+        for index, count in counts or []:
+            if isinstance(index, int) and isinstance(count, int) and index >= 0 and count > 0:
+                self.counts[index] = self.counts.get(index, 0) + count
+        self.min = minimum
+        self.max = maximum
+
+    @classmethod
+    def index(cls, value):
+        value = max(0, int(value))
+        if value < (1 << cls.SUB_BITS):
+            return value
+        half = 1 << (cls.SUB_BITS - 1)
+        shift = value.bit_length() - cls.SUB_BITS
+        return (1 << cls.SUB_BITS) + (shift - 1) * half + (value >> shift) - half
+
+    @classmethod
+    def highest_equivalent(cls, index):
+        """Largest value counted in bucket ``index``."""
+        if index < (1 << cls.SUB_BITS):
+            return index
+        half = 1 << (cls.SUB_BITS - 1)
+        shift, sub = divmod(index - (1 << cls.SUB_BITS), half)
+        return ((sub + half + 1) << (shift + 1)) - 1
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def add(self, ms):
+        ms = max(0, int(round(ms)))
+        i = self.index(ms)
+        self.counts[i] = self.counts.get(i, 0) + 1
+        self.min = ms if self.min is None else min(self.min, ms)
+        self.max = ms if self.max is None else max(self.max, ms)
+
+    def quantile(self, q):
+        """Value at quantile ``q`` in ms (None when empty)."""
+        total = self.total
+        if not total:
+            return None
+        seen = 0
+        for i in sorted(self.counts):
+            seen += self.counts[i]
+            if seen >= q * total:
+                return min(self.highest_equivalent(i), self.max)
+        return self.max
+
+    def to_dict(self):
+        return {"counts": sorted(self.counts.items()), "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        counts = [tuple(pair) for pair in data.get("counts") or [] if isinstance(pair, list) and len(pair) == 2]
+        return cls(counts, data.get("min"), data.get("max"))
+
+
+class Trace:
+    """Spans of one start or stop flow; ``mark(phase)`` closes the span since the last mark."""
+
+    def __init__(self, recorder, name, service, start):
+        self.recorder = recorder
+        self.name = name
+        self.service = service
+        self.start = start
+        self.last = start
+
+    def mark(self, phase):
+        now = self.recorder.clock()
+        self.recorder.record(self.service, phase, now - self.last)
+        logger.debug(f"[latency] {self.service}.{phase}: {(now - self.last) * 1000:.0f}ms")
+        self.last = now
+
+    def finish(self):
+        """Record the whole trace as ``<name>_total`` and persist the histograms."""
+        elapsed = self.recorder.clock() - self.start
+        self.recorder.record(self.service, f"{self.name}_total", elapsed)
+        logger.debug(f"[latency] {self.service}.{self.name}_total: {elapsed * 1000:.0f}ms")
+        self.recorder.save()
+
+
+class LatencyRecorder:
+    """Per-service, per-phase latency histograms, persisted as JSON at ``path`` (written behind)."""
+
+    def __init__(self, path=None, clock=time.monotonic):
+        self.path = path
+        self.clock = clock
+        self.histograms = {}
+        self._lock = threading.Lock()
+        self._writer = WriteBehind(path, self._serialize, STATS_WRITE_DELAY_SECONDS, what="latency stats")
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for service, phases in (data.get("histograms") or {}).items():
+                for phase, hist in phases.items():
+                    if isinstance(hist, dict):
+                        self.histograms.setdefault(service, {})[phase] = HdrHistogram.from_dict(hist)
+        except Exception as e:
+            logger.debug(f"Failed to load latency stats: {e}")
+
+    def _serialize(self):
+        with self._lock:
+            payload = {
+                "histograms": {
+                    service: {phase: h.to_dict() for phase, h in phases.items()}
+                    for service, phases in self.histograms.items()
+                }
+            }
+        return json.dumps(payload, separators=(",", ":"))
+
+    def save(self):
+        """Schedule a write of the histograms."""
+        self._writer.mark_dirty()
+
+    def flush(self):
+        """Write pending histograms now."""
+        self._writer.flush()
+
+    def record(self, service, phase, seconds):
+        with self._lock:
+            self.histograms.setdefault(service, {}).setdefault(phase, HdrHistogram()).add(seconds * 1000)
+
+    def trace(self, name, service, start=None):
+        """Start a Trace at ``start`` (a clock value, e.g. the key edge; default: now)."""
+        return Trace(self, name, service, self.clock() if start is None else start)
+
+    def format_table(self):
+        """Text table of count and p50/p95/p99 per service and phase."""
+        if not self.histograms:
+            return "No latency data recorded yet."
+        lines = []
+        for service in sorted(self.histograms):
+            phases = self.histograms[service]
+            order = [p for p in PHASES if p in phases] + sorted(p for p in phases if p not in PHASES)
+            lines.append(service)
+            lines.append(f"  {'phase':<18} {'count':>6} {'p50':>8} {'p95':>8} {'p99':>8}")
+            for phase in order:
+                h = phases[phase]
+                cells = " ".join(f"{h.quantile(q):>6}ms" for q in (0.5, 0.95, 0.99))
+                lines.append(f"  {phase:<18} {h.total:>6} {cells}")
+            lines.append("")
+        return "\n".join(lines).rstrip()
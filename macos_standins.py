@@ -0,0 +1,364 @@
+"""Stand-ins for the macOS frameworks MicPipe imports: rumps, AppKit and Quartz.
+
+``install()`` registers them in ``sys.modules`` so that ``micpipe`` can be
+imported and driven on any platform, e.g. by the offline benchmark
+(flow_bench). They do nothing on screen; instead they record what the app
+asked for (notifications, activations, sounds, clipboard writes) in
+``recorder`` so a run can be checked afterwards.
+"""
+import sys
+import types
+
+
+class Recorder:
+    """What the app did through the stand-ins since the last ``reset()``."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.notifications = []
+        self.alerts = []
+        self.activations = 0
+        self.sounds = 0
+
+
+recorder = Recorder()
+
+
+# ---- rumps ----
+
+class App:
+    def __init__(self, name, title=None, icon=None, template=None, menu=None, quit_button="Quit"):
+        self.name = name
+        self.title = title
+        self.icon = icon
+        self.template = template
+        # Like rumps: the quit item is a MenuItem whose callback quits.
+        self.quit_button = None if quit_button is None else MenuItem(quit_button, callback=quit_application)
+        self._menu = list(menu or [])
+
+    @property
+    def menu(self):
+        return self._menu
+
+    @menu.setter
+    def menu(self, items):
+        self._menu = list(items)
+
+    def run(self, **options):
+        pass
+
+
+class MenuItem:
+    def __init__(self, title, callback=None, key=None, icon=None, dimensions=None, template=None):
+        self.title = title
+        self.callback = callback
+        self.key = key
+        self.icon = icon
+        self.state = 0
+        self.items = []
+
+    def add(self, item):
+        self.items.append(item)
+
+    def set_callback(self, callback, key=None):
+        self.callback = callback
+
+
+class Timer:
+    """Never fires on its own; call ``fire()`` to run the callback once."""
+
+    def __init__(self, callback, interval):
+        self.callback = callback
+        self.interval = interval
+        self.running = False
+
+    def start(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def is_alive(self):
+        return self.running
+
+    def fire(self):
+        self.callback(self)
+
+
+def notification(title, subtitle, message, **options):
+    recorder.notifications.append((title, subtitle, message))
+
+
+def alert(title=None, message="", ok=None, cancel=None, **options):
+    recorder.alerts.append((title, message))
+    return 1
+
+
+def quit_application(sender=None):
+    pass
+
+
+# ---- AppKit ----
+
+NSApplicationActivateIgnoringOtherApps = 1 << 1
+NSPasteboardTypeString = "public.utf8-plain-text"
+
+
+class _RunningApplication:
+    def __init__(self, name="TextEdit", bundle_id="com.apple.TextEdit"):
+        self._name = name
+        self._bundle_id = bundle_id
+
+    def localizedName(self):
+        return self._name
+
+    def bundleIdentifier(self):
+        return self._bundle_id
+
+    def processIdentifier(self):
+        return 4242
+
+    def activateWithOptions_(self, options):
+        recorder.activations += 1
+        return True
+
+
+class NSWorkspace:
+    _shared = None
+
+    def __init__(self):
+        self.front = _RunningApplication()
+
+    @classmethod
+    def sharedWorkspace(cls):
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def frontmostApplication(self):
+        return self.front
+
+
+class NSSound:
+    @classmethod
+    def alloc(cls):
+        return cls()
+
+    def initWithContentsOfFile_byReference_(self, path, by_reference):
+        self.path = path
+        return self
+
+    def play(self):
+        recorder.sounds += 1
+        return True
+
+
+class _Point:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class _Size:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+
+class _Rect:
+    def __init__(self, x, y, width, height):
+        self.origin = _Point(x, y)
+        self.size = _Size(width, height)
+
+
+class NSScreen:
+    def __init__(self, width=1512, height=982, menu_bar=25):
+        self._frame = _Rect(0, 0, width, height)
+        self._visible = _Rect(0, 0, width, height - menu_bar)
+
+    @classmethod
+    def screens(cls):
+        return [cls()]
+
+    def frame(self):
+        return self._frame
+
+    def visibleFrame(self):
+        return self._visible
+
+
+class NSPasteboard:
+    """In-memory general pasteboard: ``{type: bytes}`` plus a change count."""
+
+    _general = None
+
+    def __init__(self):
+        self.data = {}
+        self._change_count = 0
+
+    @classmethod
+    def generalPasteboard(cls):
+        if cls._general is None:
+            cls._general = cls()
+        return cls._general
+
+    def changeCount(self):
+        return self._change_count
+
+    def types(self):
+        return list(self.data)
+
+    def dataForType_(self, pb_type):
+        return self.data.get(pb_type)
+
+    def stringForType_(self, pb_type):
+        raw = self.data.get(pb_type)
+        return raw.decode("utf-8") if raw is not None else None
+
+    def clearContents(self):
+        self.data = {}
+        self._change_count += 1
+        return self._change_count
+
+    def setData_forType_(self, data, pb_type):
+        self.data[pb_type] = bytes(data)
+        return True
+
+    def setString_forType_(self, text, pb_type):
+        return self.setData_forType_(text.encode("utf-8"), pb_type)
+
+    def writeObjects_(self, objects):
+        for obj in objects:
+            self.data[NSPasteboardTypeString] = str(obj).encode("utf-8")
+        return True
+
+
+# ---- Quartz ----
+
+kCGEventKeyDown = 10
+kCGEventKeyUp = 11
+kCGEventFlagsChanged = 12
+kCGKeyboardEventKeycode = 9
+kCGEventFlagMaskShift = 1 << 17
+kCGEventFlagMaskControl = 1 << 18
+kCGEventFlagMaskAlternate = 1 << 19
+kCGEventFlagMaskCommand = 1 << 20
+kCGEventFlagMaskSecondaryFn = 1 << 23
+kCGEventMaskForAllEvents = (1 << 64) - 1
+kCGSessionEventTap = 1
+kCGHIDEventTap = 0
+kCGHeadInsertEventTap = 0
+kCGEventTapOptionDefault = 0
+kCFRunLoopCommonModes = "kCFRunLoopCommonModes"
+
+
+class _Event:
+    def __init__(self, keycode, down):
+        self.fields = {kCGKeyboardEventKeycode: keycode}
+        self.down = down
+        self.flags = 0
+
+
+class _EventTap:
+    def __init__(self, callback):
+        self.callback = callback
+        self.enabled = False
+
+
+def CGEventCreateKeyboardEvent(source, keycode, key_down):
+    return _Event(keycode, key_down)
+
+
+def CGEventSetFlags(event, flags):
+    event.flags = flags
+
+
+def CGEventGetFlags(event):
+    return event.flags
+
+
+def CGEventGetIntegerValueField(event, field):
+    return event.fields.get(field, 0)
+
+
+def CGEventTapCreate(tap, place, options, mask, callback, refcon):
+    return _EventTap(callback)
+
+
+def CGEventTapEnable(tap, enable):
+    tap.enabled = bool(enable)
+
+
+def CGEventTapIsEnabled(tap):
+    return tap.enabled
+
+
+def CFMachPortCreateRunLoopSource(allocator, port, order):
+    return port
+
+
+def CFRunLoopGetCurrent():
+    return None
+
+
+def CFRunLoopAddSource(run_loop, source, mode):
+    pass
+
+
+_MODULES = {
+    "rumps": (App, MenuItem, Timer, notification, alert, quit_application),
+    "AppKit": (
+        NSWorkspace, NSSound, NSScreen, NSPasteboard,
+        "NSApplicationActivateIgnoringOtherApps", "NSPasteboardTypeString",
+    ),
+    "Quartz": (
+        CGEventCreateKeyboardEvent, CGEventSetFlags, CGEventGetFlags, CGEventGetIntegerValueField,
+        CGEventTapCreate, CGEventTapEnable, CGEventTapIsEnabled,
+        CFMachPortCreateRunLoopSource, CFRunLoopGetCurrent, CFRunLoopAddSource,
+        "kCGEventKeyDown", "kCGEventKeyUp", "kCGEventFlagsChanged", "kCGKeyboardEventKeycode",
+        "kCGEventFlagMaskShift", "kCGEventFlagMaskControl", "kCGEventFlagMaskAlternate",
+        "kCGEventFlagMaskCommand", "kCGEventFlagMaskSecondaryFn", "kCGEventMaskForAllEvents",
+        "kCGSessionEventTap", "kCGHIDEventTap", "kCGHeadInsertEventTap", "kCGEventTapOptionDefault",
+        "kCFRunLoopCommonModes",
+    ),
+}
+
+
+def _build(name):
+    module = types.ModuleType(name, f"MicPipe stand-in for {name}")
+    for member in _MODULES[name]:
+        if isinstance(member, str):
+            setattr(module, member, globals()[member])
+        else:
+            setattr(module, member.__name__, member)
+    module.__micpipe_standin__ = True
+    return module
+
+
+def install(force=False):
+    """Register the stand-ins; returns the modules they replaced, for ``uninstall``.
+
+    Without ``force`` a framework that can be imported is left alone. Import
+    this before ``micpipe``: the app binds the frameworks at import time.
+    """
+    replaced = {}
+    for name in _MODULES:
+        if not force:
+            try:
+                __import__(name)
+                continue
+            except ImportError:
+                pass
+        replaced[name] = sys.modules.get(name)
+        sys.modules[name] = _build(name)
+    return replaced
+
+
+def uninstall(replaced):
+    for name, module in replaced.items():
+        if module is None:
+            sys.modules.pop(name, None)
+        else:
+            sys.modules[name] = module
@@ -1,4 +1,4 @@
-from micpipe import main
+from cli import main
 
 
 if __name__ == "__main__":
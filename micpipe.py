@@ -1,16 +1,23 @@
+import asyncio
+import contextlib
 import logging
 import time
 import os
-import json
 import Quartz
-import threading
 import re
 import rumps
-import argparse
 from AppKit import NSWorkspace, NSApplicationActivateIgnoringOtherApps, NSSound, NSScreen
-from chrome_script import ChatGPTChrome, GeminiChrome
-from clipboard_guard import snapshot_clipboard
-from paste_tool import paste_text
+import call_accounting
+from chrome_script import BatchOp, ChatGPTChrome, GeminiChrome
+from page_agent import PageResult
+from cdp_transport import create_cdp_transport
+from chrome_scheduler import BACKGROUND, ChromeDeadlineExceeded
+from control_socket import SOCKET_NAME, ControlError, ControlServer
+from flow_runner import AsyncChrome, FlowRunner
+from latency_stats import LatencyRecorder
+from paste_timing import PasteTiming
+from paste_tool import StreamingPaste, paste_text
+from poll_scheduler import COLLECT_LADDER, PAGE_READY_LADDER, TRANSCRIBE_LADDER, PollScheduler
 from state_manager import MicPipeStateStore
 
 # ============================================================
@@ -33,6 +40,25 @@ from state_manager import MicPipeStateStore
 # ============================================================
 __version__ = "1.5.1"
 VOICE_IDLE_TIMEOUT_SECONDS = 20
+# How long the page waits for the transcript after Submit dictation before
+# falling back to polling the composer.
+STOP_COLLECT_TIMEOUT_SECONDS = 4.0
+# How long the page waits for the send button to enable after filling in the
+# AI Pipe prompt.
+PIPE_SEND_TIMEOUT_SECONDS = 3.0
+# How long to poll the composer for the transcript, and the page for readiness.
+TRANSCRIBE_DEADLINE_SECONDS = 8.0
+PAGE_READY_DEADLINE_SECONDS = 15.0
+# Fast Start: how long the page watches for the recording UI after the
+# Dictate click before the optimistic start is rolled back.
+START_VERIFY_TIMEOUT_SECONDS = 1.5
+START_STATUS_POLL_SECONDS = 0.1
+# Poll interval while following an AI Pipe response over AppleScript.
+RESPONSE_POLL_SECONDS = 0.2
+# Flow lane shared by dictation and voice flows, so a stop never overtakes its start.
+SESSION_LANE = "session"
+# How long a background probe (idle or startup check) may wait behind user actions.
+BACKGROUND_CALL_DEADLINE_SECONDS = 2.0
 VOICE_IDLE_TIMEOUT_OPTIONS = [0, 10, 15, 20, 25, 30]
 
 def configure_logging(debug: bool):
@@ -46,10 +72,19 @@ logger = logging.getLogger(__name__)
 # ============================================================
 
 class MicPipeApp(rumps.App):
-    _TAB_LOC_RE = re.compile(r"(?:USED_WIN_ID|FALLBACK_WIN_ID)=(\d+),TAB=(\d+):")
+    # Page statuses of a successful stop click (ChatGPT, Gemini mic, Gemini send).
+    STOP_CLICKED_STATUSES = ("SUBMIT_CLICKED", "STOP_CLICKED", "SEND_CLICKED")
 
-    def __init__(self, debug: bool = False):
+    def __init__(self, debug: bool = False, clock=time.monotonic, flows=None, chrome_scheduler=None, instance_lock=None):
+        """``clock``, ``flows`` and ``chrome_scheduler`` are replaced by the offline benchmark.
+
+        ``instance_lock`` is the InstanceLock the caller already holds (see
+        cli.main); the control socket is only served while holding it.
+        """
         super(MicPipeApp, self).__init__("MicPipe", quit_button="Quit")
+        self.instance_lock = instance_lock
+        self.quit_button.set_callback(self._quit)
+        self.clock = clock
         self.base_path = os.path.dirname(__file__)
         self.icon = os.path.join(self.base_path, "assets/icon_idle_template.png")
         self.template = True  # Enable template mode for idle icon
@@ -61,6 +96,22 @@ class MicPipeApp(rumps.App):
             "micpipe_state.json",
         )
         self.state_store = MicPipeStateStore(self.state_path, logger)
+        # Learned per-service latencies that decide when to poll Chrome.
+        self.poll_scheduler = PollScheduler(
+            os.path.join(os.path.dirname(self.state_path), "poll_latency.json"), clock=clock
+        )
+        # Learned per-app waits for activating the target app and restoring the clipboard.
+        self.paste_timing = PasteTiming(
+            os.path.join(os.path.dirname(self.state_path), "paste_timing.json"), clock=clock
+        )
+        # Per-phase latency of every dictation, shown by `micpipe stats`.
+        self.latency = LatencyRecorder(
+            os.path.join(os.path.dirname(self.state_path), "latency_stats.json"), clock=clock
+        )
+        self._start_trace = None
+        self._stop_trace = None
+        # Chrome calls of the dictation in progress, from the start key to the paste.
+        self._dictation_action = None
         self.debug = debug
         self.dedicated_bounds = self._compute_dedicated_bounds(debug)
         self.voice_bounds = self._compute_voice_bounds(debug)
@@ -70,15 +121,37 @@ class MicPipeApp(rumps.App):
         self.current_service = state["current_service"]
         self.sound_enabled = state["sound_enabled"]
         self.dedicated_windows = state["dedicated_windows"]
+        # Locations saved by older versions still use tab indexes; they are
+        # translated to stable tab ids the first time they are used.
+        self._legacy_tab_index_services = set(state["legacy_tab_index_services"])
         self.trigger_key = state["trigger_key"]
         self.voice_idle_timeout_seconds = state["voice_idle_timeout_seconds"]
         self.pipe_slots = state["pipe_slots"]
         self.current_pipe_slot = state["current_pipe_slot"]
+        self.pipe_stream_mode = state["pipe_stream_mode"]
+        self.fast_start = state["fast_start"]
         self.chatgpt_chrome = ChatGPTChrome()
         self.gemini_chrome = GeminiChrome()
+        for controller in (self.chatgpt_chrome, self.gemini_chrome):
+            # Opt-in: evaluate page JS over Chrome DevTools when MICPIPE_CDP_PORT is set.
+            controller.set_js_backend(create_cdp_transport())
         self.chrome = self.chatgpt_chrome if self.current_service == "ChatGPT" else self.gemini_chrome  # Active controller
+        # Flows run as coroutines on one background event loop; their Chrome
+        # calls go through a single worker thread (see flow_runner).
+        self.achrome = AsyncChrome(lambda: self.chrome, chrome_scheduler)
+        # Probes nobody is waiting on queue behind user actions and are
+        # dropped when they can't start in time.
+        self.achrome_background = self.achrome.options(
+            priority=BACKGROUND, deadline=BACKGROUND_CALL_DEADLINE_SECONDS
+        )
+        self.flows = flows or FlowRunner()
+        # Control socket for the CLI; started by run_app (see control_socket).
+        self.control = None
 
         self.is_recording = False
+        self._dictation_starting = False
+        self._start_interrupted = False  # A start flow was cancelled mid-way (Esc)
+        self._dictation_session = 0  # Bumped on every start; lets a late verification see it is stale
         self.is_voice_conversation = False
         self._voice_conversation_starting = False
         self._voice_activity_signature = ""
@@ -107,7 +180,7 @@ class MicPipeApp(rumps.App):
 
         # Ensure dedicated window exists at startup (in background)
         self._ensure_dedicated_window()
-        threading.Thread(target=self._check_service_ready_on_startup).start()
+        self.flows.submit(self._check_service_ready_on_startup)
 
         # Build menu
         self.status_item = rumps.MenuItem("Status: Ready", callback=None)
@@ -179,6 +252,15 @@ class MicPipeApp(rumps.App):
             self.pipe_menu.add(slot_submenu)
             
         self.pipe_menu.add(None)  # Separator
+        # Streaming output: paste the response chunk by chunk while it is generated
+        self.pipe_stream_menu = rumps.MenuItem("Stream Output")
+        self.pipe_stream_items = {}
+        for mode, display_name in MicPipeStateStore.PIPE_STREAM_OPTIONS:
+            item = rumps.MenuItem(display_name, callback=self._make_pipe_stream_callback(mode))
+            item.state = 1 if mode == self.pipe_stream_mode else 0
+            self.pipe_stream_items[mode] = item
+            self.pipe_stream_menu.add(item)
+        self.pipe_menu.add(self.pipe_stream_menu)
         # Add non-clickable note about latency
         latency_note = rumps.MenuItem("Note: AI processing adds latency", callback=None)
         self.pipe_menu.add(latency_note)
@@ -192,6 +274,10 @@ class MicPipeApp(rumps.App):
             "Sound: On" if self.sound_enabled else "Sound: Off",
             callback=self.toggle_sound
         )
+        self.fast_start_item = rumps.MenuItem(
+            "Fast Start: On" if self.fast_start else "Fast Start: Off",
+            callback=self.toggle_fast_start
+        )
         self.reset_item = rumps.MenuItem("Reset (Self-Check & Repair)", callback=self.reset_app)
         self.version_info = rumps.MenuItem(f"Version: {__version__}", callback=None)
         self._refresh_voice_menu_info()
@@ -214,6 +300,7 @@ class MicPipeApp(rumps.App):
             None,  # Separator
             self.system_section_title,
             self.sound_toggle_item,
+            self.fast_start_item,
             self.reset_item,
             None,  # Separator
             self.version_info
@@ -231,9 +318,81 @@ class MicPipeApp(rumps.App):
             self.trigger_key,
             self.voice_idle_timeout_seconds,
             self.pipe_slots,
-            self.current_pipe_slot
+            self.current_pipe_slot,
+            self.pipe_stream_mode,
+            self.fast_start,
+            self._legacy_tab_index_services,
         )
 
+    def flush_state(self):
+        """Write the state and learned latencies still waiting to be written behind."""
+        for store in (self.state_store, self.poll_scheduler, self.paste_timing, self.latency):
+            store.flush()
+
+    def _quit(self, sender):
+        self.flush_state()
+        if self.control is not None:
+            self.control.close()
+        rumps.quit_application(sender)
+
+    @property
+    def current_state(self):
+        return self._current_state
+
+    @current_state.setter
+    def current_state(self, value):
+        changed = value != getattr(self, "_current_state", None)
+        self._current_state = value
+        if changed and getattr(self, "control", None) is not None:
+            self.control.publish({"event": "state", **self._control_status()})
+
+    def _control_status(self):
+        return {
+            "state": self._current_state,
+            "voice": self.is_voice_conversation,
+            "recording": self.is_recording,
+            "service": self.current_service,
+        }
+
+    async def _control_ping(self, request):
+        return {"version": __version__, "pid": os.getpid()}
+
+    async def _control_get_status(self, request):
+        return {"status": self._control_status()}
+
+    async def _control_voice(self, request):
+        """Start, stop or toggle the voice conversation; with ``wait`` reply once it is done."""
+        action = request.get("action", "toggle")
+        if action == "toggle":
+            action = "stop" if self.is_voice_conversation else "start"
+        if action == "start":
+            flow = self.start_voice_conversation
+        elif action == "stop":
+            flow = self.stop_voice_conversation
+        else:
+            raise ControlError(f"unknown voice action '{action}'")
+        future = self.flows.submit(flow, lane=SESSION_LANE, dedupe=True)
+        if request.get("wait"):
+            await asyncio.wrap_future(future)
+        return {"action": action, "status": self._control_status()}
+
+    def _start_control_server(self):
+        """Serve the control socket, if this process holds the instance lock."""
+        if self.instance_lock is None:
+            logger.debug("No instance lock; control socket not started")
+            return
+        control = ControlServer(
+            os.path.join(os.path.dirname(self.state_path), SOCKET_NAME),
+            {"ping": self._control_ping, "status": self._control_get_status, "voice": self._control_voice},
+            self.flows.loop,
+        )
+        try:
+            control.start()
+            self.control = control
+        except Exception as e:
+            # The CLI falls back to the command file.
+            logger.warning(f"Control socket unavailable: {e}")
+
     def _make_hotkey_callback(self, keycode):
         """Create a callback function for hotkey menu item selection."""
         def callback(_):
@@ -300,6 +459,15 @@ class MicPipeApp(rumps.App):
                 rumps.notification("MicPipe", "AI Pipe", f"Using: {msg}")
         return callback
 
+    def _make_pipe_stream_callback(self, mode):
+        """Create callback for selecting how AI Pipe output is pasted"""
+        def callback(_):
+            for m, item in self.pipe_stream_items.items():
+                item.state = 1 if m == mode else 0
+            self.pipe_stream_mode = mode
+            self._save_state()
+        return callback
+
     def _make_edit_slot_callback(self, slot_index):
         """Create callback for editing a pipe slot using standalone editor"""
         def callback(_):
@@ -406,16 +574,14 @@ class MicPipeApp(rumps.App):
         except Exception:
             return (160, 100, 160 + width, 100 + height)
 
-    def _get_ready_status(self, res: str) -> str:
-        if not res or not res.startswith("SUCCESS"):
-            return ""
-        return res.rsplit(":", 1)[-1]
+    def _get_ready_status(self, res: PageResult) -> str:
+        return res.status if res.delivered else ""
 
-    def _prompt_service_login(self, details: str):
+    async def _prompt_service_login(self, details: str):
         location = self.service_tab_location or self.dedicated_windows.get(self.current_service)
         if location:
             try:
-                self.chrome.reveal_window(location[0])
+                await self.achrome.reveal_window(location[0])
             except Exception:
                 pass
         rumps.notification(
@@ -446,23 +612,17 @@ class MicPipeApp(rumps.App):
             return f"Could not create the dedicated {service_name} window. Details: {error}"
         return f"Could not create the dedicated {service_name} window."
 
-    def _update_service_tab_location_from_result(self, result: str):
+    def _update_service_tab_location_from_result(self, result: PageResult):
         """Update self.service_tab_location when Chrome reports the actual window/tab used."""
-        if not result:
+        if result.location is None:
             return
-        m = self._TAB_LOC_RE.search(result)
-        if not m:
-            return
-        try:
-            win_id = int(m.group(1))
-            tab_idx = int(m.group(2))
-        except Exception:
-            return
-        if win_id > 0 and tab_idx > 0:
+        win_id, tab_id = result.location
+        if win_id > 0 and tab_id > 0:
             old = self.service_tab_location
-            self.service_tab_location = (win_id, tab_idx)
+            self.service_tab_location = (win_id, tab_id)
             self.dedicated_window = self.service_tab_location
             self.dedicated_windows[self.current_service] = self.service_tab_location
+            self._legacy_tab_index_services.discard(self.current_service)
             self._save_state()
             if old != self.service_tab_location:
                 logger.debug(f"Updated service_tab_location: {old} -> {self.service_tab_location}")
@@ -474,6 +634,11 @@ class MicPipeApp(rumps.App):
             service_name = self.current_service
 
             location = self.dedicated_windows.get(service_name)
+            if location and service_name in self._legacy_tab_index_services:
+                self._legacy_tab_index_services.discard(service_name)
+                location = chrome.resolve_tab_id(*location)
+                logger.info(f"Migrated {service_name} dedicated window location to tab id: {location}")
+                self.dedicated_windows[service_name] = location
             if location and chrome.is_window_alive(*location):
                 self.dedicated_window = location
                 self.service_tab_location = location
@@ -516,6 +681,9 @@ class MicPipeApp(rumps.App):
         except Exception as e:
             logger.debug(f"Failed to demote dedicated window: {e}")
 
+    async def _refresh_dedicated_window(self):
+        await self.achrome.run(self._ensure_dedicated_window)
+
     def select_chatgpt(self, _):
         """Switch to ChatGPT service."""
         if self.is_recording:
@@ -526,7 +694,7 @@ class MicPipeApp(rumps.App):
         self.service_gemini.state = 0
         self.cancel_mode_info.title = "  Press Esc → Cancel Dictation"
         self._save_state()
-        self._ensure_dedicated_window()
+        self.flows.submit(self._refresh_dedicated_window, lane=SESSION_LANE)
 
     def select_gemini(self, _):
         """Switch to Gemini service."""
@@ -538,7 +706,7 @@ class MicPipeApp(rumps.App):
         self.service_gemini.state = 1
         self.cancel_mode_info.title = "  Press Esc → Cancel (ChatGPT only)"
         self._save_state()
-        self._ensure_dedicated_window()
+        self.flows.submit(self._refresh_dedicated_window, lane=SESSION_LANE)
 
     def _check_cmd_file(self):
         """Check for CLI command file and execute if present."""
@@ -549,23 +717,17 @@ class MicPipeApp(rumps.App):
                 cmd = f.read().strip()
             os.remove(self._cmd_file)
             if cmd == "voice-start":
-                threading.Thread(target=self.start_voice_conversation).start()
+                self.flows.submit(self.start_voice_conversation, lane=SESSION_LANE, dedupe=True)
             elif cmd == "voice-stop":
-                threading.Thread(target=self.stop_voice_conversation).start()
+                self.flows.submit(self.stop_voice_conversation, lane=SESSION_LANE, dedupe=True)
             elif cmd == "voice-toggle":
                 if self.is_voice_conversation:
-                    threading.Thread(target=self.stop_voice_conversation).start()
+                    self.flows.submit(self.stop_voice_conversation, lane=SESSION_LANE, dedupe=True)
                 else:
-                    threading.Thread(target=self.start_voice_conversation).start()
+                    self.flows.submit(self.start_voice_conversation, lane=SESSION_LANE, dedupe=True)
         except Exception as e:
             logger.debug(f"Failed to process CLI command file: {e}")
 
-    def _extract_success_payload(self, result: str) -> str:
-        if not result or not result.startswith("SUCCESS:"):
-            return ""
-        payload = result.split("SUCCESS:", 1)[1]
-        return re.sub(r"^(?:USED_WIN_ID|FALLBACK_WIN_ID)=\d+,TAB=\d+:", "", payload, count=1)
-
     def _reset_voice_activity_tracking(self):
         self._voice_activity_signature = ""
         self._last_voice_activity_at = 0.0
@@ -581,23 +743,19 @@ class MicPipeApp(rumps.App):
             compact = "..." + compact[-117:]
         return compact
 
-    def _get_voice_activity_signature(self):
+    async def _get_voice_activity_signature(self):
         if not self.service_tab_location or self.current_service != "ChatGPT":
             return False, ""
         try:
-            res = self.chrome.get_voice_activity_snapshot(
+            res = await self.achrome_background.get_voice_activity_snapshot(
                 preferred_location=self.service_tab_location
             )
         except Exception as e:
             logger.debug(f"Voice activity snapshot failed: {e}")
             return False, ""
-        payload = self._extract_success_payload(res)
-        if not payload:
-            return False, ""
-        try:
-            data = json.loads(payload)
-        except Exception as e:
-            logger.debug(f"Failed to parse voice activity snapshot: {e}; payload={payload[:200]}")
+        data = res.payload
+        if res.status != "SNAPSHOT" or not isinstance(data, dict):
+            logger.debug(f"Unexpected voice activity snapshot: {str(res)[:200]}")
             return False, ""
         assistant_text = str(data.get("assistant_text") or "").strip()
         user_text = str(data.get("user_text") or "").strip()
@@ -609,11 +767,11 @@ class MicPipeApp(rumps.App):
         )
         return bool(data.get("active")), signature
 
-    def _check_voice_idle_timeout(self):
+    async def _check_voice_idle_timeout(self):
         try:
             if self.voice_idle_timeout_seconds <= 0:
                 return
-            _active, signature = self._get_voice_activity_signature()
+            _active, signature = await self._get_voice_activity_signature()
             now = time.time()
             self._last_voice_activity_check_at = now
             if not self.is_voice_conversation:
@@ -639,7 +797,7 @@ class MicPipeApp(rumps.App):
                 logger.info(
                     f"Voice conversation idle for {idle_for:.1f}s; auto-stopping."
                 )
-                threading.Thread(target=self.stop_voice_conversation, daemon=True).start()
+                self.flows.submit(self.stop_voice_conversation, lane=SESSION_LANE, dedupe=True)
         except Exception as e:
             logger.debug(f"Voice idle check failed: {e}")
         finally:
@@ -658,7 +816,7 @@ class MicPipeApp(rumps.App):
             and self.animation_frame % 10 == 0
         ):
             self._voice_activity_check_inflight = True
-            threading.Thread(target=self._check_voice_idle_timeout, daemon=True).start()
+            self.flows.submit(self._check_voice_idle_timeout)
         if self.tap and self.animation_frame % 50 == 0:
             try:
                 if not Quartz.CGEventTapIsEnabled(self.tap):
@@ -735,39 +893,147 @@ class MicPipeApp(rumps.App):
         self.sound_toggle_item.title = "Sound: On" if self.sound_enabled else "Sound: Off"
         self._save_state()
 
-    def _is_recording_active(self) -> bool:
+    def toggle_fast_start(self, _):
+        self.fast_start = not self.fast_start
+        self.fast_start_item.title = "Fast Start: On" if self.fast_start else "Fast Start: Off"
+        self._save_state()
+
+    async def _is_recording_active(self) -> bool:
         try:
-            res = self.chrome.is_recording_active(preferred_location=self.service_tab_location)
+            res = await self.achrome.is_recording_active(preferred_location=self.service_tab_location)
         except Exception as e:
             logger.debug(f"Recording-state check raised exception: {e}")
             return False
-        if isinstance(res, bool):
-            return res
-        if not res:
-            return False
-        status = str(res)
-        if status.startswith("SUCCESS"):
-            status = status.rsplit(":", 1)[-1]
-        return status == "ACTIVE"
+        return res.status == "ACTIVE"
+
+    async def _check_ready_and_start(self, chrome=None):
+        """Run the ready check and the start click in one Chrome round-trip.
+
+        Returns ``(ready_result, start_result)`` PageResults; ``start_result``
+        is SKIPPED when the page was not ready and nothing was clicked. ``chrome`` is the
+        AsyncChrome view to queue it on (default: foreground).
+        """
+        results = await (chrome or self.achrome).run_batch(
+            [
+                BatchOp("is_page_ready", expect=("READY",)),
+                BatchOp("start_dictation", args=self._start_dictation_args()),
+            ],
+            preferred_location=self.service_tab_location,
+        )
+        return results[0], results[1]
+
+    def _start_dictation_args(self):
+        # With Fast Start, ChatGPT confirms the start in the page after the click.
+        if self.fast_start and self.current_service == "ChatGPT":
+            return {"verify_ms": int(START_VERIFY_TIMEOUT_SECONDS * 1000)}
+        return None
+
+    async def _start_dictation(self, first_result=None):
+        """Start dictation; returns ``(started, result)``.
+
+        With Fast Start the click alone counts as started and the page is
+        checked afterwards by _verify_dictation_start, which rolls back a start
+        that did not take. Otherwise this waits for the verification.
+        """
+        if not self.fast_start:
+            return await self._start_dictation_with_verification(first_result=first_result)
+        res = first_result
+        if res is None:
+            res = await self.achrome.start_dictation(
+                preferred_location=self.service_tab_location,
+                verify_timeout=START_VERIFY_TIMEOUT_SECONDS,
+            )
+        if res.status != "START_DONE":
+            return False, res
+        self._update_service_tab_location_from_result(res)
+        self._dictation_session += 1
+        self.flows.submit(self._verify_dictation_start, self._dictation_session)
+        return True, res
+
+    async def _confirm_dictation_started(self):
+        """True once the page shows it is recording."""
+        if self.current_service == "ChatGPT":
+            chrome = self.achrome.background
+            deadline = self.clock() + START_VERIFY_TIMEOUT_SECONDS + 0.5
+            while True:
+                remaining = deadline - self.clock()
+                status = (await chrome.start_status(
+                    preferred_location=self.service_tab_location, wait=max(remaining, 0.1)
+                )).status
+                if status == "ACTIVE":
+                    return True
+                if status != "PENDING":
+                    break
+                if remaining <= 0:
+                    return False
+                if self.chrome.cdp is None:
+                    await asyncio.sleep(START_STATUS_POLL_SECONDS)
+            if status == "FAILED":
+                return False
+            logger.debug(f"In-page start verification unavailable ({status[:80]}); checking directly")
+        await asyncio.sleep(0.5)
+        return await self._is_recording_active()
+
+    async def _verify_dictation_start(self, session):
+        """Confirm a Fast Start in the background; undo it if the page never started recording."""
+        max_attempts = 2 if self.current_service == "ChatGPT" else 1
+        res = None
+        for attempt in range(max_attempts):
+            if attempt:
+                res = await self.achrome.start_dictation(
+                    preferred_location=self.service_tab_location,
+                    verify_timeout=START_VERIFY_TIMEOUT_SECONDS,
+                )
+                if res.status != "START_DONE":
+                    break
+            started = await self._confirm_dictation_started()
+            if session != self._dictation_session or not self.is_recording:
+                return  # Stopped or cancelled in the meantime.
+            if started:
+                logger.debug(f"Dictation start confirmed (attempt {attempt + 1}/{max_attempts}).")
+                return
+            logger.warning(
+                f"Dictation start not confirmed after click (attempt {attempt + 1}/{max_attempts})."
+            )
+        if session != self._dictation_session or not self.is_recording:
+            return
+        self.is_recording = False
+        self.current_state = "IDLE"
+        self.status_item.title = "Status: Ready"
+        self._play_sound(self._sound_stop)
+        details = res if res is not None and res.status != "START_DONE" else PageResult("VERIFY_FAILED")
+        rumps.notification(
+            "MicPipe",
+            "Start Failed",
+            f"{self.current_service} did not start recording. Please try again. Details: {details}"
+        )
 
-    def _start_dictation_with_verification(self):
-        """Start dictation and verify the page actually entered recording state."""
+    async def _start_dictation_with_verification(self, first_result=None):
+        """Start dictation and verify the page actually entered recording state.
+
+        ``first_result`` is the outcome of a start click that was already sent
+        (e.g. batched with the ready check); the first attempt then only verifies.
+        """
         max_attempts = 2 if self.current_service == "ChatGPT" else 1
-        last_result = ""
+        last_result = None
         for attempt in range(max_attempts):
-            res = self.chrome.start_dictation(preferred_location=self.service_tab_location)
+            if attempt == 0 and first_result is not None:
+                res = first_result
+            else:
+                res = await self.achrome.start_dictation(preferred_location=self.service_tab_location)
             last_result = res
-            if not res.startswith("SUCCESS"):
+            if res.status != "START_DONE":
                 return False, res
             self._update_service_tab_location_from_result(res)
-            time.sleep(0.5)
-            if self._is_recording_active():
+            await asyncio.sleep(0.5)
+            if await self._is_recording_active():
                 return True, res
             logger.warning(
                 f"Recording verification failed after start click "
                 f"(attempt {attempt + 1}/{max_attempts})."
             )
-        return False, last_result or "VERIFY_FAILED"
+        # The click went through but the page never showed it recording.
+        return False, PageResult("VERIFY_FAILED", last_result.location if last_result else None)
 
     def reset_app(self, _):
         """Run a lightweight self-check and recovery routine."""
@@ -782,12 +1048,16 @@ class MicPipeApp(rumps.App):
             except Exception as e:
                 tap_msg = f"Event Tap error: {e}"
 
+        # Pre-empts whatever dictation or voice flow is still running.
+        self.flows.submit(self._reset_app, previous_app, tap_msg, lane=SESSION_LANE, preempt=True)
+
+    async def _reset_app(self, previous_app, tap_msg):
         service_name = self.current_service
         old_location = self.service_tab_location or self.dedicated_windows.get(service_name)
         closed_old = False
         if old_location:
             try:
-                closed_old = self.chrome.close_window(old_location[0])
+                closed_old = await self.achrome.close_window(old_location[0])
             except Exception:
                 closed_old = False
 
@@ -795,16 +1065,17 @@ class MicPipeApp(rumps.App):
         self.service_tab_location = None
         self.dedicated_window = None
 
-        new_location, _ = self._ensure_dedicated_window()
+        new_location, _ = await self.achrome.run(self._ensure_dedicated_window)
         window_ok = bool(new_location)
         if new_location:
             try:
                 # Extra guard: keep dedicated window at the bottom after repair.
-                self.chrome.demote_window(new_location[0])
+                await self.achrome.demote_window(new_location[0])
             except Exception:
                 pass
 
         self.is_recording = False
+        self._start_interrupted = False
         self.is_voice_conversation = False
         self._voice_conversation_starting = False
         self._reset_voice_activity_tracking()
@@ -819,7 +1090,7 @@ class MicPipeApp(rumps.App):
         # so repair does not leave user on the dedicated Chrome window.
         if previous_app:
             try:
-                time.sleep(0.05)
+                await asyncio.sleep(0.05)
                 previous_app.activateWithOptions_(NSApplicationActivateIgnoringOtherApps)
             except Exception:
                 pass
@@ -840,11 +1111,14 @@ class MicPipeApp(rumps.App):
             keycode = Quartz.CGEventGetIntegerValueField(event, 9)
             if keycode == 53:  # Esc
                 if self.is_voice_conversation:
-                    threading.Thread(target=self.stop_voice_conversation).start()
+                    self.flows.submit(self.stop_voice_conversation, lane=SESSION_LANE, dedupe=True)
                     return event
                 # Gemini does not support cancel, only ChatGPT does
-                if self.current_service == "ChatGPT" and (self.is_recording or self.waiting_for_page):
-                    threading.Thread(target=self.cancel_recording).start()
+                if self.current_service == "ChatGPT" and (
+                    self.is_recording or self.waiting_for_page or self._dictation_starting
+                ):
+                    # Pre-empt the running start flow instead of queueing behind it.
+                    self.flows.submit(self.cancel_recording, lane=SESSION_LANE, preempt=True)
                 return event
 
         if event_type == Quartz.kCGEventFlagsChanged:
@@ -860,13 +1134,13 @@ class MicPipeApp(rumps.App):
 
                     if self.is_voice_conversation:
                         if fn_pressed:
-                            threading.Thread(target=self.stop_voice_conversation).start()
+                            self.flows.submit(self.stop_voice_conversation, lane=SESSION_LANE, dedupe=True)
                         return event
 
                     if fn_pressed and not self.is_recording:
                         control_held = bool(flags & Quartz.kCGEventFlagMaskControl)
                         if control_held and self.current_service == "ChatGPT":
-                            threading.Thread(target=self.start_voice_conversation).start()
+                            self.flows.submit(self.start_voice_conversation, lane=SESSION_LANE, dedupe=True)
                             return event
 
             # Handle trigger key - Dual Mode (Hold or Toggle) + Voice Conversation
@@ -884,17 +1158,36 @@ class MicPipeApp(rumps.App):
 
                 # Normal dictation trigger
                 if key_pressed and not self.is_recording:
-                    threading.Thread(target=lambda: self.start_recording(is_hold_mode=True)).start()
+                    self.flows.submit(
+                        self.start_recording, True, self.clock(), lane=SESSION_LANE, dedupe=True
+                    )
                 elif not key_pressed:
                     # User released trigger key
                     if self.is_recording:
-                        threading.Thread(target=self.stop_recording).start()
+                        self.flows.submit(
+                            self.stop_recording, self.clock(), lane=SESSION_LANE, dedupe=True
+                        )
 
         return event
 
-    def cancel_recording(self):
+    async def cancel_recording(self):
         """Cancel the current dictation without pasting text (ChatGPT only)"""
-        if not self.is_recording and not self.waiting_for_page:
+        action = self._dictation_action
+        if action is None:
+            await self._cancel_recording()
+            return
+        self._dictation_action = None
+        with action:
+            try:
+                await self._cancel_recording()
+            finally:
+                action.finish()
+
+    async def _cancel_recording(self):
+        # A start flow pre-empted by this cancel may already have clicked Dictate.
+        interrupted = self._start_interrupted
+        self._start_interrupted = False
+        if not self.is_recording and not self.waiting_for_page and not interrupted:
             return
 
         # Gemini does not support cancel
@@ -906,33 +1199,49 @@ class MicPipeApp(rumps.App):
             self.waiting_for_page = False
             self.should_auto_start = False
 
-        if self.is_recording:
+        was_recording = self.is_recording
+        if was_recording or interrupted:
             self.is_recording = False
-            self._play_sound(self._sound_stop)
+            if was_recording:
+                self._play_sound(self._sound_stop)
             self.current_state = "PROCESSING"
             self.status_item.title = "Status: ⏳ Cancelling..."
             try:
-                self.chrome.cancel_dictation(preferred_location=self.service_tab_location)
+                await self.achrome.cancel_dictation(preferred_location=self.service_tab_location)
             except Exception:
                 pass
 
         # Push dedicated window to back before restoring focus
         if self.service_tab_location:
             try:
-                self.chrome.demote_window(self.service_tab_location[0])
+                await self.achrome.demote_window(self.service_tab_location[0])
             except Exception:
                 pass
 
         # Restore focus to original app
         if self.target_app:
-            time.sleep(0.1)
+            await asyncio.sleep(0.1)
             self.target_app.activateWithOptions_(NSApplicationActivateIgnoringOtherApps)
 
         self.current_state = "IDLE"
         self.status_item.title = "Status: Ready"
 
-    def start_voice_conversation(self):
+    @contextlib.contextmanager
+    def _user_action(self, name):
+        """Account the Chrome calls made inside the block to a new user action."""
+        action = call_accounting.ledger.begin(name)
+        with action:
+            try:
+                yield action
+            finally:
+                action.finish()
+
+    async def start_voice_conversation(self):
         """Start a ChatGPT real-time voice conversation."""
+        with self._user_action("voice_start"):
+            await self._start_voice_conversation()
+
+    async def _start_voice_conversation(self):
         if self.is_recording or self.is_voice_conversation or self._voice_conversation_starting:
             return
         if self.current_service != "ChatGPT":
@@ -947,7 +1256,7 @@ class MicPipeApp(rumps.App):
         self.target_app = NSWorkspace.sharedWorkspace().frontmostApplication()
 
         # Ensure dedicated window exists
-        location, created = self._ensure_dedicated_window()
+        location, created = await self.achrome.run(self._ensure_dedicated_window)
         if not location:
             self._voice_conversation_starting = False
             rumps.notification(
@@ -965,7 +1274,7 @@ class MicPipeApp(rumps.App):
             return
 
         # Check page readiness
-        ready_res = self.chrome.is_page_ready(preferred_location=self.service_tab_location)
+        ready_res = await self.achrome.is_page_ready(preferred_location=self.service_tab_location)
         status = self._get_ready_status(ready_res)
         if status != "READY":
             self._voice_conversation_starting = False
@@ -975,31 +1284,31 @@ class MicPipeApp(rumps.App):
 
         if self.service_tab_location:
             try:
-                revealed = self.chrome.reveal_window(
+                revealed = await self.achrome.reveal_window(
                     self.service_tab_location[0], bounds=self.voice_bounds
                 )
                 if not revealed:
                     logger.warning("Failed to reveal ChatGPT window before starting voice.")
-                time.sleep(0.8)
+                await asyncio.sleep(0.8)
             except Exception as e:
                 logger.warning(f"Failed to reveal ChatGPT window before starting voice: {e}")
 
         # Click the "Use Voice" button. If the composer has pending text,
         # clear the draft first and wait for the voice button to return.
-        res = self.chrome.start_voice_conversation(preferred_location=self.service_tab_location)
-        if res and "VOICE_DRAFT_CLEARED" in res:
+        res = await self.achrome.start_voice_conversation(preferred_location=self.service_tab_location)
+        if res.status == "VOICE_DRAFT_CLEARED":
             logger.info("Voice start fallback: cleared pending composer draft before retry.")
             max_wait_attempts = 10
             for attempt in range(max_wait_attempts):
-                time.sleep(0.25)
-                res = self.chrome.start_voice_conversation(preferred_location=self.service_tab_location)
-                if res and "VOICE_START_CLICKED" in res:
+                await asyncio.sleep(0.25)
+                res = await self.achrome.start_voice_conversation(preferred_location=self.service_tab_location)
+                if res.status == "VOICE_START_CLICKED":
                     logger.info(
                         f"Voice button became available after clearing pending draft "
                         f"(wait {0.25 * (attempt + 1):.2f}s)."
                     )
                     break
-                if res and "VOICE_DRAFT_CLEARED" in res:
+                if res.status == "VOICE_DRAFT_CLEARED":
                     logger.info("Voice start retry cleared pending composer draft again.")
                     continue
             else:
@@ -1007,13 +1316,13 @@ class MicPipeApp(rumps.App):
                     "Voice button did not reappear after clearing pending draft."
                 )
 
-        if res and "VOICE_START_CLICKED" in res:
+        if res.status == "VOICE_START_CLICKED":
             self._update_service_tab_location_from_result(res)
             # Wait briefly for voice mode to initialize
-            time.sleep(1.0)
-            verify_res = self.chrome.is_voice_conversation_active(
+            await asyncio.sleep(1.0)
+            verify_res = await self.achrome.is_voice_conversation_active(
                 preferred_location=self.service_tab_location)
-            if verify_res and "ACTIVE" in verify_res:
+            if verify_res.status == "ACTIVE":
                 self.is_voice_conversation = True
                 self.current_state = "VOICE_CONVERSATION"
                 self.status_item.title = "Status: 🗣️ Voice Conversation"
@@ -1049,20 +1358,24 @@ class MicPipeApp(rumps.App):
 
         # Keep ChatGPT visible during realtime voice. If start failed, restore focus and hide the window again.
         if not self.is_voice_conversation:
-            self._hide_dedicated_window()
+            await self.achrome.run(self._hide_dedicated_window)
         if self.target_app and not self.is_voice_conversation:
-            time.sleep(0.1)
+            await asyncio.sleep(0.1)
             self.target_app.activateWithOptions_(NSApplicationActivateIgnoringOtherApps)
 
-    def stop_voice_conversation(self):
+    async def stop_voice_conversation(self):
         """Stop an active voice conversation."""
+        with self._user_action("voice_stop"):
+            await self._stop_voice_conversation()
+
+    async def _stop_voice_conversation(self):
         if not self.is_voice_conversation:
             return
 
         self._play_sound(self._sound_voice_stop)
 
-        res = self.chrome.stop_voice_conversation(preferred_location=self.service_tab_location)
-        if res and "VOICE_STOP_BTN_NOT_FOUND" in res:
+        res = await self.achrome.stop_voice_conversation(preferred_location=self.service_tab_location)
+        if res.status == "VOICE_STOP_BTN_NOT_FOUND":
             logger.warning("Could not find voice stop button; conversation may still be active in Chrome.")
 
         self.is_voice_conversation = False
@@ -1071,11 +1384,11 @@ class MicPipeApp(rumps.App):
         self.current_state = "IDLE"
         self.status_item.title = "Status: Ready"
 
-        self._hide_dedicated_window()
+        await self.achrome.run(self._hide_dedicated_window)
 
         if self.target_app:
             try:
-                time.sleep(0.1)
+                await asyncio.sleep(0.1)
                 self.target_app.activateWithOptions_(NSApplicationActivateIgnoringOtherApps)
             except Exception:
                 pass
@@ -1100,20 +1413,20 @@ class MicPipeApp(rumps.App):
             return bool(flags & mask)
         return False
 
-    def _enter_waiting_state(self, is_hold_mode):
+    async def _enter_waiting_state(self, is_hold_mode):
         """Enter waiting state while the service page loads."""
         self.current_state = "WAITING"
         self.status_item.title = "Status: ⏳ Loading page..."
         self.waiting_for_page = True
         # Always auto-start once the page is ready (both Hold and Toggle)
         self.should_auto_start = True
-        threading.Thread(target=self._wait_and_start_recording).start()
         # Restore focus while the page loads so dictation result can paste back.
         if self.target_app:
-            time.sleep(0.1)
+            await asyncio.sleep(0.1)
             self.target_app.activateWithOptions_(NSApplicationActivateIgnoringOtherApps)
+        await self._wait_and_start_recording()
 
-    def _check_service_ready_on_startup(self):
+    async def _check_service_ready_on_startup(self):
         """On app launch, verify that the service page is usable and prompt if not."""
         max_wait_time = 20
         poll_interval = 0.5
@@ -1121,37 +1434,63 @@ class MicPipeApp(rumps.App):
         btn_missing_hits = 0
 
         while elapsed < max_wait_time:
-            time.sleep(poll_interval)
+            await asyncio.sleep(poll_interval)
             elapsed += poll_interval
 
             if not self.service_tab_location:
                 return
 
-            res = self.chrome.is_page_ready(preferred_location=self.service_tab_location)
+            try:
+                # Ask for the page's button labels only on the check that gives up.
+                res = await self.achrome_background.is_page_ready(
+                    preferred_location=self.service_tab_location, diagnostics=btn_missing_hits >= 5
+                )
+            except ChromeDeadlineExceeded:
+                continue
             status = self._get_ready_status(res)
             if status == "READY":
                 return
-            if status.startswith("BTN_NOT_FOUND"):
+            if status == "BTN_NOT_FOUND":
                 btn_missing_hits += 1
                 logger.debug(f"Startup ready check: {res}")
                 if btn_missing_hits >= 6:
                     logger.warning(f"Startup: dictate button not found after {btn_missing_hits} checks. Last result: {res}")
-                    self._prompt_service_login("Please sign in within the dedicated window and try again.")
+                    await self._prompt_service_login("Please sign in within the dedicated window and try again.")
                     return
             else:
                 btn_missing_hits = 0
 
-    def start_recording(self, is_hold_mode=False):
-        """Start recording (for both Hold and Toggle modes)"""
+    async def start_recording(self, is_hold_mode=False, key_at=None):
+        """Start recording (for both Hold and Toggle modes); ``key_at`` is the key edge time"""
         if self.is_recording or self.is_voice_conversation:
             return
-
+        self._start_trace = self.latency.trace("start", self.current_service, start=key_at)
+        self._dictation_starting = True
+        action = self._dictation_action = call_accounting.ledger.begin(
+            "dictation" if self._ai_pipe_prompt() is None else "ai_pipe"
+        )
+        with action:
+            try:
+                await self._start_recording(is_hold_mode)
+            except asyncio.CancelledError:
+                # Pre-empted by Esc; cancel_recording undoes a click that may have landed.
+                self._start_interrupted = True
+                raise
+            finally:
+                self._dictation_starting = False
+                if not self.is_recording and not self._start_interrupted:
+                    # Nothing to stop: the action ends with the failed start.
+                    action.finish()
+                    self._dictation_action = None
+
+    async def _start_recording(self, is_hold_mode):
         # 1. Record the current focused application
         self.target_app = NSWorkspace.sharedWorkspace().frontmostApplication()
         self.target_is_service_page = False
 
         # 2. Ensure dedicated window exists
-        location, created = self._ensure_dedicated_window()
+        location, created = await self.achrome.run(self._ensure_dedicated_window)
+        self._start_trace.mark("window_ensure")
         if not location:
             self.current_state = "IDLE"
             self.status_item.title = "Status: Ready"
@@ -1164,15 +1503,21 @@ class MicPipeApp(rumps.App):
         self.service_tab_location = location
 
         if created:
-            self._enter_waiting_state(is_hold_mode)
+            await self._enter_waiting_state(is_hold_mode)
             return
 
-        # If the page is still loading, wait before starting dictation
-        ready_res = self.chrome.is_page_ready(preferred_location=self.service_tab_location)
+        # Check readiness and click Dictate in a single round-trip; the click
+        # only runs when the page reported READY.
+        ready_res, start_res = await self._check_ready_and_start()
         status = self._get_ready_status(ready_res)
         if status in ("PAGE_NOT_READY", "BTN_NOT_FOUND"):
-            self._enter_waiting_state(is_hold_mode)
+            await self._enter_waiting_state(is_hold_mode)
             return
+        self._start_trace.mark("page_ready")
+        if start_res.status == "SKIPPED":
+            # Ready check failed for another reason (e.g. tab lookup); let the
+            # regular start path report it.
+            start_res = None
 
         # 3. Update status and state
         self.current_state = "RECORDING"
@@ -1182,10 +1527,12 @@ class MicPipeApp(rumps.App):
         # Instead, we'll combine prompt + transcription in stop_recording.
 
         # 4. Start Chrome dictation and verify recording really started
-        started, res = self._start_dictation_with_verification()
+        started, res = await self._start_dictation(first_result=start_res)
         if started:
             self.is_recording = True
             self._play_sound(self._sound_start)
+            self._start_trace.mark("dictation_started")
+            self._start_trace.finish()
         else:
             # Failed to start or verification failed.
             self.current_state = "IDLE"
@@ -1198,21 +1545,20 @@ class MicPipeApp(rumps.App):
 
         # 4. Restore focus
         if self.target_app:
-            time.sleep(0.1)
+            await asyncio.sleep(0.1)
             self.target_app.activateWithOptions_(NSApplicationActivateIgnoringOtherApps)
 
-    def _wait_and_start_recording(self):
+    async def _wait_and_start_recording(self):
         """Poll for page readiness and start recording once ready"""
-        max_wait_time = 15  # Maximum 15 seconds
-        poll_interval = 0.5  # Check every 0.5 seconds
-        elapsed = 0
-        btn_missing_hits = 0
+        polls = self.poll_scheduler.plan(
+            f"{self.current_service}.page_ready", PAGE_READY_DEADLINE_SECONDS, PAGE_READY_LADDER
+        )
+        # Polls can be close together once readiness times are learned, so the
+        # missing-button checks go by how long the button has been missing.
+        btn_missing_since = None
         reloaded_once = False
 
-        while elapsed < max_wait_time:
-            time.sleep(poll_interval)
-            elapsed += poll_interval
-
+        async for _ in polls:
             # Check if user cancelled (e.g., released Fn key in Hold mode)
             if not self.should_auto_start:
                 self.waiting_for_page = False
@@ -1220,47 +1566,58 @@ class MicPipeApp(rumps.App):
                 self.status_item.title = "Status: Ready"
                 return
 
-            # Check if page is ready
-            res = self.chrome.is_page_ready(preferred_location=self.service_tab_location)
+            # Check if page is ready and start dictation in the same call. These
+            # polls yield to foreground calls such as a stop or cancel.
+            res, start_res = await self._check_ready_and_start(self.achrome.background)
             status = self._get_ready_status(res)
             if status == "READY":
+                polls.hit()
+                self._start_trace.mark("page_ready")
                 # Page is ready, check again if we should still start
                 if self.should_auto_start:
-                    self._retry_start_recording()
+                    await self._retry_start_recording(first_result=start_res)
                 else:
+                    # Cancelled while the click was in flight; undo it.
+                    if start_res.status == "START_DONE":
+                        try:
+                            await self.achrome.cancel_dictation(preferred_location=self.service_tab_location)
+                        except Exception:
+                            pass
                     self.waiting_for_page = False
                     self.current_state = "IDLE"
                     self.status_item.title = "Status: Ready"
                 return
             if status == "BTN_NOT_FOUND":
-                btn_missing_hits += 1
+                if btn_missing_since is None:
+                    btn_missing_since = polls.elapsed()
+                btn_missing_for = polls.elapsed() - btn_missing_since
                 if (
-                    btn_missing_hits >= 4
+                    btn_missing_for >= 1.5
                     and (not reloaded_once)
                     and self.service_tab_location
                 ):
                     reloaded_once = True
                     try:
-                        reloaded = self.chrome.reload_tab(*self.service_tab_location)
+                        reloaded = await self.achrome.reload_tab(*self.service_tab_location)
                         logger.warning(
                             f"Page ready check saw repeated BTN_NOT_FOUND; "
                             f"reload attempted (success={reloaded})."
                         )
                     except Exception as e:
                         logger.warning(f"Failed to reload service tab during wait: {e}")
-                    btn_missing_hits = 0
+                    btn_missing_since = None
                     continue
-                if btn_missing_hits >= 6:
+                if btn_missing_for >= 2.5:
                     self.waiting_for_page = False
                     self.should_auto_start = False
                     self.current_state = "IDLE"
                     self.status_item.title = "Status: Ready"
-                    self._prompt_service_login(
+                    await self._prompt_service_login(
                         "The dictation button is unavailable. Please sign in or check permissions, then try again."
                     )
                     return
             else:
-                btn_missing_hits = 0
+                btn_missing_since = None
 
         # Timeout: page didn't load in time
         self.waiting_for_page = False
@@ -1269,18 +1626,20 @@ class MicPipeApp(rumps.App):
         self.status_item.title = "Status: Ready"
         rumps.notification("MicPipe", "Timeout", "Page took too long to load. Please try again.")
 
-    def _retry_start_recording(self):
+    async def _retry_start_recording(self, first_result=None):
         """Retry starting recording after page loads"""
         # Clear waiting flags
         self.waiting_for_page = False
         self.should_auto_start = False
 
-        started, res = self._start_dictation_with_verification()
+        started, res = await self._start_dictation(first_result=first_result)
         if started:
             self.is_recording = True
             self.current_state = "RECORDING"
             self.status_item.title = "Status: 🎤 Recording..."
             self._play_sound(self._sound_start)
+            self._start_trace.mark("dictation_started")
+            self._start_trace.finish()
         else:
             # Failed to start even after waiting
             self.current_state = "IDLE"
@@ -1293,38 +1652,93 @@ class MicPipeApp(rumps.App):
 
         # Restore focus to original app
         if self.target_app:
-            time.sleep(0.1)
+            await asyncio.sleep(0.1)
             self.target_app.activateWithOptions_(NSApplicationActivateIgnoringOtherApps)
 
-    def stop_recording(self):
-        """Stop recording (for both Hold and Toggle modes)"""
+    async def stop_recording(self, key_at=None):
+        """Stop recording (for both Hold and Toggle modes); ``key_at`` is the key edge time"""
         if not self.is_recording:
             return
+        action = self._dictation_action or call_accounting.ledger.begin("dictation")
+        self._dictation_action = None
+        with action:
+            try:
+                await self._stop_recording(key_at)
+            finally:
+                action.finish()
+
+    def _ai_pipe_prompt(self):
+        """The prompt to send the transcription with, or None when AI Pipe is off.
+
+        AI Pipe activates when:
+        - slot >= 0 with a non-empty prompt, OR
+        - slot == -2 (Ask AI mode: no prompt, direct to ChatGPT)
+        """
+        if self.current_service != "ChatGPT":
+            return None
+        if self.current_pipe_slot == -2:
+            # Ask AI mode: no preset prompt
+            return ""
+        if self.current_pipe_slot >= 0:
+            slot = self.pipe_slots[self.current_pipe_slot]
+            prompt = slot.get("prompt", "") if isinstance(slot, dict) else slot
+            if prompt:
+                return prompt
+        return None
+
+    async def _stop_recording(self, key_at):
+        self._stop_trace = self.latency.trace("stop", self.current_service, start=key_at)
 
         self.is_recording = False
         self._play_sound(self._sound_stop)
         self.current_state = "PROCESSING"
         self.status_item.title = "Status: ⏳ Transcribing..."
 
+        # Branch based on AI Pipe mode
+        pipe_prompt = self._ai_pipe_prompt()
+        use_ai_pipe = pipe_prompt is not None
+        pipe_prompt = pipe_prompt or ""
+        action = call_accounting.current_action()
+        if action is not None:
+            action.name = "ai_pipe" if use_ai_pipe else "dictation"
+
+        # In ChatGPT the page itself waits for the transcript after the stop
+        # click and captures it the moment it appears. With AI Pipe it also
+        # prepends the prompt and sends the message without a round-trip.
+        fused_collect = (
+            self.current_service == "ChatGPT"
+            and not self.target_is_service_page
+        )
+
         logger.debug(f"Stopping dictation at location: {self.service_tab_location}")
-        stop_res = ""
+        stopped_at = self.clock()
         try:
-            stop_res = self.chrome.stop_dictation(preferred_location=self.service_tab_location)
+            if fused_collect:
+                stop_res = await self.achrome.stop_and_collect(
+                    preferred_location=self.service_tab_location,
+                    timeout=STOP_COLLECT_TIMEOUT_SECONDS,
+                    pipe_slot=self.current_pipe_slot if use_ai_pipe else None,
+                    pipe_prompt=pipe_prompt,
+                    send_timeout=PIPE_SEND_TIMEOUT_SECONDS,
+                )
+            else:
+                stop_res = await self.achrome.stop_dictation(preferred_location=self.service_tab_location)
         except Exception as e:
-            stop_res = f"EXCEPTION:{e}"
+            stop_res = PageResult("EXCEPTION", payload=str(e))
 
-        if stop_res.startswith("SUCCESS"):
+        if stop_res.delivered:
             # Capture the location reported by Chrome for follow-up actions.
             self._update_service_tab_location_from_result(stop_res)
+            self._stop_trace.mark("stop_clicked")
 
-        if (not stop_res) or ("NOT_FOUND" in stop_res) or ("BTN_NOT_FOUND" in stop_res):
+        if stop_res.status not in self.STOP_CLICKED_STATUSES:
             self.current_state = "IDLE"
             self.status_item.title = "Status: Ready"
             rumps.notification(
                 "MicPipe",
                 "Stop Failed",
                 f"Could not stop {self.current_service} dictation automatically. "
-                f"It may still be recording in Chrome. Details: {stop_res or 'UNKNOWN'}"
+                f"It may still be recording in Chrome. Details: {stop_res}"
             )
             return
 
@@ -1335,30 +1749,48 @@ class MicPipeApp(rumps.App):
             self.status_item.title = "Status: Ready"
             return
 
-
-        # Branch based on AI Pipe mode
-        # AI Pipe activates when:
-        # - slot >= 0 with a non-empty prompt, OR
-        # - slot == -2 (Ask AI mode: no prompt, direct to ChatGPT)
         text = ""
-        use_ai_pipe = False
-        if self.current_service == "ChatGPT":
-            if self.current_pipe_slot == -2:
-                # Ask AI mode: no preset prompt
-                use_ai_pipe = True
-            elif self.current_pipe_slot >= 0:
-                slot = self.pipe_slots[self.current_pipe_slot]
-                prompt = slot.get("prompt", "") if isinstance(slot, dict) else slot
-                if prompt:
-                    use_ai_pipe = True
-        
         if use_ai_pipe:
             # --- AI Pipe Mode ---
-            text = self._wait_and_copy_response()
-            if text and self.target_app:
-                self.target_app.activateWithOptions_(NSApplicationActivateIgnoringOtherApps)
-                time.sleep(0.2)
-                paste_text(text, snapshot=None)  # No clipboard restoration in AI mode
+            if self.pipe_stream_mode != "off" and self.target_app:
+                # Paste completed chunks while the response is still generating;
+                # the clipboard is restored once, after the last chunk.
+                target = self._target_bundle_id()
+
+                def focus_target():
+                    self.target_app.activateWithOptions_(NSApplicationActivateIgnoringOtherApps)
+                    self.paste_timing.wait_frontmost(target, self._frontmost_bundle_id)
+
+                stream = StreamingPaste(
+                    boundary=self.pipe_stream_mode,
+                    on_first_paste=focus_target,
+                    timing=self.paste_timing,
+                    target=target,
+                )
+                text = ""
+                try:
+                    text = await self._wait_and_copy_response(
+                        pipe_prompt, sent_in_page=fused_collect, on_text=stream.update, stopped_at=stopped_at
+                    )
+                finally:
+                    await asyncio.to_thread(stream.finish, text, paste_rest=bool(text))
+                if text:
+                    self._stop_trace.mark("pasted")
+                    self._stop_trace.finish()
+            else:
+                text = await self._wait_and_copy_response(
+                    pipe_prompt, sent_in_page=fused_collect, stopped_at=stopped_at
+                )
+                if text and self.target_app:
+                    await self._focus_target()
+                    # No clipboard restoration in AI mode
+                    pasted = await asyncio.to_thread(
+                        paste_text, text, restore=False, timing=self.paste_timing, target=self._target_bundle_id()
+                    )
+                    if not pasted:
+                        self._notify_paste_incomplete()
+                    self._stop_trace.mark("pasted")
+                    self._stop_trace.finish()
             
             self.current_state = "IDLE"
             self.status_item.title = "Status: Ready"
@@ -1366,194 +1798,231 @@ class MicPipeApp(rumps.App):
 
 
         # --- Standard Mode (Existing Flow) ---
-        # Take a clipboard snapshot while we wait for transcription
-        clipboard_snapshot = snapshot_clipboard()
-
-        # Poll for transcribed text (total ~8s)
         text = ""
-        force_activate = True
-        max_attempts = 14
-
-        for i in range(max_attempts):
-            # Progressive retry intervals
-            if i == 0:
-                time.sleep(0.5)  # First attempt
-            elif i == 1:
-                time.sleep(0.1)  # 2nd attempt
-            elif i == 2:
-                time.sleep(0.2)  # 3rd attempt
-            elif i == 3:
-                time.sleep(0.3)  # 4th attempt
-            elif i == 4:
-                time.sleep(0.4)  # 5th attempt
-            elif i >= 10:
-                time.sleep(1.0)  # 11th+ attempts
+        transcribe_key = f"{self.current_service}.transcribe"
+        if fused_collect:
+            polls = self.poll_scheduler.plan(
+                transcribe_key, STOP_COLLECT_TIMEOUT_SECONDS, COLLECT_LADDER, start=stopped_at
+            )
+            result = await self._await_collect_result(polls, STOP_COLLECT_TIMEOUT_SECONDS)
+            if result.status == "TEXT":
+                text = result.text
+            if text:
+                polls.hit()
+                logger.debug(f"Got text from page capture: {text[:50]}...")
             else:
-                time.sleep(0.5)  # 6th-10th attempts
-
-            res = self.chrome.get_text_and_clear(
-                activate_first=force_activate,
-                preferred_location=self.service_tab_location,
+                # Nothing within the page's deadline: the polls below are a fallback
+                # whose timing says nothing about normal transcription latency.
+                transcribe_key = None
+
+        # Poll for transcribed text (~8s) if the page did not deliver it
+        if not text:
+            text = await self._poll_composer_text(
+                self.poll_scheduler.plan(
+                    transcribe_key,
+                    TRANSCRIBE_DEADLINE_SECONDS,
+                    TRANSCRIBE_LADDER,
+                    start=None if fused_collect else stopped_at,
+                )
             )
-            logger.debug(f"Attempt {i+1}/{max_attempts}: {res}")
-            force_activate = False
-            if res.startswith("SUCCESS:"):
-                content = res.split("SUCCESS:", 1)[1]
-                # Debuggable empty states from the page:
-                # - "EMPTY"
-                # - "EMPTY|DBG=..."
-                # - "NOT_FOUND"
-                # - "NOT_FOUND|DBG=..."
-                if content.startswith("EMPTY|DBG=") or content.startswith("NOT_FOUND|DBG="):
-                    logger.debug(content)
-                    force_activate = True
-                    continue
-
-                if content and content not in ["EMPTY", "NOT_FOUND", "SUCCESS", "missing value"]:
-                    text = content
-                    logger.debug(f"Got text: {text[:50]}...")
-                    break
-                # If still empty, try re-activating on the next poll
-                force_activate = True
 
         # Paste result
         if text:
+            self._stop_trace.mark("text_received")
             if self.target_app:
-                self.target_app.activateWithOptions_(NSApplicationActivateIgnoringOtherApps)
-                time.sleep(0.2)
-            paste_text(text, snapshot=clipboard_snapshot)
+                await self._focus_target()
+            # paste_text snapshots the clipboard just before overwriting it and
+            # restores it once the target app has read the text.
+            pasted = await asyncio.to_thread(
+                paste_text, text, timing=self.paste_timing, target=self._target_bundle_id()
+            )
+            if not pasted:
+                self._notify_paste_incomplete()
+            self._stop_trace.mark("pasted")
+            self._stop_trace.finish()
 
         self.current_state = "IDLE"
         self.status_item.title = "Status: Ready"
 
-    def _wait_and_copy_response(self, timeout=30):
-        """Get transcription, combine with prompt, submit, and wait for AI response"""
+    def _target_bundle_id(self):
+        bundle_id = self.target_app.bundleIdentifier() if self.target_app is not None else None
+        return str(bundle_id) if bundle_id else None
+
+    def _frontmost_bundle_id(self):
+        app = NSWorkspace.sharedWorkspace().frontmostApplication()
+        bundle_id = app.bundleIdentifier() if app is not None else None
+        return str(bundle_id) if bundle_id else None
+
+    def _notify_paste_incomplete(self):
+        rumps.notification(
+            "MicPipe", "Paste Incomplete", "The target app stopped taking the text; the rest is on your clipboard."
+        )
+
+    async def _focus_target(self):
+        """Bring the target app back to the front and wait until it is there (learned per app)."""
+        self.target_app.activateWithOptions_(NSApplicationActivateIgnoringOtherApps)
+        await self.paste_timing.await_frontmost(self._target_bundle_id(), self._frontmost_bundle_id)
+
+    async def _await_collect_result(self, polls, timeout):
+        """Wait for the page's stop_and_collect job; returns its final PageResult (TIMEOUT if none)."""
+        if self.chrome.cdp is not None:
+            # Over CDP the page holds each call open until the job finishes.
+            deadline = self.clock() + timeout + 0.5
+            while True:
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    return PageResult("TIMEOUT")
+                result = await self.achrome.collect_result(
+                    preferred_location=self.service_tab_location, wait=min(remaining, 4.0)
+                )
+                if result.status != "PENDING":
+                    return result
+        async for _ in polls:
+            result = await self.achrome.collect_result(preferred_location=self.service_tab_location)
+            if result.status != "PENDING":
+                return result
+        return PageResult("TIMEOUT")
+
+    async def _wait_and_copy_response(self, pipe_prompt="", sent_in_page=False, timeout=30, on_text=None, stopped_at=None):
+        """Wait for the prompt + transcription to be sent, then for the AI response.
+
+        ``on_text`` is called (in a worker thread) with the response text received so far each time it grows.
+        ``stopped_at`` is the ``self.clock()`` time of the stop click, for latency learning.
+        """
         self.status_item.title = "Status: ⏳ Transcribing..."
-        # Step 1: Get the transcription text from input box
-        transcription = ""
-        force_activate = True
-        max_attempts = 14
-        
-        for i in range(max_attempts):
-            if i == 0:
-                time.sleep(0.5)
-            elif i == 1:
-                time.sleep(0.1)
-            elif i == 2:
-                time.sleep(0.2)
-            elif i >= 10:
-                time.sleep(1.0)
+        sent = False
+        if sent_in_page:
+            # Steps 1-4 run inside the page (see ChatGPTChrome stop_and_collect).
+            polls = self.poll_scheduler.plan(
+                f"{self.current_service}.pipe_send",
+                STOP_COLLECT_TIMEOUT_SECONDS + PIPE_SEND_TIMEOUT_SECONDS,
+                COLLECT_LADDER,
+                start=stopped_at,
+            )
+            result = await self._await_collect_result(
+                polls, STOP_COLLECT_TIMEOUT_SECONDS + PIPE_SEND_TIMEOUT_SECONDS
+            )
+            logger.debug(f"Pipe send status: {str(result)[:200]}")
+            if result.status == "SENT":
+                polls.hit()
+                sent = True
+            elif result.status in ("SEND_BTN_DISABLED", "SEND_BTN_NOT_FOUND", "ERROR"):
+                logger.error(f"Submit failed: {result}")
+                return ""
             else:
-                time.sleep(0.5)
-            
-            res = self.chrome.get_text_and_clear(
+                logger.debug(f"Page did not capture the transcription ({result}); polling the input box")
+
+        if not sent and not await self._submit_transcription_with_prompt(pipe_prompt, timeout):
+            return ""
+        self._stop_trace.mark("ai_submit")
+        self.status_item.title = "Status: 🤖 AI Processing..."
+
+        # Step 5: Follow the response as the page streams it; the page reports
+        # completion itself, so the text is ready the moment generation ends.
+        text = ""
+        offset = 0
+        deadline = self.clock() + timeout + 0.5
+        try:
+            while True:
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    status = "TIMEOUT"
+                    break
+                status, offset, reset, delta = await self.achrome.response_delta(
+                    offset, preferred_location=self.service_tab_location, wait=min(remaining, 4.0)
+                )
+                if delta or reset:
+                    text = delta if reset else text + delta
+                    if on_text is not None and status == "GENERATING":
+                        await asyncio.to_thread(on_text, text)
+                if status not in ("WAITING", "GENERATING"):
+                    break
+                if self.chrome.cdp is None:
+                    await asyncio.sleep(RESPONSE_POLL_SECONDS)
+        except Exception as e:
+            logger.error(f"Failed to read AI response: {e}")
+            return ""
+
+        if status == "TIMEOUT":
+            logger.error("Timeout waiting for AI response")
+            rumps.notification("MicPipe", "Timeout", "AI response took too long")
+            return ""
+        if status != "COMPLETE":
+            logger.error(f"Response error: {status}")
+            return ""
+        if not text:
+            logger.error("No AI response found")
+            return ""
+
+        self._stop_trace.mark("ai_complete")
+        # Step 6: Hand the response back for pasting
+        self.status_item.title = "Status: ✍️ Writing back..."
+        logger.debug(f"AI response: {text[:100]}...")
+        return text
+
+    async def _poll_composer_text(self, polls):
+        """Read and clear the transcribed text from the input box on the schedule of ``polls``"""
+        force_activate = True
+        # What the page saw is only worth collecting for the debug log of the last attempt.
+        debug = logger.isEnabledFor(logging.DEBUG)
+        async for i in polls:
+            res = await self.achrome.get_text_and_clear(
                 activate_first=force_activate,
                 preferred_location=self.service_tab_location,
+                diagnostics=debug and i == len(polls.times) - 1,
             )
-            logger.debug(f"Getting transcription attempt {i+1}/{max_attempts}: {res}")
+            logger.debug(f"Attempt {i+1}/{len(polls.times)}: {res}")
             force_activate = False
-            
-            if res.startswith("SUCCESS:"):
-                content = res.split("SUCCESS:", 1)[1]
-                if content.startswith("EMPTY|DBG=") or content.startswith("NOT_FOUND|DBG="):
-                    logger.debug(content)
-                    force_activate = True
-                    continue
-                
-                if content and content not in ["EMPTY", "NOT_FOUND", "SUCCESS", "missing value"]:
-                    transcription = content
-                    logger.debug(f"Got transcription: {transcription[:50]}...")
-                    break
+            if res.status == "TEXT" and res.text:
+                polls.hit()
+                logger.debug(f"Got text: {res.text[:50]}...")
+                return res.text
+            if res.delivered:
+                # Still empty (or no composer): try re-activating on the next poll
                 force_activate = True
-        
+        return ""
+
+    async def _submit_transcription_with_prompt(self, prompt, response_timeout=30):
+        """Fallback for the in-page send: read the transcription, prepend the prompt and submit"""
+        # Step 1: Get the transcription text from input box
+        transcription = await self._poll_composer_text(
+            self.poll_scheduler.plan(None, TRANSCRIBE_DEADLINE_SECONDS, TRANSCRIBE_LADDER)
+        )
+
         if not transcription:
             logger.error("Failed to get transcription")
-            return ""
+            return False
         
-        # Step 2: Combine prompt with transcription (or use transcription directly for Ask AI mode)
-        if self.current_pipe_slot == -2:
-            # Ask AI mode: no preset prompt, send transcription directly
-            combined_text = transcription
-        else:
-            slot = self.pipe_slots[self.current_pipe_slot]
-            prompt = slot.get("prompt", "") if isinstance(slot, dict) else slot
-            combined_text = prompt + "\n" + transcription if prompt else transcription
+        # Step 2: Combine prompt with transcription (Ask AI mode has no prompt)
+        combined_text = prompt + "\n" + transcription if prompt else transcription
         logger.debug(f"Combined text: {combined_text[:100]}...")
 
         
         # Step 3: Fill the combined text back into the input box
-        self.status_item.title = "Status: 🤖 AI Processing..."
         try:
-            fill_res = self.chrome.pre_fill_prompt(combined_text, preferred_location=self.service_tab_location)
+            fill_res = await self.achrome.pre_fill_prompt(combined_text, preferred_location=self.service_tab_location)
             logger.debug(f"Fill result: {fill_res}")
-            time.sleep(0.3)  # Wait for UI to update
+            await asyncio.sleep(0.3)  # Wait for UI to update
         except Exception as e:
             logger.error(f"Failed to fill combined text: {e}")
-            return ""
+            return False
         
         # Step 4: Submit the message
         try:
-            submit_res = self.chrome.submit_message(preferred_location=self.service_tab_location)
+            await self.achrome.watch_response(preferred_location=self.service_tab_location, timeout=response_timeout)
+            submit_res = await self.achrome.submit_message(preferred_location=self.service_tab_location)
             logger.debug(f"Submit result: {submit_res}")
-            if "NOT_FOUND" in submit_res or "DISABLED" in submit_res:
+            if submit_res.status != "SENT":
                 logger.error(f"Submit failed: {submit_res}")
-                return ""
+                return False
         except Exception as e:
             logger.error(f"Failed to submit message: {e}")
-            return ""
-
-        # Step 5: Poll for response completion
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            try:
-                status = self.chrome.is_response_complete(preferred_location=self.service_tab_location)
-                if "COMPLETE" in status:
-                    break
-                elif "ERROR" in status:
-                    logger.error(f"Response error: {status}")
-                    return ""
-            except Exception as e:
-                logger.debug(f"Error checking response status: {e}")
-            time.sleep(0.5)
-        else:
-            logger.error("Timeout waiting for AI response")
-            rumps.notification("MicPipe", "Timeout", "AI response took too long")
-            return ""
-
-        # Step 6: Extract AI response text directly from DOM
-        self.status_item.title = "Status: ✍️ Writing back..."
-        try:
-            # Short wait for UI to stabilize
-            time.sleep(1.0)
-            extract_res = self.chrome.click_copy_button(preferred_location=self.service_tab_location)
-            logger.debug(f"Text extraction result: {extract_res}")
-            
-            if extract_res.startswith("SUCCESS:"):
-                # Parse the inner result
-                inner = extract_res.split("SUCCESS:", 1)[1]
-                # Format: USED_WIN_ID=xxx,TAB=x:TEXT:actual text
-                # or just: TEXT:actual text
-                if ":TEXT:" in inner:
-                    text = inner.split(":TEXT:", 1)[1]
-                    return text
-                elif inner.startswith("TEXT:"):
-                    text = inner.split("TEXT:", 1)[1]
-                    return text
-                elif inner in ["NO_RESPONSE", "EMPTY_RESPONSE"]:
-                    logger.error(f"No AI response found: {inner}")
-                    return ""
-                else:
-                    # Unexpected format, log it
-                    logger.error(f"Unexpected extraction result format: {inner}")
-                    return ""
-            else:
-                logger.error(f"Extraction failed: {extract_res}")
-                return ""
-        except Exception as e:
-            logger.error(f"Failed to extract AI response: {e}")
-            return ""
+            return False
+        return True
 
     def run_app(self):
+        self._start_control_server()
+
         # Create Event Tap
         self.tap = Quartz.CGEventTapCreate(
             Quartz.kCGSessionEventTap,
@@ -1575,57 +2044,10 @@ class MicPipeApp(rumps.App):
         # Start rumps main loop
         self.run()
 
-def _send_cmd(cmd: str):
-    """Send a command to the running MicPipe instance via command file."""
-    cmd_dir = os.path.join(os.path.expanduser("~"), "Library", "Application Support", "MicPipe")
-    os.makedirs(cmd_dir, exist_ok=True)
-    cmd_path = os.path.join(cmd_dir, "cmd")
-    temp_path = f"{cmd_path}.{os.getpid()}.tmp"
-    with open(temp_path, "w") as f:
-        f.write(cmd)
-    os.replace(temp_path, cmd_path)
-
 def main():
-    parser = argparse.ArgumentParser(
-        prog="micpipe",
-        description="MicPipe menubar app and CLI control for voice conversation.",
-        epilog=(
-            "Examples:\n"
-            "  micpipe\n"
-            "  micpipe --debug\n"
-            "  micpipe voice start\n"
-            "  micpipe voice stop\n"
-            "  micpipe voice toggle"
-        ),
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-    )
-    parser.add_argument("--debug", action="store_true", help="Run the app with debug logging and a visible Chrome window")
-    subparsers = parser.add_subparsers(dest="command", metavar="command")
-
-    voice_parser = subparsers.add_parser(
-        "voice",
-        help="Control the running MicPipe voice conversation",
-        description="Send a voice conversation command to the running MicPipe app.",
-    )
-    voice_parser.add_argument(
-        "voice_action",
-        nargs="?",
-        default="toggle",
-        choices=["toggle", "start", "stop", "end"],
-        metavar="action",
-        help="Voice action: start/stop are idempotent, toggle flips the current state",
-    )
-    args = parser.parse_args()
-
-    if args.command == "voice":
-        action = "stop" if args.voice_action == "end" else args.voice_action
-        _send_cmd(f"voice-{action}")
-        print(f"Sent voice-{action} command to MicPipe.")
-        return
-
-    configure_logging(args.debug)
-    app = MicPipeApp(debug=args.debug)
-    app.run_app()
+    # The command line lives in cli.py; CLI-only commands never load this module.
+    from cli import main as cli_main
+    cli_main()
 
 if __name__ == "__main__":
     main()
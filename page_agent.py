@@ -0,0 +1,216 @@
+import hashlib
+import json
+
+# Bump when the agent runtime below changes shape; the probe bodies are
+# hashed into the version separately.
+AGENT_RUNTIME_VERSION = 3
+AGENT_MISSING = "__MICPIPE_AGENT_MISSING__"
+
+# Runtime installed as window.__micpipe. Probe bodies are spliced into `ops`
+# and can use `find(key, locate)` to reuse DOM lookups; the cache is dropped
+# whenever the page mutates, so a cached element is never stale. `state`
+# survives between calls for operations that span several of them, and the
+# service's helper functions are shared by all operations.
+#
+# A probe returns a status string, or `reply(status, payload, diag)` when it
+# has data to hand back; `diag` is a function that only runs when the caller
+# asked for diagnostics. Every call answers with one JSON envelope,
+# {"s": status, "p": payload, "d": diagnostics}, with empty fields left out.
+_AGENT_TEMPLATE = '''/* micpipe-agent %(version)s */
+(function() {
+    var cache = {};
+    var state = {};
+    var observer = null;
+    function find(key, locate) {
+        var hit = cache[key];
+        if (hit && (hit.el || hit).isConnected) return hit;
+        hit = locate() || null;
+        if (hit) cache[key] = hit; else delete cache[key];
+        return hit;
+    }
+    if (window.__micpipe && window.__micpipe.disconnect) {
+        try { window.__micpipe.disconnect(); } catch (e) {}
+    }
+    try {
+        observer = new MutationObserver(function() { cache = {}; });
+        observer.observe(document.documentElement, {
+            childList: true, subtree: true, attributes: true,
+            attributeFilter: ['aria-label', 'data-testid', 'disabled', 'contenteditable']
+        });
+    } catch (e) {}
+%(helpers)s
+    var wantDiag = false;
+    function reply(status, payload, diag) {
+        var r = { s: status };
+        if (payload !== undefined && payload !== null && payload !== "") r.p = payload;
+        if (diag && wantDiag) {
+            try { r.d = diag(); } catch (e) { r.d = String(e); }
+        }
+        return r;
+    }
+    function envelope(r) {
+        if (r && typeof r === "object" && typeof r.s === "string") return r;
+        return { s: (r === undefined || r === null) ? "NO_RESULT" : String(r) };
+    }
+    var ops = {
+%(ops)s
+    };
+    function run(name, args, diag) {
+        var fn = ops[name];
+        if (!fn) return { s: "UNKNOWN_OP", p: name };
+        wantDiag = !!diag;
+        try {
+            var r = fn(args || {});
+        } catch (e) {
+            return { s: "ERROR", p: e.message };
+        } finally {
+            wantDiag = false;
+        }
+        // Waiting probes (CDP only) resolve later; CDP awaits the promise.
+        if (r && typeof r.then === "function") return r.then(envelope);
+        return envelope(r);
+    }
+    window.__micpipe = {
+        v: %(version_json)s,
+        call: function(name, args, diag) {
+            var r = run(name, args, diag);
+            return (typeof r.then === "function") ? r.then(JSON.stringify) : JSON.stringify(r);
+        },
+        batch: function(plan) {
+            var out = [];
+            for (var i = 0; i < plan.ops.length; i++) {
+                var r = run(plan.ops[i], plan.args && plan.args[i], plan.diag);
+                out.push(r);
+                var expect = plan.expect[i];
+                if (expect && expect.indexOf(r.s) < 0) break;
+            }
+            return JSON.stringify({ s: "BATCH", p: out });
+        },
+        disconnect: function() { if (observer) observer.disconnect(); }
+    };
+    return true;
+})();
+'''
+
+
+class PageResult:
+    """The outcome of one page call.
+
+    ``status`` is the probe's status word (e.g. "READY") or, when the script
+    never reached the page, why not ("NOT_FOUND", "NO_WINDOW", "CDP_ERROR",
+    ...). ``location`` is the (window id, tab id) the script ran in, None when
+    it did not run. ``payload`` is the probe's data (text, a dict, ...) and
+    ``diagnostics`` is only filled when the call asked for them.
+    """
+
+    __slots__ = ("status", "location", "payload", "diagnostics")
+
+    def __init__(self, status, location=None, payload=None, diagnostics=None):
+        self.status = status
+        self.location = location
+        self.payload = payload
+        self.diagnostics = diagnostics
+
+    @classmethod
+    def from_envelope(cls, envelope, location=None):
+        if not isinstance(envelope, dict) or not isinstance(envelope.get("s"), str):
+            return cls("BAD_ENVELOPE", location, envelope)
+        return cls(envelope["s"], location, envelope.get("p"), envelope.get("d"))
+
+    @classmethod
+    def parse(cls, raw, location=None):
+        """Decode the text a page call returned; anything but an envelope is a delivery status."""
+        if isinstance(raw, dict):
+            return cls.from_envelope(raw, location)
+        raw = (raw or "").strip()
+        if not raw or raw == "missing value":
+            return cls("NO_RESULT")
+        if raw[0] != "{":
+            return cls(raw)
+        try:
+            return cls.from_envelope(json.loads(raw), location)
+        except ValueError:
+            return cls("BAD_ENVELOPE", location, raw[:200])
+
+    @property
+    def delivered(self):
+        """True when the script ran in the page (whatever the probe answered)."""
+        return self.location is not None
+
+    @property
+    def text(self):
+        """The payload as text ("" when there is none)."""
+        if self.payload is None:
+            return ""
+        return self.payload if isinstance(self.payload, str) else json.dumps(self.payload)
+
+    def __str__(self):
+        out = self.status if self.payload is None else f"{self.status}:{self.text}"
+        if self.diagnostics is not None:
+            out += f" DBG={json.dumps(self.diagnostics)}"
+        return out
+
+    def __repr__(self):
+        return f"PageResult({self.status!r}, location={self.location!r}, payload={self.payload!r})"
+
+
+class PageAgent:
+    """Builds the in-page ``window.__micpipe`` agent for one set of probes.
+
+    ``call_js``/``batch_js`` return short scripts that invoke an installed
+    agent and yield an ``AGENT_MISSING`` envelope when it is absent or from
+    another version (e.g. after a reload); pass ``install=True`` to prepend
+    the agent.
+    """
+
+    def __init__(self, probes, helpers=""):
+        self.probes = dict(probes)
+        digest = hashlib.sha1(
+            json.dumps([helpers, self.probes], sort_keys=True).encode("utf-8")
+        ).hexdigest()[:10]
+        self.version = f"{AGENT_RUNTIME_VERSION}-{digest}"
+        ops = ",\n".join(
+            f"        {json.dumps(name)}: function(args) {{ return {body.strip()}; }}"
+            for name, body in self.probes.items()
+        )
+        self.install_js = _AGENT_TEMPLATE % {
+            "version": self.version,
+            "version_json": json.dumps(self.version),
+            "helpers": helpers,
+            "ops": ops,
+        }
+
+    def _wrap(self, body, install):
+        stub = (
+            "(function() {\n"
+            f"    {body}\n"
+            "})()"
+        )
+        return self.install_js + stub if install else stub
+
+    def _require(self):
+        missing = json.dumps(json.dumps({"s": AGENT_MISSING}))
+        return (
+            "var agent = window.__micpipe;\n"
+            f"    if (!agent || agent.v !== {json.dumps(self.version)}) return {missing};\n"
+        )
+
+    def call_js(self, name, args=None, install=False, diagnostics=False):
+        return self._wrap(
+            self._require()
+            + f"    return agent.call({json.dumps(name)}, {json.dumps(args or {})}, {json.dumps(diagnostics)});",
+            install,
+        )
+
+    def batch_js(self, plan, install=False):
+        return self._wrap(
+            f"var plan = {json.dumps(plan)};\n"
+            + "    " + self._require()
+            + "    return agent.batch(plan);",
+            install,
+        )
+
+
+def is_agent_missing(result):
+    """True if a PageResult says the agent must be (re)installed."""
+    return result.status == AGENT_MISSING
@@ -0,0 +1,238 @@
+"""Per-app timing of the paste: how long a target app takes to come to the
+front after it is activated, and to read the clipboard after Cmd+V.
+
+Both are learned per bundle id (e.g. "com.microsoft.VSCode") and persisted,
+so each app gets the shortest wait that has been safe for it: a native app
+that reads the pasteboard within a few milliseconds gets its clipboard back
+after READ_BOUNDS[0], while an Electron app or a remote desktop gets longer.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+from poll_scheduler import LatencyHistogram
+from write_behind import STATS_WRITE_DELAY_SECONDS, WriteBehind
+
+logger = logging.getLogger(__name__)
+
+# Waits used until an app has MIN_SAMPLES observations.
+ACTIVATION_FALLBACK_SECONDS = 0.2
+READ_FALLBACK_SECONDS = 0.5
+# Learned waits are twice the app's 95th percentile, within these bounds.
+ACTIVATION_BOUNDS = (0.05, 1.0)
+READ_BOUNDS = (0.1, 2.0)
+# Pause after the app is frontmost, for its key window to take focus.
+ACTIVATION_SETTLE_SECONDS = 0.03
+POLL_SECONDS = 0.005
+
+
+class PasteWatch:
+    """One clipboard paste into ``bundle_id``: was the promised text read, and when?
+
+    Pass ``on_read`` to ``overwrite_clipboard_with_text`` and call ``written``
+    with its result, then ``posted`` right before Cmd+V is sent;
+    ``wait_consumed`` then waits for the read.
+
+    Only reads after ``posted`` count. Clipboard managers (Maccy, Raycast,
+    Alfred, ...) read every new item within milliseconds of the write, and
+    the pasteboard asks for promised data only once, so after such a read
+    the target's own read is never seen.
+    """
+
+    def __init__(self, timing, bundle_id):
+        self.timing = timing
+        self.bundle_id = bundle_id
+        self.promised = False
+        self.written_at = None
+        self.posted_at = None
+        self.read_at = None
+        self._read = threading.Event()
+
+    def on_read(self):
+        # Runs on the thread that serves the pasteboard (AppKit's main thread).
+        if self.posted_at is None:
+            logger.debug(f"[paste] {self.bundle_id}: clipboard read before Cmd+V; not the target's read")
+            return
+        self.read_at = self.timing.clock()
+        self._read.set()
+
+    def written(self, promised):
+        self.promised = bool(promised)
+        self.written_at = self.timing.clock()
+
+    def posted(self):
+        self.posted_at = self.timing.clock()
+
+    @property
+    def read_seconds(self):
+        """Seconds from Cmd+V to the target's read, or None if no read was seen."""
+        return self.read_at - self.posted_at if self._read.is_set() else None
+
+    def _start(self):
+        if self.posted_at is not None:
+            return self.posted_at
+        return self.written_at if self.written_at is not None else self.timing.clock()
+
+    def wait_consumed(self, fallback):
+        """Wait until the target app has read the clipboard; returns whether the read was seen.
+
+        The app's learned read time (or ``fallback`` seconds, or with a
+        promise READ_FALLBACK_SECONDS, until it is learned) is always waited
+        out, so a read by another process cannot restore the clipboard early.
+        Only reads that were seen are learned from.
+        """
+        timing = self.timing
+        if not self.promised:
+            learned = timing.read_delay(self.bundle_id, None)
+            timing.sleep(max(fallback, learned or 0.0))
+            return False
+        start = self._start()
+        wait = max(fallback, timing.read_delay(self.bundle_id, READ_FALLBACK_SECONDS))
+        self._wait_read(start + wait)
+        remaining = start + wait - timing.clock()
+        if remaining > 0:
+            timing.sleep(remaining)
+        if self._read.is_set():
+            timing.record(self.bundle_id, "read", self.read_seconds)
+            return True
+        logger.debug(f"[paste] {self.bundle_id}: clipboard read not seen within {wait:.2f}s")
+        return False
+
+    def wait_longer(self, seconds=READ_BOUNDS[1]):
+        """After a missed ``wait_consumed``, keep waiting until ``seconds`` after Cmd+V.
+
+        A stalled target may still handle its Cmd+V late, so the paste is in
+        flight until then. A late read is learned from as well.
+        """
+        if not self.promised:
+            return False
+        if self._wait_read(self._start() + seconds):
+            self.timing.record(self.bundle_id, "read", self.read_seconds)
+            return True
+        return False
+
+    def _wait_read(self, deadline):
+        timing = self.timing
+        while not self._read.is_set():
+            remaining = deadline - timing.clock()
+            if remaining <= 0:
+                break
+            timing.sleep(min(POLL_SECONDS, remaining))
+        return self._read.is_set()
+
+
+class PasteTiming:
+    """Learned activation and clipboard-read latencies per bundle id, persisted at ``path`` (written behind)."""
+
+    MIN_SAMPLES = 3
+    QUANTILE = 0.95
+
+    def __init__(self, path=None, clock=time.monotonic, sleep=time.sleep):
+        self.path = path
+        self.clock = clock
+        self.sleep = sleep
+        self.apps = {}  # bundle id -> {"activation": LatencyHistogram, "read": LatencyHistogram}
+        self._lock = threading.Lock()
+        self._writer = WriteBehind(path, self._serialize, STATS_WRITE_DELAY_SECONDS, what="paste timing")
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for bundle_id, kinds in (data.get("apps") or {}).items():
+                if isinstance(kinds, dict):
+                    self.apps[bundle_id] = {
+                        kind: LatencyHistogram(counts) for kind, counts in kinds.items() if isinstance(counts, list)
+                    }
+        except Exception as e:
+            logger.debug(f"Failed to load paste timing: {e}")
+
+    def _serialize(self):
+        with self._lock:
+            payload = {
+                "apps": {
+                    bundle_id: {kind: h.to_list() for kind, h in kinds.items()}
+                    for bundle_id, kinds in self.apps.items()
+                }
+            }
+        return json.dumps(payload, separators=(",", ":"))
+
+    def save(self):
+        """Schedule a write of the learned timings."""
+        self._writer.mark_dirty()
+
+    def flush(self):
+        """Write pending timings now."""
+        self._writer.flush()
+
+    def record(self, bundle_id, kind, seconds):
+        if not bundle_id:
+            return
+        with self._lock:
+            self.apps.setdefault(bundle_id, {}).setdefault(kind, LatencyHistogram()).add(seconds)
+        self.save()
+
+    def _learned(self, bundle_id, kind, bounds, fallback):
+        with self._lock:
+            hist = self.apps.get(bundle_id, {}).get(kind)
+            if hist is None or hist.total < self.MIN_SAMPLES:
+                return fallback
+            seconds = 2 * hist.quantile(self.QUANTILE)
+        return min(bounds[1], max(bounds[0], seconds))
+
+    def activation_delay(self, bundle_id, fallback=ACTIVATION_FALLBACK_SECONDS):
+        """Longest wait for ``bundle_id`` to come to the front after activation."""
+        return self._learned(bundle_id, "activation", ACTIVATION_BOUNDS, fallback)
+
+    def read_delay(self, bundle_id, fallback=READ_FALLBACK_SECONDS):
+        """Longest wait for ``bundle_id`` to read the clipboard after Cmd+V."""
+        return self._learned(bundle_id, "read", READ_BOUNDS, fallback)
+
+    def watch(self, bundle_id):
+        return PasteWatch(self, bundle_id)
+
+    def _activated(self, bundle_id, start, frontmost):
+        elapsed = self.clock() - start
+        if not frontmost:
+            # Recorded too, so an app that is slow to come forward gets longer next time.
+            logger.debug(f"[paste] {bundle_id} not frontmost after {elapsed:.2f}s")
+        self.record(bundle_id, "activation", elapsed)
+        return frontmost
+
+    def wait_frontmost(self, bundle_id, frontmost_bundle_id):
+        """Wait (blocking) until ``frontmost_bundle_id()`` is ``bundle_id``; returns whether it got there."""
+        if not bundle_id:
+            self.sleep(ACTIVATION_FALLBACK_SECONDS)
+            return False
+        start = self.clock()
+        deadline = start + self.activation_delay(bundle_id)
+        while frontmost_bundle_id() != bundle_id:
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                return self._activated(bundle_id, start, False)
+            self.sleep(min(POLL_SECONDS, remaining))
+        self._activated(bundle_id, start, True)
+        self.sleep(ACTIVATION_SETTLE_SECONDS)
+        return True
+
+    async def await_frontmost(self, bundle_id, frontmost_bundle_id):
+        """``wait_frontmost`` for the event loop."""
+        if not bundle_id:
+            await asyncio.sleep(ACTIVATION_FALLBACK_SECONDS)
+            return False
+        start = self.clock()
+        deadline = start + self.activation_delay(bundle_id)
+        while frontmost_bundle_id() != bundle_id:
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                return self._activated(bundle_id, start, False)
+            await asyncio.sleep(min(POLL_SECONDS, remaining))
+        self._activated(bundle_id, start, True)
+        await asyncio.sleep(ACTIVATION_SETTLE_SECONDS)
+        return True
@@ -1,27 +1,486 @@
+import logging
+import os
+import re
 import subprocess
+import threading
 import time
+import unicodedata
 
-from clipboard_guard import overwrite_clipboard_with_text, restore_clipboard
+from clipboard_guard import clipboard_change_count, overwrite_clipboard_with_text, restore_clipboard, snapshot_clipboard
 
-def paste_text(text, snapshot=None):
-    """Put text into clipboard, simulate Cmd+V, then restore clipboard."""
-    if not text or text == "SUCCESS" or text == "CHATGPT_NOT_FOUND":
-        return
+logger = logging.getLogger(__name__)
+
+# Chunk boundaries for StreamingPaste. A chunk ends right after the last match.
+STREAM_BOUNDARIES = {
+    # Sentence-ending punctuation followed by whitespace (so "3.14" or "e.g."
+    # mid-word doesn't split), CJK full stops, or a line break.
+    "sentence": re.compile(r"[.!?…]+[\"'”’)\]]*\s+|[。！？]+|\n+"),
+    "line": re.compile(r"\n+"),
+    "paragraph": re.compile(r"\n[ \t]*\n+"),
+}
+
+# Texts longer than this are pasted in chunks (see ChunkedPaste).
+CHUNKED_PASTE_MIN_CHARS = 4000
+# Chunk size in characters: first chunk, and the bounds it adapts within.
+CHUNK_CHARS = 2000
+CHUNK_CHARS_BOUNDS = (500, 16000)
+# A chunk read faster than this grows the next one; slower shrinks it.
+FAST_READ_SECONDS = 0.05
+SLOW_READ_SECONDS = 0.25
+# Chunk breaks are searched in this order; whitespace is the last resort.
+CHUNK_BOUNDARIES = (
+    STREAM_BOUNDARIES["paragraph"],
+    STREAM_BOUNDARIES["line"],
+    STREAM_BOUNDARIES["sentence"],
+    re.compile(r"\s+"),
+)
+
+# Backends tried in order when MICPIPE_PASTE_BACKEND is not set.
+DEFAULT_PASTE_BACKENDS = "ax,keys,applescript"
+# Virtual keycode of V on the ANSI layout.
+KEYCODE_V = 9
+
+
+class PasteUnavailable(Exception):
+    """A paste backend cannot paste into the focused app; the next one is tried."""
+
+
+class PasteBackend:
+    """One way of getting text into the focused app.
+
+    ``uses_clipboard`` backends overwrite the clipboard, so the caller takes a
+    snapshot first and restores it once the target app has read it: after the
+    app's learned read time (see PasteWatch), or else ``restore_delay``
+    seconds after the paste.
+    """
+
+    name = ""
+    uses_clipboard = True
+    restore_delay = 0.05
+
+    def paste(self, text, watch=None):
+        """Insert ``text``; raise PasteUnavailable if nothing was inserted.
+
+        Clipboard backends write the text through ``_write_clipboard(text, watch)``.
+        """
+        raise NotImplementedError
+
+
+class AXInsertPaste(PasteBackend):
+    """Replace the focused element's selection through the Accessibility API.
+
+    Bypasses the clipboard entirely. Only used when the element reports a
+    settable selection and a character count, so the insertion can be checked;
+    anything else (terminals, many web views) falls through to a key paste.
+    """
+
+    name = "ax"
+    uses_clipboard = False
+    restore_delay = 0.0
+
+    def __init__(self):
+        import ApplicationServices
+
+        self._ax = ApplicationServices
+        self._system = ApplicationServices.AXUIElementCreateSystemWide()
+
+    def _attribute(self, element, attribute):
+        err, value = self._ax.AXUIElementCopyAttributeValue(element, attribute, None)
+        return None if err != self._ax.kAXErrorSuccess else value
+
+    def paste(self, text, watch=None):
+        ax = self._ax
+        focused = self._attribute(self._system, ax.kAXFocusedUIElementAttribute)
+        if focused is None:
+            raise PasteUnavailable("no focused element")
+        err, settable = ax.AXUIElementIsAttributeSettable(focused, ax.kAXSelectedTextAttribute, None)
+        if err != ax.kAXErrorSuccess or not settable:
+            raise PasteUnavailable("selection is not settable")
+        before = self._attribute(focused, ax.kAXNumberOfCharactersAttribute)
+        if before is None:
+            raise PasteUnavailable("character count is not readable")
+        selected = self._attribute(focused, ax.kAXSelectedTextAttribute) or ""
+        err = ax.AXUIElementSetAttributeValue(focused, ax.kAXSelectedTextAttribute, text)
+        if err != ax.kAXErrorSuccess:
+            raise PasteUnavailable(f"setting the selection failed ({err})")
+        after = self._attribute(focused, ax.kAXNumberOfCharactersAttribute)
+        # AX counts UTF-16 code units.
+        expected = int(before) - _utf16_len(str(selected)) + _utf16_len(text)
+        if after is None:
+            return
+        if int(after) == int(before) != expected:
+            raise PasteUnavailable("the element ignored the insertion")
+        if int(after) != expected:
+            # Something was inserted; pasting again could duplicate it.
+            logger.debug(f"AX insert changed the length by {int(after) - int(before)}, expected {expected - int(before)}")
 
-    try:
-        # 1. Put into clipboard
-        overwrite_clipboard_with_text(text)
-        time.sleep(0.03)  # Give the system a bit of response time
 
-        # 2. Simulate Command + V via AppleScript
+class KeyEventPaste(PasteBackend):
+    """Put the text on the clipboard and post Cmd+V from this process with Quartz.
+
+    The V keycode is the ANSI one; layouts that move V should use the
+    AppleScript backend (MICPIPE_PASTE_BACKEND=applescript).
+    """
+
+    name = "keys"
+    # The posted events are delivered asynchronously, unlike osascript's.
+    restore_delay = 0.1
+
+    def __init__(self):
+        import Quartz
+
+        self._quartz = Quartz
+        # A private source, so modifiers the user still holds don't leak in.
+        self._source = Quartz.CGEventSourceCreate(Quartz.kCGEventSourceStatePrivate)
+
+    def paste(self, text, watch=None):
+        quartz = self._quartz
+        _write_clipboard(text, watch)
+        _posting(watch)
+        for down in (True, False):
+            event = quartz.CGEventCreateKeyboardEvent(self._source, KEYCODE_V, down)
+            quartz.CGEventSetFlags(event, quartz.kCGEventFlagMaskCommand)
+            quartz.CGEventPost(quartz.kCGHIDEventTap, event)
+
+
+class AppleScriptPaste(PasteBackend):
+    """Put the text on the clipboard and send Cmd+V through System Events with osascript."""
+
+    name = "applescript"
+
+    def paste(self, text, watch=None):
+        _write_clipboard(text, watch)
+        time.sleep(0.03)  # Give the system a bit of response time
+        _posting(watch)
         script = r'''
         tell application "System Events"
           keystroke "v" using {command down}
         end tell
         '''
         subprocess.run(["osascript", "-e", script], check=True)
+
+
+class RecordingPaste(PasteBackend):
+    """Fake backend for tests: records ``(time, text)`` instead of pasting.
+
+    With ``uses_clipboard`` it still writes the clipboard, like a key paste.
+    """
+
+    name = "recording"
+    restore_delay = 0.0
+
+    def __init__(self, clock=time.monotonic, uses_clipboard=True):
+        self.clock = clock
+        self.uses_clipboard = uses_clipboard
+        self.pastes = []
+
+    def paste(self, text, watch=None):
+        if self.uses_clipboard:
+            _write_clipboard(text, watch)
+            _posting(watch)
+        self.pastes.append((self.clock(), text))
+
+
+PASTE_BACKENDS = {cls.name: cls for cls in (AXInsertPaste, KeyEventPaste, AppleScriptPaste)}
+
+_backends = None
+_backends_lock = threading.Lock()
+
+
+def _utf16_len(text):
+    return len(text.encode("utf-16-le")) // 2
+
+
+def create_paste_backends(kinds=None):
+    """Backends from ``kinds`` or ``MICPIPE_PASTE_BACKEND`` (comma-separated, e.g. "keys,applescript")."""
+    kinds = kinds or os.environ.get("MICPIPE_PASTE_BACKEND") or DEFAULT_PASTE_BACKENDS
+    backends = []
+    for kind in kinds.lower().split(","):
+        kind = kind.strip()
+        cls = PASTE_BACKENDS.get(kind)
+        if cls is None:
+            logger.warning(f"Unknown paste backend '{kind}'")
+            continue
+        try:
+            backends.append(cls())
+        except Exception as e:
+            logger.debug(f"Paste backend '{kind}' unavailable: {e}")
+    if not any(isinstance(b, AppleScriptPaste) for b in backends):
+        backends.append(AppleScriptPaste())
+    return backends
+
+
+def get_backends():
+    """Return the paste backends in fallback order, creating the default ones on first use."""
+    global _backends
+    with _backends_lock:
+        if _backends is None:
+            _backends = create_paste_backends()
+        return _backends
+
+
+def set_backends(backends):
+    """Install paste backends (e.g. ``[RecordingPaste()]``) and return the previous ones.
+
+    ``None`` goes back to the default backends on the next paste.
+    """
+    global _backends
+    with _backends_lock:
+        previous = _backends
+        _backends = None if backends is None else list(backends)
+        return previous
+
+
+def _write_clipboard(text, watch=None):
+    """Put ``text`` on the clipboard, promised to ``watch`` (a paste_timing.PasteWatch) if given."""
+    if watch is None:
+        overwrite_clipboard_with_text(text)
+    else:
+        watch.written(overwrite_clipboard_with_text(text, on_read=watch.on_read))
+
+
+def _posting(watch):
+    """Mark the moment Cmd+V is sent; only reads after it are the target's (see PasteWatch)."""
+    if watch is not None:
+        watch.posted()
+
+
+def _wait_consumed(backend, watch):
+    """Wait until the target app has read what ``backend`` put on the clipboard."""
+    if watch is not None:
+        watch.wait_consumed(backend.restore_delay)
+    else:
+        time.sleep(backend.restore_delay)
+
+
+def _send_paste(text, before_clipboard=None, watch=None):
+    """Paste with the first backend that can and return it.
+
+    ``before_clipboard`` runs once before a backend overwrites the clipboard.
+    """
+    for backend in get_backends():
+        if backend.uses_clipboard and before_clipboard is not None:
+            before_clipboard()
+            before_clipboard = None
+        try:
+            backend.paste(text, watch)
+            return backend
+        except PasteUnavailable as e:
+            logger.debug(f"Paste backend '{backend.name}' skipped: {e}")
+    raise PasteUnavailable("no paste backend could paste")
+
+
+def paste_text(text, restore=True, timing=None, target=None):
+    """Paste text into the focused app, then restore what the clipboard held (unless ``restore`` is False).
+
+    With ``timing`` (a paste_timing.PasteTiming) the clipboard is restored as
+    soon as ``target`` (the app's bundle id) has read it. Without ``restore``
+    the text is left on the clipboard, whichever backend pasted it. Texts
+    over CHUNKED_PASTE_MIN_CHARS go through ChunkedPaste. Returns False if
+    the text could not be pasted completely.
+    """
+    if not text or text == "SUCCESS" or text == "CHATGPT_NOT_FOUND":
+        return True
+    if len(text) > CHUNKED_PASTE_MIN_CHARS:
+        return ChunkedPaste(restore=restore, timing=timing, target=target).paste(text)
+
+    snapshot = None
+    written = None
+
+    def take_snapshot():
+        # Snapshot only now, right before the clipboard is overwritten.
+        nonlocal snapshot
+        snapshot = snapshot_clipboard()
+
+    watch = timing.watch(target) if restore and timing is not None else None
+    try:
+        backend = _send_paste(text, take_snapshot if restore else None, watch)
+        if snapshot is not None:
+            written = clipboard_change_count()
+            _wait_consumed(backend, watch)
     finally:
-        # 3. Restore clipboard (best-effort)
-        time.sleep(0.05)
+        # Restore clipboard (best-effort)
         if snapshot is not None:
-            restore_clipboard(snapshot)
+            restore_clipboard(snapshot, written)
+    if not restore and not backend.uses_clipboard:
+        overwrite_clipboard_with_text(text)
+    return True
+
+
+def _break_ok(text, i):
+    """Whether a chunk may end before ``text[i]`` without splitting a character sequence."""
+    ch = text[i]
+    return not (
+        unicodedata.combining(ch)
+        or ch == "\u200d"
+        or text[i - 1] == "\u200d"
+        or "\ufe00" <= ch <= "\ufe0f"
+        or text[i - 1:i + 1] == "\r\n"
+    )
+
+
+def chunk_end(text, start, size):
+    """End of the chunk of at most ``size`` characters that starts at ``start``.
+
+    Prefers a paragraph break, then a line, sentence or word break in the
+    second half of the chunk; cuts mid-word only when there is none.
+    """
+    limit = start + size
+    if limit >= len(text):
+        return len(text)
+    window = text[start:limit]
+    for pattern in CHUNK_BOUNDARIES:
+        last = None
+        for last in pattern.finditer(window, size // 2):
+            pass
+        if last is not None:
+            return start + last.end()
+    end = limit
+    while end > start + 1 and not _break_ok(text, end):
+        end -= 1
+    return end
+
+
+class ChunkedPaste:
+    """Paste a long text as a series of chunks the target app can keep up with.
+
+    Each clipboard chunk is promised (see PasteWatch) and the next one is only
+    sent after the target has read it; the read time sizes the next chunk and
+    the pause before it. A chunk is never sent twice: the target may only be
+    stalled and handle its Cmd+V late, so an unread chunk is waited on up to
+    the longest read wait (PasteWatch.wait_longer). If it is still not read,
+    pasting stops and the rest of the text, that chunk included, is left on
+    the clipboard for the user (or the late Cmd+V) to paste. AX insertions
+    verify themselves.
+    Without ``timing`` chunks are paced by the backend's ``restore_delay``.
+    """
+
+    def __init__(self, restore=True, timing=None, target=None):
+        self.restore = restore
+        self.timing = timing
+        self.target = target
+        self.size = CHUNK_CHARS
+        self.chunks = 0
+        self.snapshot = None
+        self.written = None
+
+    def _take_snapshot(self):
+        if self.restore and self.snapshot is None:
+            self.snapshot = snapshot_clipboard()
+
+    def _adapt(self, read_seconds):
+        low, high = CHUNK_CHARS_BOUNDS
+        if read_seconds < FAST_READ_SECONDS:
+            self.size = min(high, self.size * 2)
+        elif read_seconds > SLOW_READ_SECONDS:
+            self.size = max(low, self.size // 2)
+
+    def _paste_chunk(self, chunk):
+        """Paste one chunk; returns whether the target is known to have taken it."""
+        watch = self.timing.watch(self.target) if self.timing is not None else None
+        backend = _send_paste(chunk, self._take_snapshot, watch)
+        if not backend.uses_clipboard:
+            return True
+        self.written = clipboard_change_count()
+        if watch is None or not watch.promised:
+            _wait_consumed(backend, watch)
+            return True
+        if not watch.wait_consumed(backend.restore_delay) and not watch.wait_longer():
+            return False
+        read_seconds = watch.read_seconds
+        self._adapt(read_seconds)
+        # A target that was slow to read is still busy with the chunk.
+        self.timing.sleep(min(read_seconds, SLOW_READ_SECONDS))
+        return True
+
+    def paste(self, text):
+        """Paste ``text``; returns False if it stopped early (the rest is then on the clipboard)."""
+        pos = 0
+        stopped = False
+        try:
+            while pos < len(text):
+                end = chunk_end(text, pos, self.size)
+                chunk = text[pos:end]
+                if not self._paste_chunk(chunk):
+                    logger.warning(
+                        f"Paste stopped after {pos} of {len(text)} characters; the rest is on the clipboard"
+                    )
+                    overwrite_clipboard_with_text(text[pos:])
+                    stopped = True
+                    return False
+                pos = end
+                self.chunks += 1
+            logger.debug(f"Pasted {len(text)} characters in {self.chunks} chunks")
+        finally:
+            if not stopped and self.snapshot is not None:
+                restore_clipboard(self.snapshot, self.written)
+        if not self.restore:
+            # Like a single paste, leave the whole text on the clipboard.
+            overwrite_clipboard_with_text(text)
+        return True
+
+
+class StreamingPaste:
+    """Paste a growing text in completed chunks as it arrives.
+
+    Feed the full text received so far to ``update``; every chunk that ends at
+    a ``boundary`` (a key of STREAM_BOUNDARIES) is pasted once, in order.
+    With ``restore`` the clipboard is snapshotted before the first chunk and
+    ``finish`` pastes the rest and restores it a single time.
+    ``on_first_paste`` runs before the first chunk (e.g. to focus the target app).
+    Each chunk waits until ``target`` has read it before the next one
+    overwrites the clipboard: with ``timing`` as in paste_text, otherwise
+    for the backend's ``restore_delay``.
+    """
+
+    def __init__(self, boundary="sentence", restore=True, on_first_paste=None, timing=None, target=None):
+        self.pattern = STREAM_BOUNDARIES[boundary]
+        self.restore = restore
+        self.timing = timing
+        self.target = target
+        self.snapshot = None
+        self._written = None
+        self.on_first_paste = on_first_paste
+        self.pasted = ""
+        self.text = ""
+        self.chunks = 0
+
+    def update(self, text):
+        if not text.startswith(self.pasted):
+            # Pasted text can't be taken back; keep appending after it.
+            logger.debug("Streamed text changed before the pasted position; continuing after it")
+        self.text = text
+        rest = text[len(self.pasted):]
+        end = 0
+        for m in self.pattern.finditer(rest):
+            end = m.end()
+        if end:
+            self._paste(rest[:end])
+
+    def finish(self, text=None, paste_rest=True):
+        try:
+            if text is not None:
+                self.text = text
+            rest = self.text[len(self.pasted):]
+            if paste_rest and rest:
+                self._paste(rest)
+        finally:
+            if self.snapshot is not None:
+                restore_clipboard(self.snapshot, self._written)
+                self.snapshot = None
+
+    def _paste(self, chunk):
+        if not self.chunks and self.on_first_paste is not None:
+            self.on_first_paste()
+        watch = self.timing.watch(self.target) if self.restore and self.timing is not None else None
+        backend = _send_paste(chunk, self._take_snapshot if self.restore else None, watch)
+        if backend.uses_clipboard:
+            self._written = clipboard_change_count()
+            _wait_consumed(backend, watch)
+        self.pasted += chunk
+        self.chunks += 1
+        logger.debug(f"Streamed chunk {self.chunks} ({len(chunk)} chars)")
+
+    def _take_snapshot(self):
+        if self.snapshot is None:
+            self.snapshot = snapshot_clipboard()
@@ -0,0 +1,210 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+from write_behind import STATS_WRITE_DELAY_SECONDS, WriteBehind
+
+logger = logging.getLogger(__name__)
+
+# Sleep ladders used until enough latencies have been learned: the composer
+# polls after a stop click (~8s), the in-page capture result polls, and the
+# page readiness checks (15s).
+TRANSCRIBE_LADDER = [0.5, 0.1, 0.2, 0.3, 0.4, 0.5, 0.5, 0.5, 0.5, 0.5, 1.0, 1.0, 1.0, 1.0]
+COLLECT_LADDER = [0.05]
+PAGE_READY_LADDER = [0.5] * 30
+
+
+class LatencyHistogram:
+    """Compact histogram of latencies in geometric buckets, each 25% wider than the last.
+
+    Bucket ``i`` holds samples up to ``edge(i)`` seconds. Counts are halved once
+    they pass ``MAX_TOTAL`` so that the histogram follows recent behaviour.
+    """
+
+    FIRST_EDGE = 0.05
+    RATIO = 1.25
+    BUCKETS = 30  # Up to ~32s.
+    MAX_TOTAL = 200
+
+    def __init__(self, counts=None):
+        self.counts = [0] * self.BUCKETS
+        for i, c in enumerate((counts or [])[:self.BUCKETS]):
+            if isinstance(c, int) and c > 0:
+                self.counts[i] = c
+
+    @classmethod
+    def edge(cls, i):
+        return cls.FIRST_EDGE * cls.RATIO ** i
+
+    @property
+    def total(self):
+        return sum(self.counts)
+
+    def add(self, seconds):
+        if seconds <= self.FIRST_EDGE:
+            i = 0
+        else:
+            i = min(self.BUCKETS - 1, math.ceil(math.log(seconds / self.FIRST_EDGE, self.RATIO)))
+        self.counts[i] += 1
+        if self.total > self.MAX_TOTAL:
+            self.counts = [c // 2 for c in self.counts]
+
+    def quantile(self, q):
+        """Upper edge of the bucket holding the ``q`` quantile (None when empty)."""
+        total = self.total
+        if not total:
+            return None
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= q * total:
+                return self.edge(i)
+        return self.edge(self.BUCKETS - 1)
+
+    def to_list(self):
+        counts = list(self.counts)
+        while counts and not counts[-1]:
+            counts.pop()
+        return counts
+
+
+class PollPlan:
+    """Iterate over the poll attempts of one wait; call ``hit()`` on success.
+
+    Each iteration sleeps until the next planned poll time and yields the
+    attempt number (``async for`` awaits ``asyncio.sleep`` instead). ``hit()``
+    records the latency as the midpoint between the previous (missed) poll
+    and now, which keeps the learned times from drifting up to wherever we
+    happened to poll.
+    """
+
+    def __init__(self, scheduler, key, times, start):
+        self.scheduler = scheduler
+        self.key = key
+        self.times = times
+        self.start = start
+        self.attempts = 0
+        self._polled_at = None
+        self._last_miss = None
+
+    def elapsed(self):
+        return self.scheduler.clock() - self.start
+
+    def _mark(self, i):
+        if i:
+            self._last_miss = self._polled_at
+        self._polled_at = self.elapsed()
+        self.attempts = i + 1
+
+    def __iter__(self):
+        for i, t in enumerate(self.times):
+            delay = t - self.elapsed()
+            if delay > 0:
+                self.scheduler.sleep(delay)
+            self._mark(i)
+            yield i
+
+    async def __aiter__(self):
+        for i, t in enumerate(self.times):
+            delay = t - self.elapsed()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._mark(i)
+            yield i
+
+    def hit(self):
+        if self.key is None:
+            return
+        now = self.elapsed()
+        lower = self._last_miss if self._last_miss is not None else now
+        self.scheduler.record(self.key, (lower + now) / 2)
+        logger.debug(f"[poll] {self.key}: hit at {now:.2f}s after {self.attempts} poll(s)")
+
+
+class PollScheduler:
+    """Plan polls at learned latency quantiles, persisted per key (e.g. "ChatGPT.transcribe").
+
+    With fewer than ``MIN_SAMPLES`` observations a plan follows the given
+    fallback ladder. Afterwards polls are placed at ``QUANTILES`` of the
+    observed latency and then every ``TAIL_INTERVAL`` until the deadline.
+    Learned latencies are written behind (see write_behind).
+    """
+
+    MIN_SAMPLES = 5
+    QUANTILES = (0.1, 0.3, 0.5, 0.7, 0.85, 0.95)
+    TAIL_INTERVAL = 0.5
+    MIN_GAP = 0.05
+
+    def __init__(self, path=None, clock=time.monotonic, sleep=time.sleep):
+        self.path = path
+        self.clock = clock
+        self.sleep = sleep
+        self.histograms = {}
+        self._lock = threading.Lock()
+        self._writer = WriteBehind(path, self._serialize, STATS_WRITE_DELAY_SECONDS, what="poll latencies")
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for key, counts in (data.get("latency") or {}).items():
+                if isinstance(counts, list):
+                    self.histograms[key] = LatencyHistogram(counts)
+        except Exception as e:
+            logger.debug(f"Failed to load poll latencies: {e}")
+
+    def _serialize(self):
+        with self._lock:
+            payload = {"latency": {key: h.to_list() for key, h in self.histograms.items()}}
+        return json.dumps(payload, separators=(",", ":"))
+
+    def save(self):
+        """Schedule a write of the learned latencies."""
+        self._writer.mark_dirty()
+
+    def flush(self):
+        """Write pending latencies now."""
+        self._writer.flush()
+
+    def record(self, key, seconds):
+        with self._lock:
+            self.histograms.setdefault(key, LatencyHistogram()).add(seconds)
+        self.save()
+
+    def poll_times(self, key, deadline, fallback):
+        """Poll offsets in seconds from the start of the wait, none past ``deadline``."""
+        hist = self.histograms.get(key) if key is not None else None
+        if hist is not None and hist.total >= self.MIN_SAMPLES:
+            times = [hist.quantile(q) for q in self.QUANTILES]
+            step = self.TAIL_INTERVAL
+        else:
+            times = []
+            t = 0.0
+            for delay in fallback:
+                t += delay
+                times.append(t)
+            step = fallback[-1] if fallback else self.TAIL_INTERVAL
+        while times and times[-1] + step <= deadline:
+            times.append(times[-1] + step)
+        planned = []
+        for t in times:
+            if t > deadline:
+                break
+            if not planned or t - planned[-1] >= self.MIN_GAP:
+                planned.append(t)
+        return planned
+
+    def plan(self, key, deadline, fallback, start=None):
+        """Return a PollPlan for a wait that began at ``start`` (default: now).
+
+        With ``key=None`` the plan follows ``fallback`` and records nothing.
+        """
+        start = self.clock() if start is None else start
+        return PollPlan(self, key, self.poll_times(key, deadline, fallback), start)
@@ -0,0 +1,113 @@
+"""Import-time benchmark of the command line entry points.
+
+Scripts and hotkey launchers run `micpipe voice ...` over and over, so the
+CLI must start without loading the menu bar app. Each entry point is started
+in a fresh interpreter; the time spent importing it is measured there and
+the modules it loaded are checked against APP_MODULES. ``micpipe bench
+--startup`` prints the report and exits non-zero when an entry point is over
+IMPORT_BUDGET_MS or loads an app module.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Most milliseconds an entry point may spend importing, median over the runs.
+IMPORT_BUDGET_MS = 30
+# The app, its macOS frameworks and its heavy dependencies: none of these may
+# be loaded just to send a command.
+APP_MODULES = (
+    "micpipe", "rumps", "AppKit", "Quartz", "Foundation", "ApplicationServices", "asyncio",
+    "chrome_script", "clipboard_guard", "paste_tool", "flow_runner", "state_manager",
+)
+# Entry point -> statement run in the fresh interpreter.
+ENTRY_POINTS = {
+    # What `micpipe voice|status|events` imports before it connects to the app.
+    "cli": "import cli, control_socket",
+    # `python main.py voice start`, as in the Shortcuts setup (here with --help).
+    "main.py": (
+        "sys.argv = ['main.py', '--help']\n"
+        "try:\n"
+        "    runpy.run_path('main.py', run_name='__main__')\n"
+        "except SystemExit:\n"
+        "    pass"
+    ),
+}
+_MARKER = "__micpipe_startup__"
+_PROBE = """import contextlib, io, json, runpy, sys, time
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+{body}
+elapsed = (time.perf_counter() - start) * 1000
+print({marker!r} + json.dumps([elapsed, sorted(sys.modules)]))
+"""
+
+
+class StartupReport:
+    def __init__(self, runs):
+        self.runs = runs
+        self.times = {}  # Entry point -> import milliseconds per run
+        self.loaded = {}  # Entry point -> APP_MODULES it loaded
+        self.violations = []
+
+    def format(self):
+        lines = [
+            f"MicPipe CLI startup: {self.runs} runs per entry point, budget {IMPORT_BUDGET_MS}ms",
+            "",
+            f"  {'entry point':<12} {'p50':>8} {'max':>8}  app modules loaded",
+        ]
+        for entry, times in self.times.items():
+            loaded = ", ".join(self.loaded[entry]) or "-"
+            lines.append(f"  {entry:<12} {statistics.median(times):>6.1f}ms {max(times):>6.1f}ms  {loaded}")
+        if self.violations:
+            lines += ["", f"{len(self.violations)} startup budget violation(s):"]
+            lines += [f"  {v}" for v in self.violations]
+        return "\n".join(lines)
+
+
+def _probe(statement):
+    body = "\n".join("    " + line for line in statement.splitlines())
+    code = _PROBE.format(body=body, marker=_MARKER)
+    root = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True)
+    if result.returncode != 0:
+        last = (result.stderr.strip().splitlines() or ["no output"])[-1]
+        raise RuntimeError(f"exited with {result.returncode}: {last}")
+    line = next(line for line in result.stdout.splitlines() if line.startswith(_MARKER))
+    elapsed, modules = json.loads(line[len(_MARKER):])
+    return elapsed, modules
+
+
+def run_benchmark(runs=10, entry_points=ENTRY_POINTS, budget_ms=IMPORT_BUDGET_MS):
+    """Import each entry point ``runs`` times in a fresh interpreter and return a StartupReport."""
+    report = StartupReport(runs)
+    for entry, statement in entry_points.items():
+        times = []
+        loaded = set()
+        try:
+            # One unmeasured run, so bytecode caches are warm.
+            _probe(statement)
+            for _ in range(runs):
+                elapsed, modules = _probe(statement)
+                times.append(elapsed)
+                loaded.update(m for m in modules if m in APP_MODULES)
+        except RuntimeError as e:
+            report.violations.append(f"{entry}: {e}")
+            continue
+        report.times[entry] = times
+        report.loaded[entry] = sorted(loaded)
+        p50 = statistics.median(times)
+        if p50 > budget_ms:
+            report.violations.append(f"{entry}: {p50:.1f}ms > budget of {budget_ms}ms")
+        if report.loaded[entry]:
+            report.violations.append(f"{entry}: loads {', '.join(report.loaded[entry])}")
+    return report
+
+
+def main(runs=10):
+    print(run_benchmark(runs).format())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import json
 import os
 
+from write_behind import WRITE_DELAY_SECONDS, WriteBehind
+
 
 class MicPipeStateStore:
     # Supported hotkey options: (keycode, display_name)
@@ -14,8 +16,22 @@ class MicPipeStateStore:
     ]
 
     DEFAULT_TRIGGER_KEY = 63  # Fn key
+    # Saved dedicated window locations are (window_id, tab_id). Files written
+    # before this marker existed stored (window_id, tab_index) instead; the
+    # services listed in "legacy_tab_index_services" still do.
+    TAB_REF = "id"
     DEFAULT_VOICE_IDLE_TIMEOUT_SECONDS = 20
 
+    # How AI Pipe output is pasted: all at once when the response is complete,
+    # or streamed in chunks ending at these boundaries (see paste_tool).
+    PIPE_STREAM_OPTIONS = [
+        ("off", "Off (Paste When Complete)"),
+        ("sentence", "By Sentence"),
+        ("line", "By Line"),
+        ("paragraph", "By Paragraph"),
+    ]
+    DEFAULT_PIPE_STREAM_MODE = "off"
+
     DEFAULT_PIPE_SLOTS = [
         {"title": "Basic Correction", "prompt": "Fix the following voice transcription: 1) Fix grammar errors, typos, and filler words; 2) Add proper punctuation; 3) Auto Format: standardize addresses, phone numbers, numbers, and times to their proper formats; 4) Auto Edit: if there are contradictions, keep the true intent based on context. Output only the corrected text:"},
         {"title": "Polish Text", "prompt": "Polish and improve the following text and output only the result:"},
@@ -25,9 +41,15 @@ class MicPipeStateStore:
     ]
 
 
-    def __init__(self, path, logger=None):
+    def __init__(self, path, logger=None, write_delay=WRITE_DELAY_SECONDS):
+        """``save`` only queues the state; it is written ``write_delay``
+        seconds later from a background thread (0 writes synchronously).
+        ``flush`` writes what is queued right away, and runs at exit.
+        """
         self.path = path
         self.logger = logger
+        self._text = None  # Serialized state last saved (or loaded)
+        self._writer = WriteBehind(path, lambda: self._text, write_delay, what="state")
 
     def _log(self, msg):
         if self.logger:
@@ -42,19 +64,24 @@ class MicPipeStateStore:
             "current_service": "ChatGPT",
             "sound_enabled": True,
             "dedicated_windows": {"ChatGPT": None, "Gemini": None},
+            "legacy_tab_index_services": [],
             "trigger_key": self.DEFAULT_TRIGGER_KEY,
             "voice_idle_timeout_seconds": self.DEFAULT_VOICE_IDLE_TIMEOUT_SECONDS,
             "pipe_slots": copy.deepcopy(self.DEFAULT_PIPE_SLOTS),
             "current_pipe_slot": -1,
+            "pipe_stream_mode": self.DEFAULT_PIPE_STREAM_MODE,
+            "fast_start": True,
         }
         try:
             if not os.path.exists(self.path):
                 return state
             with open(self.path, "r", encoding="utf-8") as f:
-                data = json.load(f)
+                raw = f.read()
+            data = json.loads(raw)
         except Exception as e:
             self._log(f"Failed to load state: {e}")
             return state
+        self._text = self._writer.written = raw
 
         service = data.get("current_service")
         if service in ("ChatGPT", "Gemini"):
@@ -65,15 +92,21 @@ class MicPipeStateStore:
             state["sound_enabled"] = sound
 
         windows = data.get("dedicated_windows")
+        if data.get("tab_ref") != self.TAB_REF:
+            legacy_services = ("ChatGPT", "Gemini")
+        else:
+            legacy_services = data.get("legacy_tab_index_services") or []
         if isinstance(windows, dict):
             for key in ("ChatGPT", "Gemini"):
                 loc = windows.get(key)
                 if isinstance(loc, list) and len(loc) == 2:
                     try:
                         win_id = int(loc[0])
-                        tab_idx = int(loc[1])
-                        if win_id > 0 and tab_idx > 0:
-                            state["dedicated_windows"][key] = (win_id, tab_idx)
+                        tab_ref = int(loc[1])
+                        if win_id > 0 and tab_ref > 0:
+                            state["dedicated_windows"][key] = (win_id, tab_ref)
+                            if key in legacy_services:
+                                state["legacy_tab_index_services"].append(key)
                     except Exception:
                         pass
 
@@ -112,6 +145,14 @@ class MicPipeStateStore:
         else:
             state["current_pipe_slot"] = -1
 
+        pipe_stream_mode = data.get("pipe_stream_mode")
+        if pipe_stream_mode in [opt[0] for opt in self.PIPE_STREAM_OPTIONS]:
+            state["pipe_stream_mode"] = pipe_stream_mode
+
+        fast_start = data.get("fast_start")
+        if isinstance(fast_start, bool):
+            state["fast_start"] = fast_start
+
         return state
 
     def save(
@@ -123,6 +164,9 @@ class MicPipeStateStore:
         voice_idle_timeout_seconds=None,
         pipe_slots=None,
         current_pipe_slot=None,
+        pipe_stream_mode=None,
+        fast_start=True,
+        legacy_tab_index_services=(),
     ):
         payload = {
             "current_service": current_service,
@@ -135,6 +179,9 @@ class MicPipeStateStore:
                 if dedicated_windows.get("Gemini")
                 else None,
             },
+            "tab_ref": self.TAB_REF,
+            # Services whose location is still a tab index (not yet migrated).
+            "legacy_tab_index_services": sorted(legacy_tab_index_services),
             "trigger_key": trigger_key if trigger_key is not None else self.DEFAULT_TRIGGER_KEY,
             "voice_idle_timeout_seconds": (
                 voice_idle_timeout_seconds
@@ -143,12 +190,15 @@ class MicPipeStateStore:
             ),
             "pipe_slots": pipe_slots if pipe_slots is not None else self.DEFAULT_PIPE_SLOTS.copy(),
             "current_pipe_slot": current_pipe_slot if current_pipe_slot is not None else -1,
+            "pipe_stream_mode": pipe_stream_mode if pipe_stream_mode is not None else self.DEFAULT_PIPE_STREAM_MODE,
+            "fast_start": fast_start,
         }
-        try:
-            parent = os.path.dirname(self.path)
-            if parent:
-                os.makedirs(parent, exist_ok=True)
-            with open(self.path, "w", encoding="utf-8") as f:
-                json.dump(payload, f, ensure_ascii=True)
-        except Exception as e:
-            self._log(f"Failed to save state: {e}")
+        text = json.dumps(payload, ensure_ascii=True)
+        if text == self._text:
+            return
+        self._text = text
+        self._writer.mark_dirty()
+
+    def flush(self):
+        """Write the queued state now, if any."""
+        self._writer.flush()
@@ -0,0 +1,114 @@
+"""Atomic file writes, and write-behind of files that change often.
+
+The app state and the learned latencies change while a dictation or a paste
+is in progress; writing them there would put disk I/O on the very paths that
+are being timed. WriteBehind marks a file dirty and writes it a little later
+from a background thread, so the changes in between are written once. Every
+write goes to a temp file that is fsynced and then renamed over the target:
+a crash leaves the old file or the new one, never a truncated one.
+"""
+import atexit
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Changes within this many seconds of the first one are written together.
+WRITE_DELAY_SECONDS = 0.5
+# Learned latencies change on every dictation; batch them over a whole one.
+STATS_WRITE_DELAY_SECONDS = 5.0
+
+
+def write_atomic(path, text):
+    """Write ``text`` to a temp file next to ``path``, fsync it, then rename it over ``path``."""
+    parent = os.path.dirname(path) or "."
+    os.makedirs(parent, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    try:
+        # Make the rename itself durable.
+        dir_fd = os.open(parent, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError:
+        pass
+
+
+class WriteBehind:
+    """Keeps the file at ``path`` up to date with ``serialize()``, written behind.
+
+    ``mark_dirty`` only schedules a write ``delay`` seconds later on a
+    background thread (0 writes synchronously). ``serialize`` is called there
+    for the file's text, so it must be safe to call from that thread; text
+    equal to the last written is skipped. ``flush`` writes right away, and
+    runs at exit. ``what`` names the file in logs.
+    """
+
+    def __init__(self, path, serialize, delay=WRITE_DELAY_SECONDS, what="file"):
+        self.path = path
+        self.serialize = serialize
+        self.delay = delay
+        self.what = what
+        self.written = None  # Text last written (or loaded)
+        self._dirty = False
+        self._due = 0.0
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        atexit.register(self.flush)
+
+    def mark_dirty(self):
+        if not self.path:
+            return
+        with self._cond:
+            if not self._dirty:
+                self._dirty = True
+                self._due = time.monotonic() + self.delay
+            if self.delay > 0:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=f"micpipe-write-{self.what}", daemon=True)
+                    self._thread.start()
+                self._cond.notify()
+                return
+        self.flush()
+
+    def flush(self):
+        """Write now, if anything changed."""
+        with self._write_lock:
+            with self._cond:
+                if not self._dirty:
+                    return
+                self._dirty = False
+            try:
+                text = self.serialize()
+                if text != self.written:
+                    write_atomic(self.path, text)
+                    self.written = text
+            except Exception as e:
+                logger.debug(f"Failed to save {self.what}: {e}")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._dirty or time.monotonic() < self._due:
+                    if not self._dirty:
+                        self._cond.wait()
+                    else:
+                        self._cond.wait(self._due - time.monotonic())
+            self.flush()